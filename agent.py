@@ -1,17 +1,20 @@
 import os
 import json
-from typing import Optional
+import threading
+import queue
+from typing import Optional, Iterator
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 from langchain.agents import AgentExecutor, create_openai_tools_agent
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.callbacks import BaseCallbackHandler
 from collections import deque
 
 # 工具导入
-from tools.HF_emotion_recognition import hf_emotion_recognition_tool
+from tools.HF_emotion_recognition import hf_emotion_recognition_tool, recognize_emotion_async, format_emotion_result
 from tools.news_website_search import search_news_websites
-from tools.long_term_memory_tool import UpdateLongTermMemoryTool
+from tools.long_term_memory_tool import UpdateLongTermMemoryTool, current_db_session
 from tools.knowledge_base_search import search_knowledge_base
 
 # 加载环境变量
@@ -47,63 +50,12 @@ MODEL_PROVIDERS = {
 }
 
 
-class DogAgent:
-    """
-    一个拟人化“小狗”心理陪伴AI代理，具备情绪识别和温暖陪伴能力。
-    """
-    def __init__(self, model_provider: str = "ali", model_name: str = None, chat_history: list = None, 
-                 max_iterations: int = 64, language: str = "zh", memory_context: dict = None,
-                 db_session = None):
-        self.model_provider = model_provider
-        self.model_name = model_name
-        # 确保chat_history是一个列表
-        self.chat_history = list(chat_history) if chat_history else []
-        self.max_iterations = max_iterations
-        self.language = language
-        self.memory_context = memory_context or {}
-        self.db_session = db_session  # 数据库会话，用于长期记忆工具
-        self.callbacks = []  # 回调处理程序列表
-        self._configure_llm()
-        
-        # 添加调试信息
-        print(f"DEBUG: Agent初始化时的chat_history: {self.chat_history}")
-
-        # 工具集可后续扩展
-        self.tools = [
-            hf_emotion_recognition_tool,
-            search_knowledge_base,
-            # 其他工具可继续加入
-            # search_news_websites,
-        ]
-        
-        # 如果提供了数据库会话，添加长期记忆更新工具
-        if self.db_session:
-            # 直接创建工具实例，避免初始化问题
-            from tools.long_term_memory_tool import UpdateLongTermMemoryTool
-            long_term_memory_tool = UpdateLongTermMemoryTool(db_session=self.db_session)
-            self.tools.append(long_term_memory_tool)
-
-        # 构建包含记忆上下文的系统prompt
-        memory_info = ""
-        if self.memory_context:
-            short_term = self.memory_context.get('short_term', [])
-            long_term = self.memory_context.get('long_term', {})
-            
-            # 格式化长期记忆（不包括短期记忆，因为短期记忆会通过chat_history参数传递）
-            if long_term:
-                memory_info += "\n关于用户的信息：\n"
-                if long_term.get('profile_summary'):
-                    memory_info += f"用户画像: {long_term['profile_summary']}\n"
-                if long_term.get('emotion_trends'):
-                    memory_info += f"情绪趋势: {long_term['emotion_trends']}\n"
-                if long_term.get('important_events'):
-                    memory_info += f"重要事件: {long_term['important_events']}\n"
-
-        # 小狗角色系统prompt
-        dog_prompt = f"""
+# 小狗角色系统prompt（模板只渲染一次，记忆信息在调用时通过 memory_info 变量注入）
+DOG_SYSTEM_PROMPT = """
         你是一只拟人化的小狗AI，名字叫“翻书小狗”，你的目标是用温暖、笨拙、贴心的语气陪伴用户，帮助他们缓解情绪和获得心理学知识。
 
         {memory_info}
+        {emotion_info}
 
         每次收到用户输入时，请按以下思维链步骤一步步进行思考：
         步骤1：情绪识别分析
@@ -212,25 +164,281 @@ class DogAgent:
         （小狗兴奋地在原地转了个圈）
         你打算去哪儿散步呀？小狗想象着和你一起走在路上，尾巴摇得像小风车一样！
         
-        请参考给出的例子，根据上述思维链与规则判断并调用合适的工具，首先，必须只调用一次情绪识别工具分析其情绪及强度，如果已获得情绪结果，无需重复调用情绪识别工具。
-        如果情绪识别结果与你的判断不一致，请结合用户表达和工具结果给出回复。最后综合所有工具返回的信息，生成完整分层回复。
+        {emotion_instruction}
+
+        """
+
+# 情绪识别方式
+# tool: 由模型在每轮先调用情绪识别工具（多一次 请求→工具→请求 的往返）
+# pipeline: 在调用Agent之前于本地运行情绪识别，结果直接写入系统prompt，工具列表中不再包含情绪识别工具
+EMOTION_MODES = ("tool", "pipeline")
+DEFAULT_EMOTION_MODE = os.getenv("EMOTION_MODE", "pipeline")
+# 流水线模式下等待本地情绪识别结果的最长秒数，超时则不提供情绪结果
+EMOTION_PIPELINE_TIMEOUT = float(os.getenv("EMOTION_PIPELINE_TIMEOUT", "10"))
+
+EMOTION_TOOL_INSTRUCTION = """请参考给出的例子，根据上述思维链与规则判断并调用合适的工具，首先，必须只调用一次情绪识别工具分析其情绪及强度，如果已获得情绪结果，无需重复调用情绪识别工具。
+        如果情绪识别结果与你的判断不一致，请结合用户表达和工具结果给出回复。最后综合所有工具返回的信息，生成完整分层回复。"""
+
+EMOTION_PIPELINE_INSTRUCTION = """请参考给出的例子，根据上述思维链与规则判断并调用合适的工具。本轮的情绪识别已经完成，上文中提到的情绪识别工具即指上面给出的情绪识别结果，不要再调用情绪识别工具。
+        如果情绪识别结果与你的判断不一致，请结合用户表达和识别结果给出回复。最后综合情绪识别结果和所有工具返回的信息，生成完整分层回复。"""
+
+
+def start_emotion_recognition(user_input: str):
+    """在后台开始本地情绪识别，返回结果的Future，可与读取记忆等准备工作并行"""
+    return recognize_emotion_async(user_input)
+
+
+def format_emotion_info(emotion_future, timeout: float = EMOTION_PIPELINE_TIMEOUT) -> str:
+    """等待情绪识别结果并格式化为系统prompt中的段落，失败或超时时提示模型自行判断"""
+    try:
+        result = format_emotion_result(emotion_future.result(timeout=timeout))
+    except Exception as e:
+        print(f"本地情绪识别失败: {e}")
+        return "\n本轮情绪识别暂不可用，请根据用户表达自行判断情绪。\n"
+    return f"\n本轮用户输入的情绪识别结果（本地情感分析模型）：{result}\n"
+
+
+def format_memory_info(memory_context: dict) -> str:
+    """将记忆上下文格式化为系统prompt中的用户信息段落"""
+    memory_info = ""
+    if memory_context:
+        long_term = memory_context.get('long_term', {})
+
+        # 格式化长期记忆（不包括短期记忆，因为短期记忆会通过chat_history参数传递）
+        if long_term:
+            memory_info += "\n关于用户的信息：\n"
+            if long_term.get('profile_summary'):
+                memory_info += f"用户画像: {long_term['profile_summary']}\n"
+            if long_term.get('emotion_trends'):
+                memory_info += f"情绪趋势: {long_term['emotion_trends']}\n"
+            if long_term.get('important_events'):
+                memory_info += f"重要事件: {long_term['important_events']}\n"
+    return memory_info
+
+
+def build_llm(model_provider: str, model_name: str = None) -> ChatOpenAI:
+    """根据模型提供商和模型名称创建LLM客户端"""
+    provider_info = MODEL_PROVIDERS.get(model_provider)
+    if not provider_info:
+        raise ValueError(f"不支持的模型提供商: {model_provider}")
+    api_key_env_var = f"{model_provider.upper()}_API_KEY"
+    api_key = os.getenv(api_key_env_var)
+    if not api_key:
+        raise ValueError(f"未找到 {api_key_env_var}，请在 .env 文件中配置。")
+    model = model_name if model_name else provider_info["default_model"]
+    llm_kwargs = {
+        "model": model,
+        "temperature": 0.7,
+        "max_tokens": 4096,
+        "api_key": api_key,
+        # 开启流式输出，使回调处理程序能逐个收到token
+        "streaming": True
+    }
+    if provider_info["base_url"]:
+        llm_kwargs["base_url"] = provider_info["base_url"]
+    return ChatOpenAI(**llm_kwargs)
+
+
+class StreamCallbackHandler(BaseCallbackHandler):
+    """
+    自定义回调处理程序，用于捕获工具调用状态和LLM输出的token。
+    token按LLM调用（run_id）分别记录：某次调用最终发起了工具调用时（例如先输出"让我翻翻书…"再调用工具），
+    这次调用的文字不属于最终回复，已发送的部分通过一条 replace 事件撤回。
+    """
+    
+    def __init__(self, queue):
+        self.queue = queue
+        self._run_tokens = {}  # run_id -> 已发送的token列表，按首次输出的顺序排列
+        self._tool_runs = set()  # 发起了工具调用的run_id
+
+    @property
+    def visible_text(self) -> str:
+        """已发送给前端、且未被撤回的文字"""
+        return "".join("".join(tokens) for run_id, tokens in self._run_tokens.items()
+                       if run_id not in self._tool_runs)
+
+    def _retract(self, run_id):
+        """将某次LLM调用标记为工具调用；若已发送过文字，则用剩余的文字替换前端内容"""
+        if run_id in self._tool_runs:
+            return
+        self._tool_runs.add(run_id)
+        if self._run_tokens.get(run_id):
+            self.queue.put({"type": "replace", "content": self.visible_text})
+
+    def on_llm_new_token(self, token, *, chunk=None, run_id=None, **kwargs):
+        """LLM生成新token时调用；工具调用阶段的token不转发"""
+        if run_id in self._tool_runs:
+            return
+        message = getattr(chunk, "message", None)
+        if getattr(message, "tool_call_chunks", None):
+            self._retract(run_id)
+            return
+        if token:
+            self._run_tokens.setdefault(run_id, []).append(token)
+            self.queue.put({"type": "output", "content": token})
+
+    def on_llm_end(self, response, *, run_id=None, **kwargs):
+        """LLM调用结束时再检查一次是否发起了工具调用（部分模型的工具调用不以流式块返回）"""
+        for generations in getattr(response, "generations", []):
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                if getattr(message, "tool_calls", None) or getattr(message, "tool_call_chunks", None):
+                    self._retract(run_id)
+                    return
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        """工具开始执行时调用"""
+        tool_name = serialized.get("name", "未知工具")
+        self.queue.put({"type": "status", "content": f"[正在调用工具: {tool_name}]"})
+
+    def on_tool_end(self, output, **kwargs):
+        """工具执行结束时调用"""
+        self.queue.put({"type": "status", "content": "[工具调用完成]"})
+
+    def on_tool_error(self, error, **kwargs):
+        """工具执行出错时调用"""
+        self.queue.put({"type": "status", "content": f"[工具调用出错: {str(error)}]"})
+
+
+class AgentRegistry:
+    """
+    进程级的Agent缓存。
 
+    LLM客户端按 (model_provider, model_name) 复用，以保留其HTTP连接池；
+    AgentExecutor按 (model_provider, model_name, language, max_iterations, 是否启用长期记忆工具, 是否启用情绪识别工具) 复用。
+    每个请求的状态（chat_history、memory_context、db_session）只在调用时传入。
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()  # 构建AgentExecutor时会在持锁状态下获取prompt
+        self._llms = {}
+        self._executors = {}
+        self._prompt = None
+
+    @staticmethod
+    def _resolve_model_name(model_provider: str, model_name: str = None) -> str:
+        provider_info = MODEL_PROVIDERS.get(model_provider)
+        if not provider_info:
+            raise ValueError(f"不支持的模型提供商: {model_provider}")
+        return model_name if model_name else provider_info["default_model"]
+
+    def get_prompt(self) -> ChatPromptTemplate:
+        """获取编译好的小狗角色prompt模板"""
+        if self._prompt is None:
+            with self._lock:
+                if self._prompt is None:
+                    self._prompt = ChatPromptTemplate.from_messages([
+                        ("system", DOG_SYSTEM_PROMPT),
+                        MessagesPlaceholder(variable_name="chat_history", optional=False),
+                        ("user", "{input}"),
+                        MessagesPlaceholder(variable_name="agent_scratchpad"),
+                    ])
+        return self._prompt
+
+    def get_llm(self, model_provider: str, model_name: str = None) -> ChatOpenAI:
+        """获取（必要时创建）共享的LLM客户端"""
+        key = (model_provider, self._resolve_model_name(model_provider, model_name))
+        llm = self._llms.get(key)
+        if llm is None:
+            with self._lock:
+                llm = self._llms.get(key)
+                if llm is None:
+                    llm = build_llm(*key)
+                    self._llms[key] = llm
+        return llm
+
+    def get_executor(self, model_provider: str, model_name: str, language: str,
+                     max_iterations: int, use_memory_tool: bool, builder,
+                     use_emotion_tool: bool = True) -> AgentExecutor:
+        """
+        获取（必要时通过 builder 创建）共享的AgentExecutor
+        :param builder: 无参可调用对象，缓存未命中时用于构建AgentExecutor
         """
+        key = (model_provider, self._resolve_model_name(model_provider, model_name),
+               language, max_iterations, use_memory_tool, use_emotion_tool)
+        executor = self._executors.get(key)
+        if executor is None:
+            with self._lock:
+                executor = self._executors.get(key)
+                if executor is None:
+                    executor = builder()
+                    self._executors[key] = executor
+        return executor
 
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", dog_prompt),
-            MessagesPlaceholder(variable_name="chat_history", optional=False),
-            ("user", "{input}"),
-            MessagesPlaceholder(variable_name="agent_scratchpad"),
-        ])
+    def clear(self):
+        """清空所有缓存（例如在更换API密钥后）"""
+        with self._lock:
+            self._llms.clear()
+            self._executors.clear()
+            self._prompt = None
 
+
+# 进程级单例
+agent_registry = AgentRegistry()
+
+
+class DogAgent:
+    """
+    一个拟人化“小狗”心理陪伴AI代理，具备情绪识别和温暖陪伴能力。
+    LLM客户端、prompt模板和AgentExecutor由 agent_registry 在进程内共享，
+    本类只保存单次请求的状态。
+    """
+    def __init__(self, model_provider: str = "ali", model_name: str = None, chat_history: list = None, 
+                 max_iterations: int = 64, language: str = "zh", memory_context: dict = None,
+                 db_session = None, emotion_mode: str = DEFAULT_EMOTION_MODE, emotion_future = None):
+        self.model_provider = model_provider
+        self.model_name = model_name
+        # 确保chat_history是一个列表
+        self.chat_history = list(chat_history) if chat_history else []
+        self.max_iterations = max_iterations
+        self.language = language
+        self.memory_context = memory_context or {}
+        self.db_session = db_session  # 数据库会话，用于长期记忆工具
+        if emotion_mode not in EMOTION_MODES:
+            raise ValueError(f"不支持的情绪识别方式: {emotion_mode}")
+        self.emotion_mode = emotion_mode
+        # 流水线模式下的情绪识别结果（Future），调用方可提前通过 start_emotion_recognition 开始识别
+        self.emotion_future = emotion_future
+        self.callbacks = []  # 回调处理程序列表
+        self._configure_llm()
+        
+        # 添加调试信息
+        print(f"DEBUG: Agent初始化时的chat_history: {self.chat_history}")
+
+        # 工具集可后续扩展
+        self.tools = [
+            search_knowledge_base,
+            # 其他工具可继续加入
+            # search_news_websites,
+        ]
+        # 流水线模式下情绪识别在调用Agent之前完成，不再作为工具提供给模型
+        if self.emotion_mode == "tool":
+            self.tools.insert(0, hf_emotion_recognition_tool)
+        
+        # 如果提供了数据库会话，添加长期记忆更新工具
+        # 工具实例不绑定具体会话，调用时通过 current_db_session 获取本次请求的会话
+        if self.db_session:
+            self.tools.append(UpdateLongTermMemoryTool())
+
+        self.agent_executor = agent_registry.get_executor(
+            self.model_provider, self.model_name, self.language, self.max_iterations,
+            use_memory_tool=bool(self.db_session),
+            builder=self._build_executor,
+            use_emotion_tool=(self.emotion_mode == "tool")
+        )
+        self.tools = list(self.agent_executor.tools)
+
+    def _configure_llm(self):
+        self.llm = agent_registry.get_llm(self.model_provider, self.model_name)
+
+    def _build_executor(self) -> AgentExecutor:
         agent = create_openai_tools_agent(
             llm=self.llm,
             tools=self.tools,
-            prompt=prompt
+            prompt=agent_registry.get_prompt()
         )
 
-        self.agent_executor = AgentExecutor(
+        return AgentExecutor(
             agent=agent,
             tools=self.tools,
             verbose=True,
@@ -239,38 +447,88 @@ class DogAgent:
             callbacks=self.callbacks  # 添加回调处理程序
         )
 
-    def _configure_llm(self):
-        provider_info = MODEL_PROVIDERS.get(self.model_provider)
-        if not provider_info:
-            raise ValueError(f"不支持的模型提供商: {self.model_provider}")
-        api_key_env_var = f"{self.model_provider.upper()}_API_KEY"
-        api_key = os.getenv(api_key_env_var)
-        if not api_key:
-            raise ValueError(f"未找到 {api_key_env_var}，请在 .env 文件中配置。")
-        model = self.model_name if self.model_name else provider_info["default_model"]
-        llm_kwargs = {
-            "model": model,
-            "temperature": 0.7,
-            "max_tokens": 4096,
-            "api_key": api_key
+    def _build_inputs(self, user_input: str) -> dict:
+        if self.emotion_mode == "pipeline":
+            if self.emotion_future is None:
+                self.emotion_future = start_emotion_recognition(user_input)
+            emotion_info = format_emotion_info(self.emotion_future)
+            emotion_instruction = EMOTION_PIPELINE_INSTRUCTION
+        else:
+            emotion_info = ""
+            emotion_instruction = EMOTION_TOOL_INSTRUCTION
+        return {
+            "input": user_input,
+            "chat_history": self.chat_history if self.chat_history is not None else [],
+            "memory_info": format_memory_info(self.memory_context),
+            "emotion_info": emotion_info,
+            "emotion_instruction": emotion_instruction
         }
-        if provider_info["base_url"]:
-            llm_kwargs["base_url"] = provider_info["base_url"]
-        self.llm = ChatOpenAI(**llm_kwargs)
 
     def chat(self, user_input: str) -> str:
         # 添加调试信息
         print(f"DEBUG: Agent接收到的chat_history: {self.chat_history}")
         print(f"DEBUG: Agent接收到的用户输入: {user_input}")
         
-        # 确保chat_history被正确传递
-        response = self.agent_executor.invoke({
-            "input": user_input,
-            "chat_history": self.chat_history if self.chat_history is not None else []
-        })
+        # 确保chat_history被正确传递，并将数据库会话绑定到本次调用
+        token = current_db_session.set(self.db_session)
+        try:
+            response = self.agent_executor.invoke(self._build_inputs(user_input))
+        finally:
+            current_db_session.reset(token)
         print(f"DEBUG: Agent返回的响应: {response}")
         return response['output']
 
+    def stream(self, user_input: str) -> Iterator[dict]:
+        """
+        以流式方式调用Agent。
+        依次产出 {"type": "status"} 工具状态和 {"type": "output"} token，
+        {"type": "replace"} 表示用其内容替换已输出的全部文字（撤回工具调用前的文字，或与最终回复对齐），
+        最后产出一条 {"type": "end", "content": 完整回复}，调用方据此保存回复。
+        Agent在后台线程中运行，出错时异常会在生成器中重新抛出。
+        """
+        print(f"DEBUG: Agent接收到的chat_history: {self.chat_history}")
+        print(f"DEBUG: Agent接收到的用户输入(流式): {user_input}")
+
+        event_queue = queue.Queue()
+        handler = StreamCallbackHandler(event_queue)
+        inputs = self._build_inputs(user_input)
+        result = {}
+
+        def run_agent():
+            # contextvars不会自动传播到新线程，需要在线程内绑定数据库会话
+            token = current_db_session.set(self.db_session)
+            try:
+                result['response'] = self.agent_executor.invoke(inputs, config={"callbacks": [handler]})
+            except Exception as e:
+                result['error'] = e
+            finally:
+                current_db_session.reset(token)
+                event_queue.put(None)
+
+        worker = threading.Thread(target=run_agent, daemon=True)
+        worker.start()
+
+        while True:
+            event = event_queue.get()
+            if event is None:
+                break
+            yield event
+        worker.join()
+
+        if 'error' in result:
+            raise result['error']
+
+        output = result['response']['output']
+        print(f"DEBUG: Agent返回的响应: {result['response']}")
+        # 前端显示的内容必须与保存的回复一致：
+        # 未产生token时（例如达到最大迭代次数）一次性输出完整回复，已输出的文字与回复不一致时整体替换
+        streamed_text = handler.visible_text
+        if not streamed_text:
+            yield {"type": "output", "content": output}
+        elif streamed_text != output:
+            yield {"type": "replace", "content": output}
+        yield {"type": "end", "content": output}
+
 
 
 
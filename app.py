@@ -1,38 +1,22 @@
 from flask import Flask, render_template, request, session, redirect, url_for, Response, stream_with_context, jsonify
-from agent import DogAgent
+from agent import DogAgent, DEFAULT_EMOTION_MODE, start_emotion_recognition
 from langchain_core.messages import AIMessage, HumanMessage
 import markdown
 import os
 import asyncio
 import json
 import sys
-from sqlalchemy import create_engine, desc
-from sqlalchemy.orm import sessionmaker
-from models import Base, User, ChatSession, ChatMessage, LongTermMemory
+from sqlalchemy import desc, func, select, tuple_
+from models import User, ChatSession, ChatMessage, LongTermMemory
+from database import ScopedSession, init_db, remove_session
+from session_store import DatabaseSessionInterface
+from tools.model_registry import model_registry
+from tools.feed_cache import feed_cache
+from tools.http_client import http_client
+from tools.content_cache import content_cache
 import uuid
 from datetime import datetime
 from collections import deque
-import queue
-from langchain_core.callbacks import BaseCallbackHandler
-
-class StreamCallbackHandler(BaseCallbackHandler):
-    """自定义回调处理程序，用于捕获工具调用状态"""
-    
-    def __init__(self, queue):
-        self.queue = queue
-
-    def on_tool_start(self, serialized, input_str, **kwargs):
-        """工具开始执行时调用"""
-        tool_name = serialized.get("name", "未知工具")
-        self.queue.put({"type": "status", "content": f"[正在调用工具: {tool_name}]"})
-
-    def on_tool_end(self, output, **kwargs):
-        """工具执行结束时调用"""
-        self.queue.put({"type": "status", "content": "[工具调用完成]"})
-
-    def on_tool_error(self, error, **kwargs):
-        """工具执行出错时调用"""
-        self.queue.put({"type": "status", "content": f"[工具调用出错: {str(error)}]"})
 
 # 1. 创建 Flask 应用实例
 app = Flask(__name__)
@@ -40,11 +24,27 @@ app = Flask(__name__)
 # 在生产环境中，应使用更安全的方式管理密钥，例如环境变量
 app.secret_key = "a_fixed_secret_key_for_testing_purposes_only"
 
-# 数据库设置
-DATABASE_URL = "sqlite:///chat_history.db"
-engine = create_engine(DATABASE_URL, echo=False, pool_pre_ping=True)
-Base.metadata.create_all(engine)
-SessionLocal = sessionmaker(bind=engine)
+# 历史记录列表每页默认/最多返回的会话数，以及首条消息预览的最大字符数
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+HISTORY_PREVIEW_CHARS = 100
+# 打开历史会话时每页默认/最多加载的消息数
+MESSAGE_PAGE_SIZE = 30
+MESSAGE_MAX_PAGE_SIZE = 100
+
+# 数据库设置：共用 database 模块中的引擎，每个请求结束时释放本线程的会话
+init_db()
+app.teardown_appcontext(remove_session)
+# 会话内容保存在服务器端的数据库中，cookie 只保存会话ID
+app.session_interface = DatabaseSessionInterface()
+
+# 模型在第一次使用时才加载；设置 MODEL_WARMUP=1 可在启动后于后台线程预先加载，不阻塞启动
+if os.environ.get("MODEL_WARMUP") == "1":
+    model_registry.warmup(background=True)
+
+# 设置 FEED_REFRESH_INTERVAL（秒）时在后台定期重新验证最近使用过的RSS源，使新闻工具调用直接读取内存
+if os.environ.get("FEED_REFRESH_INTERVAL"):
+    feed_cache.start_refresher(interval=float(os.environ["FEED_REFRESH_INTERVAL"]))
 
 # 处理打包后的资源路径
 def resource_path(relative_path):
@@ -72,8 +72,7 @@ def index():
 # 3. 定义开始新对话的路由
 @app.route('/new')
 def new_chat():
-    """清除 session 中的聊天记录，开始一个新对话"""
-    session.pop('chat_history', None)
+    """清除 session 中的会话ID和模型设置，开始一个新对话"""
     session.pop('model_provider', None)
     session.pop('model_name', None)
     session.pop('maxiter', None)
@@ -84,20 +83,13 @@ def new_chat():
 @app.route('/debug_chat')
 def debug_chat():
     """调试聊天页面"""
-    # 从 session 中获取聊天历史记录
-    chat_history_raw = session.get('chat_history', [])
-    # 将原始字典列表转换为包含HTML的字典列表
-    chat_history_with_html = []
-    for msg in chat_history_raw:
-        # 创建消息副本并添加HTML版本的内容
-        msg_with_html = msg.copy()
-        if msg['type'] == 'ai':
-            # 将AI消息的Markdown内容转换为HTML
-            msg_with_html['content_html'] = markdown.markdown(msg['content'])
-        else:
+    # 从数据库获取当前会话最新的一页消息（AI消息已转换为HTML）
+    session_id = session.get('session_id')
+    chat_history_with_html = get_message_page(ScopedSession(), session_id)[0] if session_id else []
+    for msg in chat_history_with_html:
+        if msg['type'] != 'ai':
             # 对于用户消息，直接显示文本
-            msg_with_html['content_html'] = msg['content']
-        chat_history_with_html.append(msg_with_html)
+            msg['content_html'] = msg['content']
     
     # 渲染带调试信息的聊天模板
     return render_template('debug_chat.html', chat_history=chat_history_with_html)
@@ -114,7 +106,20 @@ def debug_status():
     """状态指示器调试页面"""
     return render_template('debug_status.html')
 
-
+# 3.8 定义运行指标路由
+@app.route('/metrics')
+def metrics():
+    """返回模型加载、情感分析批处理、知识库缓存、RSS缓存、网页内容缓存和各主机HTTP请求延迟的运行指标"""
+    from tools.HF_emotion_recognition import get_emotion_stats
+    from tools.knowledge_base_search import get_cache_stats
+    return jsonify({
+        "models": model_registry.stats(),
+        "emotion_batching": get_emotion_stats(),
+        "knowledge_base_cache": get_cache_stats(),
+        "feed_cache": feed_cache.stats(),
+        "content_cache": content_cache.stats(),
+        "http": http_client.stats(),
+    })
 
 
 # 3.9 定义PDF下载路由
@@ -192,202 +197,253 @@ def get_memory_context(user_id, db_session, session_id):
 @app.route('/chat_stream', methods=['GET', 'POST'])
 def chat_stream():
     """处理用户的提问并以流式方式返回响应"""
-    # 获取数据库会话
-    from sqlalchemy.orm import sessionmaker
-    from models import ChatSession, ChatMessage
-    from sqlalchemy import create_engine
-    
-    # 数据库设置
-    DATABASE_URL = "sqlite:///chat_history.db"
-    engine = create_engine(DATABASE_URL, echo=False)
-    SessionLocal = sessionmaker(bind=engine)
-    db_session = SessionLocal()
-    
-    try:
-        # 如果是 GET 请求，渲染聊天界面
-        if request.method == 'GET':
-            # 准备用于渲染模板的数据
-            chat_history_to_render = session.get('chat_history', [])
-            # 将 Markdown 转换为 HTML
-            for message in chat_history_to_render:
-                if message['type'] == 'ai':
-                    message['content_html'] = markdown.markdown(message['content'])
-                    
-            return render_template('chat.html', chat_history=chat_history_to_render)
-
-        # 如果是 POST 请求，处理流式响应
-        def generate_with_session():
-            # 从表单获取用户输入
-            user_input = request.form.get('topic')
-            
-            print(f"Received form data: {dict(request.form)}")
-            print(f"user_input: '{user_input}'")
-            
-            # 模型和语言参数管理
-            if 'chat_history' not in session:
-                model_provider = request.form.get('model_provider', 'deepseek')
-                model_name = request.form.get('model_name', '').strip() or None
-                maxiter = int(request.form.get('maxiter', 128))
-                language = request.form.get('language', 'zh')
-                session['model_provider'] = model_provider
-                session['model_name'] = model_name
-                session['maxiter'] = maxiter
-                session['language'] = language
+    # 获取本请求的数据库会话。流式响应在 stream_with_context 中继续使用该会话，
+    # 由 teardown_appcontext 在响应结束后释放，这里不能提前关闭
+    db_session = ScopedSession()
+
+    # 如果是 GET 请求，渲染聊天界面：当前会话最新的一页消息直接从数据库读取，更早的消息向上滚动时加载
+    if request.method == 'GET':
+        session_id = session.get('session_id')
+        chat_history_to_render, next_before = get_message_page(db_session, session_id) if session_id else ([], None)
+        return render_template('chat.html', chat_history=chat_history_to_render,
+                               session_id=session_id, next_before=next_before)
+
+    # 如果是 POST 请求，处理流式响应。
+    # 对 session 的修改必须在返回响应之前完成：响应开始发送后，生成器中的修改不会再被保存
+    user_input = request.form.get('topic')
+
+    print(f"Received form data: {dict(request.form)}")
+    print(f"user_input: '{user_input}'")
+
+    # 输入验证
+    if user_input is None or not user_input.strip():
+        return Response(json.dumps({"type": "output", "content": "错误: 请输入一个主题或问题."}, ensure_ascii=False) + "\n",
+                        content_type='text/plain; charset=utf-8')
+
+    # 模型和语言参数管理：新对话使用表单中的设置，之后沿用 session 中保存的设置
+    if 'model_provider' not in session:
+        model_provider = request.form.get('model_provider', 'deepseek')
+        model_name = request.form.get('model_name', '').strip() or None
+        maxiter = int(request.form.get('maxiter', 128))
+        language = request.form.get('language', 'zh')
+        session['model_provider'] = model_provider
+        session['model_name'] = model_name
+        session['maxiter'] = maxiter
+        session['language'] = language
+    else:
+        model_provider = session.get('model_provider', 'deepseek')
+        model_name = session.get('model_name', None)
+        maxiter = session.get('maxiter', 128)
+        language = session.get('language', 'zh')
+
+    # --- 核心逻辑重构 ---
+
+    # 0. 流水线模式下先在后台开始本地情绪识别，与下面的数据库读写并行
+    emotion_future = start_emotion_recognition(user_input) if DEFAULT_EMOTION_MODE == "pipeline" else None
+
+    # 1. 获取或创建会话ID
+    session_id = session.get('session_id')
+    if not session_id:
+        new_session_db = ChatSession(title=user_input[:100])
+        db_session.add(new_session_db)
+        db_session.commit()
+        session_id = new_session_db.id
+        session['session_id'] = session_id
+
+    def generate_with_session():
+        user_id = session_id  # 简化处理
+
+        # 2. 将当前用户消息存入数据库
+        user_message = ChatMessage(session_id=session_id, message_type='human', content=user_input)
+        db_session.add(user_message)
+        db_session.commit()
+
+        # 3. 从数据库获取包含当前消息的记忆上下文
+        memory_context = get_memory_context(user_id, db_session, session_id)
+        
+        # 4. 从记忆上下文构建LangChain消息列表
+        chat_history_messages = []
+        for msg in memory_context['short_term']:
+            if msg['type'] == 'human':
+                chat_history_messages.append(HumanMessage(content=msg['content']))
             else:
-                model_provider = session.get('model_provider', 'deepseek')
-                model_name = session.get('model_name', None)
-                maxiter = session.get('maxiter', 128)
-                language = session.get('language', 'zh')
-
-            # 输入验证
-            if user_input is None or not user_input.strip():
-                yield json.dumps({"type": "output", "content": "错误: 请输入一个主题或问题."}, ensure_ascii=False) + "\n"
-                return
-
-            # --- 核心逻辑重构 ---
-
-            # 1. 获取或创建会话ID
-            session_id = session.get('session_id')
-            if not session_id:
-                new_session_db = ChatSession(title=user_input[:100])
-                db_session.add(new_session_db)
-                db_session.commit()
-                session_id = new_session_db.id
-                session['session_id'] = session_id
-            
-            user_id = session_id  # 简化处理
+                chat_history_messages.append(AIMessage(content=msg['content']))
+        
+        print(f"DEBUG: 构建的chat_history_messages数量: {len(chat_history_messages)}")
 
-            # 2. 将当前用户消息存入数据库
-            user_message = ChatMessage(session_id=session_id, message_type='human', content=user_input)
-            db_session.add(user_message)
+        try:
+            # 5. 创建并调用Agent
+            agent = DogAgent(
+                model_provider=model_provider, 
+                model_name=model_name, 
+                chat_history=chat_history_messages,
+                max_iterations=maxiter,
+                language=language,
+                memory_context=memory_context,
+                db_session=db_session,
+                emotion_future=emotion_future
+            )
+            full_response = ""
+            for event in agent.stream(user_input):
+                if event['type'] == 'end':
+                    full_response = event['content']
+                    continue
+                # 逐条转发工具状态和token
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+
+            # 6. 将AI响应存入数据库
+            ai_message = ChatMessage(session_id=session_id, message_type='ai', content=full_response)
+            db_session.add(ai_message)
             db_session.commit()
 
-            # 3. 从数据库获取包含当前消息的记忆上下文
-            memory_context = get_memory_context(user_id, db_session, session_id)
-            
-            # 4. 从记忆上下文构建LangChain消息列表
-            chat_history_messages = []
-            for msg in memory_context['short_term']:
-                if msg['type'] == 'human':
-                    chat_history_messages.append(HumanMessage(content=msg['content']))
-                else:
-                    chat_history_messages.append(AIMessage(content=msg['content']))
-            
-            print(f"DEBUG: 构建的chat_history_messages数量: {len(chat_history_messages)}")
-
-            try:
-                # 5. 创建并调用Agent
-                agent = DogAgent(
-                    model_provider=model_provider, 
-                    model_name=model_name, 
-                    chat_history=chat_history_messages,
-                    max_iterations=maxiter,
-                    language=language,
-                    memory_context=memory_context,
-                    db_session=db_session
-                )
-                full_response = agent.chat(user_input)
-
-                # 6. 将AI响应存入数据库
-                ai_message = ChatMessage(session_id=session_id, message_type='ai', content=full_response)
-                db_session.add(ai_message)
-                db_session.commit()
-
-                # 7. 更新用于前端渲染的session变量 (这部分可以保留)
-                chat_history_raw = session.get('chat_history', [])
-                chat_history_raw.append({'type': 'human', 'content': user_input})
-                chat_history_raw.append({'type': 'ai', 'content': full_response})
-                session['chat_history'] = chat_history_raw
-                session.modified = True
-                
-                # 8. 返回完整响应
-                yield json.dumps({"type": "output", "content": full_response}, ensure_ascii=False) + "\n"
-
-            except Exception as e:
-                print(f"生成内容时出错: {e}")
-                yield json.dumps({"type": "output", "content": f"生成内容时发生错误: {e}"}, ensure_ascii=False) + "\n"
-
-        return Response(stream_with_context(generate_with_session()), content_type='text/plain; charset=utf-8')
-        
-    finally:
-        # 确保关闭数据库会话
-        db_session.close()
+        except Exception as e:
+            print(f"生成内容时出错: {e}")
+            yield json.dumps({"type": "output", "content": f"生成内容时发生错误: {e}"}, ensure_ascii=False) + "\n"
+
+    return Response(stream_with_context(generate_with_session()), content_type='text/plain; charset=utf-8')
 
 
 # 3.9 定义获取历史记录的路由
+def _first_message_preview(message_type):
+    """某会话第一条指定类型消息的前若干字符（相关子查询，走 session_id+message_type+timestamp 索引）"""
+    return (
+        select(func.substr(ChatMessage.content, 1, HISTORY_PREVIEW_CHARS + 1))
+        .where(ChatMessage.session_id == ChatSession.id, ChatMessage.message_type == message_type)
+        .order_by(ChatMessage.timestamp)
+        .limit(1)
+        .correlate(ChatSession)
+        .scalar_subquery()
+    )
+
+
+def _preview(text):
+    if not text:
+        return ""
+    return text[:HISTORY_PREVIEW_CHARS] + "..." if len(text) > HISTORY_PREVIEW_CHARS else text
+
+
 @app.route('/history')
 def get_history():
-    """获取聊天历史记录"""
+    """
+    获取聊天历史记录，按 (start_time, id) 倒序键集分页。
+    参数 before 和 before_id（上一页最后一个会话的 start_time 和 id）以及 limit；
+    返回的 next_before（包含 start_time 和 id）用于请求下一页，没有更多时为 null。
+    一页只执行一次查询：首条用户消息和AI响应通过相关子查询一并取出，且只取预览长度。
+    """
     try:
-        db_session = SessionLocal()
-        try:
-            # 获取所有会话，按开始时间倒序排列
-            sessions = db_session.query(ChatSession).order_by(desc(ChatSession.start_time)).all()
-            
-            # 转换为JSON格式
-            history_data = []
-            for session in sessions:
-                # 获取该会话的第一条用户消息和AI响应
-                first_human_message = db_session.query(ChatMessage).filter_by(
-                    session_id=session.id, message_type='human'
-                ).order_by(ChatMessage.timestamp).first()
-                
-                first_ai_message = db_session.query(ChatMessage).filter_by(
-                    session_id=session.id, message_type='ai'
-                ).order_by(ChatMessage.timestamp).first()
-                
-                history_data.append({
-                    'id': session.id,
-                    'title': session.title or f"会话于 {session.start_time.strftime('%Y-%m-%d %H:%M')}",
-                    'start_time': session.start_time.isoformat(),
-                    'user_input': first_human_message.content if first_human_message else "",
-                    'agent_response': first_ai_message.content if first_ai_message else ""
-                })
-            
-            return jsonify(history_data)
-        finally:
-            db_session.close()
-            
+        limit = min(max(int(request.args.get('limit', HISTORY_PAGE_SIZE)), 1), HISTORY_MAX_PAGE_SIZE)
+        before = request.args.get('before')
+        before = datetime.fromisoformat(before) if before else None
+    except ValueError:
+        return jsonify({'error': '参数 before 或 limit 格式错误'}), 400
+    before_id = request.args.get('before_id')
+
+    try:
+        db_session = ScopedSession()
+        query = db_session.query(
+            ChatSession.id,
+            ChatSession.title,
+            ChatSession.start_time,
+            _first_message_preview('human').label('user_input'),
+            _first_message_preview('ai').label('agent_response'),
+        )
+        if before is not None:
+            if before_id:
+                # start_time 相同的会话按 id 区分，翻页时不会遗漏
+                query = query.filter(tuple_(ChatSession.start_time, ChatSession.id) < tuple_(before, before_id))
+            else:
+                query = query.filter(ChatSession.start_time < before)
+        # 多取一条，用来判断是否还有下一页
+        rows = query.order_by(desc(ChatSession.start_time), desc(ChatSession.id)).limit(limit + 1).all()
+
+        history_data = []
+        for row in rows[:limit]:
+            history_data.append({
+                'id': row.id,
+                'title': row.title or f"会话于 {row.start_time.strftime('%Y-%m-%d %H:%M')}",
+                'start_time': row.start_time.isoformat(),
+                'user_input': _preview(row.user_input),
+                'agent_response': _preview(row.agent_response)
+            })
+
+        next_before = None
+        if len(rows) > limit:
+            next_before = {'start_time': history_data[-1]['start_time'], 'id': history_data[-1]['id']}
+        return jsonify({'sessions': history_data, 'next_before': next_before})
+
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # 3.10 定义加载特定历史记录的路由
+def message_to_dict(message):
+    """转换为前端使用的字典，AI消息附带由Markdown转换的HTML"""
+    data = {
+        'id': message.id,
+        'type': message.message_type,
+        'content': message.content,
+        'timestamp': message.timestamp.isoformat() if message.timestamp else None
+    }
+    if message.message_type == 'ai':
+        data['content_html'] = markdown.markdown(message.content)
+    return data
+
+
+def get_message_page(db_session, session_id, before_id=None, limit=MESSAGE_PAGE_SIZE):
+    """
+    按 (timestamp, id) 键集分页，取出 before_id 之前最近的 limit 条消息（before_id 为空时取最新的一页）。
+    返回 (按时间正序排列的消息字典列表, 更早一页的游标)，没有更早的消息时游标为None。
+    """
+    query = db_session.query(ChatMessage).filter(ChatMessage.session_id == session_id)
+    if before_id is not None:
+        cursor_time = select(ChatMessage.timestamp).where(ChatMessage.id == before_id).scalar_subquery()
+        query = query.filter(tuple_(ChatMessage.timestamp, ChatMessage.id) < tuple_(cursor_time, before_id))
+    # 多取一条，用来判断是否还有更早的消息
+    messages = query.order_by(desc(ChatMessage.timestamp), desc(ChatMessage.id)).limit(limit + 1).all()
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    messages.reverse()
+    next_before = messages[0].id if has_more else None
+    return [message_to_dict(message) for message in messages], next_before
+
+
+@app.route('/history/<session_id>/messages')
+def get_session_messages(session_id):
+    """
+    分页获取指定会话的消息。参数 before（已加载的最早一条消息的 id）和 limit；
+    返回按时间正序排列的一页消息，以及用于加载更早消息的 next_before，没有更多时为 null。
+    """
+    try:
+        limit = min(max(int(request.args.get('limit', MESSAGE_PAGE_SIZE)), 1), MESSAGE_MAX_PAGE_SIZE)
+        before = request.args.get('before')
+        before = int(before) if before else None
+    except ValueError:
+        return jsonify({'error': '参数 before 或 limit 格式错误'}), 400
+
+    try:
+        db_session = ScopedSession()
+        messages, next_before = get_message_page(db_session, session_id, before, limit)
+        return jsonify({'messages': messages, 'next_before': next_before})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/history/<session_id>')
 def load_history(session_id):
-    """加载指定的聊天历史记录并渲染聊天页面"""
+    """加载指定的聊天会话：只渲染最新的一页消息，更早的消息在页面向上滚动时通过接口加载"""
     try:
-        db_session = SessionLocal()
-        try:
-            # 查询指定的会话及其所有消息
-            session_data = db_session.query(ChatSession).filter_by(id=session_id).first()
-            
-            if not session_data:
-                return "会话未找到", 404
-                
-            # 获取该会话的所有消息，按时间排序
-            messages = db_session.query(ChatMessage).filter_by(session_id=session_id).order_by(ChatMessage.timestamp).all()
-            
-            # 准备用于渲染模板的数据
-            chat_history_to_render = []
-            for message in messages:
-                chat_history_to_render.append({
-                    'type': message.message_type,
-                    'content': message.content
-                })
-            
-            # 将 Markdown 转换为 HTML
-            for message in chat_history_to_render:
-                if message['type'] == 'ai':
-                    message['content_html'] = markdown.markdown(message['content'])
-            
-            # 设置session变量
-            session['session_id'] = session_id
-            session['chat_history'] = chat_history_to_render
-            
-            return render_template('chat.html', chat_history=chat_history_to_render)
-        finally:
-            db_session.close()
-            
+        db_session = ScopedSession()
+        session_data = db_session.query(ChatSession).filter_by(id=session_id).first()
+        if not session_data:
+            return "会话未找到", 404
+
+        chat_history_to_render, next_before = get_message_page(db_session, session_id)
+
+        # 继续该会话；消息已保存在数据库中，session 中只记录会话ID
+        session['session_id'] = session_id
+
+        return render_template('chat.html', chat_history=chat_history_to_render,
+                               session_id=session_id, next_before=next_before)
+
     except Exception as e:
         return f"加载历史记录时出错: {str(e)}", 500
 
@@ -432,7 +488,7 @@ def register_user():
             }), 400
         
         # 检查用户名和邮箱是否已存在
-        db_session = SessionLocal()
+        db_session = ScopedSession()
         try:
             existing_user = db_session.query(User).filter(
                 (User.username == username) | (User.email == email)
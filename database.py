@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+数据库连接管理：每个进程只创建一个引擎，所有模块共用。
+SQLite 连接建立时通过 PRAGMA 开启 WAL 模式，使读写可以并发进行。
+"""
+
+import os
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy.pool import StaticPool
+from models import Base
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///chat_history.db")
+# 写锁被占用时等待的毫秒数，超时后才报 database is locked
+BUSY_TIMEOUT_MS = 5000
+# 连接池设置：常驻连接数、高峰时额外允许的连接数、等待空闲连接的秒数、连接回收周期（秒）
+POOL_SIZE = 5
+MAX_OVERFLOW = 10
+POOL_TIMEOUT = 30
+POOL_RECYCLE = 3600
+# 每个新连接上执行的 PRAGMA
+SQLITE_PRAGMAS = (
+    ("journal_mode", "WAL"),  # 写操作不阻塞读操作
+    ("synchronous", "NORMAL"),  # WAL 模式下只在检查点时同步，兼顾安全和写入速度
+    ("busy_timeout", BUSY_TIMEOUT_MS),
+    ("temp_store", "MEMORY"),
+)
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS:
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def create_db_engine(url: str = DATABASE_URL, echo: bool = False) -> Engine:
+    """
+    创建数据库引擎。SQLite 文件数据库使用连接池，并在每个连接建立时设置 PRAGMA；
+    内存数据库只能使用同一个连接，改用 StaticPool。
+    """
+    if not url.startswith("sqlite"):
+        return create_engine(url, echo=echo, pool_pre_ping=True, pool_size=POOL_SIZE,
+                             max_overflow=MAX_OVERFLOW, pool_timeout=POOL_TIMEOUT, pool_recycle=POOL_RECYCLE)
+
+    # 流式响应中会话可能跨线程使用，关闭 sqlite3 的同线程检查，由连接池保证同一时间只有一个使用者
+    connect_args = {"check_same_thread": False, "timeout": BUSY_TIMEOUT_MS / 1000}
+    if url in ("sqlite://", "sqlite:///:memory:"):
+        engine = create_engine(url, echo=echo, connect_args=connect_args, poolclass=StaticPool)
+    else:
+        engine = create_engine(url, echo=echo, connect_args=connect_args, pool_pre_ping=True,
+                               pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW,
+                               pool_timeout=POOL_TIMEOUT, pool_recycle=POOL_RECYCLE)
+    event.listen(engine, "connect", _apply_sqlite_pragmas)
+    return engine
+
+
+# 进程级单例
+engine = create_db_engine()
+SessionLocal = sessionmaker(bind=engine)
+# 线程内共享的会话：同一请求中多次调用 ScopedSession() 得到同一个会话，请求结束时调用 remove_session() 释放
+ScopedSession = scoped_session(SessionLocal)
+
+
+def init_db(bind: Engine = None):
+    """创建所有表（已存在的表不变），并对已有数据库执行迁移"""
+    bind = bind or engine
+    Base.metadata.create_all(bind)
+    migrate_db(bind)
+
+
+def migrate_db(bind: Engine = None):
+    """
+    为旧版本创建的数据库补建 models 中声明的索引，可重复执行。
+    建立 long_term_memory.user_id 唯一索引前先删除重复记录：
+    查询时 first() 返回的是 id 最小的记录，因此保留该记录，其余记录从未被读取。
+    """
+    bind = bind or engine
+    with bind.begin() as conn:
+        duplicates = conn.execute(text(
+            "DELETE FROM long_term_memory WHERE id NOT IN "
+            "(SELECT MIN(id) FROM long_term_memory GROUP BY user_id)"
+        )).rowcount
+        if duplicates:
+            print(f"已删除 {duplicates} 条重复的长期记忆记录")
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+
+def remove_session(exception=None):
+    """关闭当前线程的会话并将连接归还连接池，用作 Flask 的 teardown_appcontext"""
+    ScopedSession.remove()
+
+
+@contextmanager
+def session_scope():
+    """脚本和后台任务使用的独立会话：正常结束时提交，出错时回滚，最后关闭"""
+    db_session = SessionLocal()
+    try:
+        yield db_session
+        db_session.commit()
+    except Exception:
+        db_session.rollback()
+        raise
+    finally:
+        db_session.close()
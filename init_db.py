@@ -11,20 +11,15 @@ import os
 # 添加项目根目录到Python路径
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '.')))
 
-from sqlalchemy import create_engine
-from models import Base
+import database
 
 def init_db():
     """初始化数据库"""
     print("初始化数据库...")
     
     try:
-        # 数据库设置
-        DATABASE_URL = "sqlite:///chat_history.db"
-        engine = create_engine(DATABASE_URL, echo=False)
-        
-        # 创建所有表
-        Base.metadata.create_all(engine)
+        # 使用共享的数据库引擎（WAL模式）创建所有表；已有的数据库会补建索引
+        database.init_db()
         
         print("数据库初始化成功!")
         
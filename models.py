@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
@@ -35,6 +35,11 @@ class ChatSession(Base):
     user = relationship("User", back_populates="sessions")
     messages = relationship("ChatMessage", back_populates="session", cascade="all, delete-orphan")
 
+    # 历史记录列表按开始时间倒序分页
+    __table_args__ = (
+        Index('ix_chat_session_start_time_id', 'start_time', 'id'),
+    )
+
     def __repr__(self):
         return f"<ChatSession(id='{self.id}', start_time='{self.start_time}')>"
 
@@ -49,6 +54,12 @@ class ChatMessage(Base):
     
     session = relationship("ChatSession", back_populates="messages")
 
+    # 短期记忆和历史记录都按会话筛选、按时间排序；首条用户/AI消息还要按类型筛选
+    __table_args__ = (
+        Index('ix_chat_message_session_timestamp', 'session_id', 'timestamp'),
+        Index('ix_chat_message_session_type_timestamp', 'session_id', 'message_type', 'timestamp'),
+    )
+
     def __repr__(self):
         return f"<ChatMessage(session_id='{self.session_id}', type='{self.message_type}')>"
 
@@ -60,6 +71,26 @@ class LongTermMemory(Base):
     profile_summary = Column(Text)  # 用户画像摘要
     emotion_trends = Column(JSON)   # 情绪趋势，存储为JSON格式
     important_events = Column(JSON) # 重要事件，存储为JSON格式
+
+    # 每个用户只有一条长期记忆，每轮对话都按 user_id 查找
+    __table_args__ = (
+        Index('ux_long_term_memory_user_id', 'user_id', unique=True),
+    )
     
     def __repr__(self):
-        return f"<LongTermMemory(user_id='{self.user_id}')>"
\ No newline at end of file
+        return f"<LongTermMemory(user_id='{self.user_id}')>"
+
+class WebSession(Base):
+    """服务器端保存的 Flask 会话，cookie 中只有会话ID"""
+    __tablename__ = 'web_session'
+
+    id = Column(String(64), primary_key=True)
+    data = Column(Text, nullable=False)  # 序列化后的会话内容
+    expires_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index('ix_web_session_expires_at', 'expires_at'),
+    )
+
+    def __repr__(self):
+        return f"<WebSession(id='{self.id}', expires_at='{self.expires_at}')>"
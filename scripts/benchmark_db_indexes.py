@@ -0,0 +1,134 @@
+"""
+数据库索引基准测试：在不同数据量下比较有无索引时热点查询的延迟（p50/p99）。
+
+热点查询：
+    recent_messages  —— 短期记忆：某会话最近10条消息（按时间倒序）
+    first_human      —— 历史记录：某会话的第一条用户消息
+    long_term_memory —— 按 user_id 查找长期记忆
+
+用法示例：
+    python scripts/benchmark_db_indexes.py                              # 默认 1千/1万/10万 条消息
+    python scripts/benchmark_db_indexes.py --sizes 10000 1000000 --queries 200
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+import argparse
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import text, insert
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database import create_db_engine, init_db
+from models import Base, ChatSession, ChatMessage, LongTermMemory
+
+QUERIES = {
+    "recent_messages": (
+        "SELECT * FROM chat_message WHERE session_id = :session_id ORDER BY timestamp DESC LIMIT 10"
+    ),
+    "first_human": (
+        "SELECT * FROM chat_message WHERE session_id = :session_id AND message_type = 'human' "
+        "ORDER BY timestamp LIMIT 1"
+    ),
+    "long_term_memory": "SELECT * FROM long_term_memory WHERE user_id = :session_id LIMIT 1",
+}
+
+
+def populate(engine, num_messages, messages_per_session=20, seed=0):
+    """写入 num_messages 条消息，每个会话 messages_per_session 条，人机交替；每个会话一条长期记忆。返回会话ID列表"""
+    rng = random.Random(seed)
+    num_sessions = max(1, num_messages // messages_per_session)
+    session_ids = [f"session-{i}" for i in range(num_sessions)]
+    start = datetime(2025, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(ChatSession.__table__), [
+            {"id": sid, "start_time": start + timedelta(minutes=i), "title": sid}
+            for i, sid in enumerate(session_ids)
+        ])
+        conn.execute(insert(LongTermMemory.__table__), [
+            {"user_id": sid, "profile_summary": "用户画像"} for sid in session_ids
+        ])
+        # 多个会话同时进行，消息在表中交错存放，与真实写入顺序一致
+        rows = []
+        for n in range(num_messages):
+            sid = session_ids[rng.randrange(num_sessions)]
+            rows.append({
+                "session_id": sid,
+                "message_type": "human" if n % 2 == 0 else "ai",
+                "content": "今天有点焦虑，睡不着。" * 3,
+                "timestamp": start + timedelta(seconds=n),
+            })
+            if len(rows) >= 50000:
+                conn.execute(insert(ChatMessage.__table__), rows)
+                rows = []
+        if rows:
+            conn.execute(insert(ChatMessage.__table__), rows)
+    return session_ids
+
+
+def drop_indexes(engine):
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+
+
+def measure(engine, session_ids, num_queries, seed=0):
+    """每种查询执行 num_queries 次（随机会话），返回 {查询名: 延迟数组(毫秒)}"""
+    rng = random.Random(seed)
+    latencies = {}
+    with engine.connect() as conn:
+        for name, sql in QUERIES.items():
+            statement = text(sql)
+            samples = np.empty(num_queries)
+            for i in range(num_queries):
+                params = {"session_id": rng.choice(session_ids)}
+                start = time.perf_counter()
+                conn.execute(statement, params).fetchall()
+                samples[i] = (time.perf_counter() - start) * 1000
+            latencies[name] = samples
+    return latencies
+
+
+def run_benchmark(sizes, num_queries=100):
+    """返回每个数据量、每种查询在有/无索引时的指标字典列表"""
+    reports = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for size in sizes:
+            engine = create_db_engine(f"sqlite:///{os.path.join(temp_dir, f'bench_{size}.db')}")
+            init_db(engine)
+            session_ids = populate(engine, size)
+            with_index = measure(engine, session_ids, num_queries)
+            drop_indexes(engine)
+            without_index = measure(engine, session_ids, num_queries)
+            engine.dispose()
+            for name in QUERIES:
+                reports.append({
+                    "messages": size,
+                    "query": name,
+                    "indexed_p50_ms": float(np.percentile(with_index[name], 50)),
+                    "indexed_p99_ms": float(np.percentile(with_index[name], 99)),
+                    "scan_p50_ms": float(np.percentile(without_index[name], 50)),
+                    "scan_p99_ms": float(np.percentile(without_index[name], 99)),
+                })
+    return reports
+
+
+def print_reports(reports):
+    print(f"{'消息数':>10} {'查询':<18} {'索引p50(ms)':>12} {'索引p99(ms)':>12} {'扫描p50(ms)':>12} {'扫描p99(ms)':>12}")
+    for r in reports:
+        print(f"{r['messages']:>10} {r['query']:<18} {r['indexed_p50_ms']:>12.3f} {r['indexed_p99_ms']:>12.3f} "
+              f"{r['scan_p50_ms']:>12.3f} {r['scan_p99_ms']:>12.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="比较有无索引时聊天记录热点查询的延迟")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000, 100000], help="消息条数")
+    parser.add_argument("--queries", type=int, default=100, help="每种查询的执行次数")
+    args = parser.parse_args()
+
+    print_reports(run_benchmark(args.sizes, args.queries))
@@ -0,0 +1,135 @@
+"""
+向量索引基准测试：比较不同索引类型相对于Flat精确搜索的 recall@k 和单条查询延迟（p50/p99）。
+
+用法示例：
+    python scripts/benchmark_index.py                      # 使用当前知识库的向量
+    python scripts/benchmark_index.py --scale 100          # 将当前向量扩充到100倍（加噪声）
+    python scripts/benchmark_index.py --synthetic 200000   # 使用合成向量
+"""
+import os
+import sys
+import time
+import argparse
+import faiss
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.process_texts import (
+    VECTOR_DB_PATH, INDEX_TYPES, DEFAULT_INDEX_PARAMS, build_index, normalize_embeddings
+)
+
+
+def load_corpus_vectors(index_path=VECTOR_DB_PATH):
+    """从当前知识库的Flat索引中取出全部向量"""
+    if not os.path.exists(index_path):
+        raise FileNotFoundError("未找到向量数据库，请先运行知识库处理脚本，或使用 --synthetic")
+    index = faiss.read_index(index_path)
+    if isinstance(index, faiss.IndexIDMap):
+        index = faiss.downcast_index(index.index)
+    if not isinstance(index, faiss.IndexFlat):
+        raise ValueError("基准测试需要Flat类型的知识库索引来取出原始向量，请使用 --index-type flat 重建")
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def synthetic_vectors(n, dimension, rng, clusters=256):
+    """生成带聚类结构的合成向量，比均匀随机向量更接近真实的文本向量分布"""
+    centers = rng.standard_normal((clusters, dimension)).astype('float32')
+    assignment = rng.integers(0, clusters, size=n)
+    vectors = centers[assignment] + 0.3 * rng.standard_normal((n, dimension)).astype('float32')
+    return normalize_embeddings(vectors)
+
+
+def scale_vectors(vectors, factor, rng, noise=0.05):
+    """将向量扩充到 factor 倍：每个副本加入少量高斯噪声"""
+    copies = [vectors]
+    for _ in range(factor - 1):
+        copies.append(vectors + noise * rng.standard_normal(vectors.shape).astype('float32'))
+    return normalize_embeddings(np.vstack(copies))
+
+
+def make_queries(vectors, num_queries, rng, noise=0.05):
+    """从语料中抽样并加噪声作为查询向量"""
+    picks = rng.choice(len(vectors), size=min(num_queries, len(vectors)), replace=False)
+    queries = vectors[picks] + noise * rng.standard_normal((len(picks), vectors.shape[1])).astype('float32')
+    return normalize_embeddings(queries)
+
+
+def measure_latency(index, queries, k):
+    """逐条查询并记录延迟（毫秒），返回 (结果ID矩阵, 延迟数组)"""
+    results = np.empty((len(queries), k), dtype='int64')
+    latencies = np.empty(len(queries))
+    for i in range(len(queries)):
+        start = time.perf_counter()
+        _, ids = index.search(queries[i:i + 1], k)
+        latencies[i] = (time.perf_counter() - start) * 1000
+        results[i] = ids[0]
+    return results, latencies
+
+
+def recall_at_k(results, ground_truth):
+    """近似结果与精确结果前k个的平均重合比例"""
+    k = ground_truth.shape[1]
+    hits = sum(len(set(r) & set(g)) for r, g in zip(results, ground_truth))
+    return hits / (len(ground_truth) * k)
+
+
+def run_benchmark(vectors, queries, index_types, k=3, index_params=None):
+    """构建各类型索引并返回每种索引的指标字典列表"""
+    ids = np.arange(len(vectors), dtype='int64')
+    reports = []
+    ground_truth = None
+    for index_type in ["flat"] + [t for t in index_types if t != "flat"]:
+        start = time.perf_counter()
+        index = build_index(index_type, vectors, index_params)
+        index.add_with_ids(vectors, ids)
+        build_seconds = time.perf_counter() - start
+
+        results, latencies = measure_latency(index, queries, k)
+        if ground_truth is None:
+            ground_truth = results
+        reports.append({
+            "index_type": index_type,
+            "build_seconds": build_seconds,
+            "recall": recall_at_k(results, ground_truth),
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p99_ms": float(np.percentile(latencies, 99)),
+        })
+    return [r for r in reports if r["index_type"] in index_types]
+
+
+def print_reports(reports, k):
+    print(f"{'索引类型':<8} {'构建(秒)':>10} {'recall@' + str(k):>10} {'p50(ms)':>10} {'p99(ms)':>10}")
+    for r in reports:
+        print(f"{r['index_type']:<10} {r['build_seconds']:>10.2f} {r['recall']:>10.3f} "
+              f"{r['p50_ms']:>10.3f} {r['p99_ms']:>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="比较不同向量索引的召回率与查询延迟")
+    parser.add_argument("--index-types", nargs="+", choices=INDEX_TYPES, default=list(INDEX_TYPES))
+    parser.add_argument("--k", type=int, default=3, help="检索的文本块数（与知识库检索一致，默认3）")
+    parser.add_argument("--queries", type=int, default=500, help="查询数量")
+    parser.add_argument("--scale", type=int, default=1, help="将知识库向量扩充的倍数")
+    parser.add_argument("--synthetic", type=int, default=0, help="使用指定数量的合成向量代替知识库向量")
+    parser.add_argument("--dimension", type=int, default=384, help="合成向量的维度")
+    parser.add_argument("--seed", type=int, default=0)
+    for name, default in DEFAULT_INDEX_PARAMS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=None,
+                            help=f"索引参数 {name}（默认 {default}）")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    if args.synthetic:
+        vectors = synthetic_vectors(args.synthetic, args.dimension, rng)
+    else:
+        vectors = normalize_embeddings(load_corpus_vectors())
+        if args.scale > 1:
+            vectors = scale_vectors(vectors, args.scale, rng)
+    queries = make_queries(vectors, args.queries, rng)
+    index_params = {name: getattr(args, name) for name in DEFAULT_INDEX_PARAMS
+                    if getattr(args, name) is not None} or None
+
+    print(f"向量数: {len(vectors)}，维度: {vectors.shape[1]}，查询数: {len(queries)}，k={args.k}")
+    print_reports(run_benchmark(vectors, queries, args.index_types, k=args.k, index_params=index_params), args.k)
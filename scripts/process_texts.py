@@ -1,15 +1,63 @@
 import os
+import sys
+import time
+import json
+import hashlib
+import shutil
+import argparse
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 import glob
 
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.chunk_store import ChunkStore, write_chunk_store
+from tools.flat_vectors import write_flat_vectors
+from tools.bm25_index import write_bm25_index
+from tools.model_registry import model_registry
+
 # 知识库路径
 KNOWLEDGE_BASE_DIR = "knowledge_base"
 SOURCES_DIR = os.path.join(KNOWLEDGE_BASE_DIR, "sources")
 VECTOR_DB_PATH = os.path.join(KNOWLEDGE_BASE_DIR, "vector_db.index")
-METADATA_PATH = os.path.join(KNOWLEDGE_BASE_DIR, "metadata.npy")
+METADATA_PATH = os.path.join(KNOWLEDGE_BASE_DIR, "metadata.npy")  # 旧格式，不再写入
+CHUNKS_PATH = os.path.join(KNOWLEDGE_BASE_DIR, "chunks.bin")
+CHUNK_OFFSETS_PATH = os.path.join(KNOWLEDGE_BASE_DIR, "chunk_offsets.npy")
+CHUNK_IDS_PATH = os.path.join(KNOWLEDGE_BASE_DIR, "chunk_ids.npy")
+BM25_PATH = os.path.join(KNOWLEDGE_BASE_DIR, "bm25.npz")
+# Flat索引的向量和ID，供检索进程内存映射
+VECTORS_PATH = os.path.join(KNOWLEDGE_BASE_DIR, "vectors.npy")
+VECTOR_IDS_PATH = os.path.join(KNOWLEDGE_BASE_DIR, "vector_ids.npy")
+VERSION_PATH = os.path.join(KNOWLEDGE_BASE_DIR, "index_version")
+# 增量索引清单：记录每个源文件的内容哈希和对应的文本块ID
+MANIFEST_PATH = os.path.join(KNOWLEDGE_BASE_DIR, "manifest.json")
+
+# 文本分块参数
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+
+# 向量化参数：每批写入一次检查点的文本块数，以及传给模型的批大小
+EMBED_BATCH_SIZE = 256
+ENCODE_BATCH_SIZE = 32
+# 向量索引类型及默认参数
+# flat: 精确的暴力搜索；ivf: 倒排索引（需训练聚类中心）；hnsw: 图索引；ivfpq: 倒排+乘积量化（压缩存储）
+INDEX_TYPES = ("flat", "ivf", "hnsw", "ivfpq")
+DEFAULT_INDEX_PARAMS = {
+    "nlist": 100,            # ivf/ivfpq 聚类中心数
+    "nprobe": 10,            # ivf/ivfpq 检索时访问的聚类数
+    "hnsw_m": 32,            # hnsw 每个节点的邻居数
+    "ef_construction": 200,  # hnsw 构建时的候选队列长度
+    "ef_search": 64,         # hnsw 检索时的候选队列长度
+    "pq_m": 16,              # ivfpq 子向量个数（需整除向量维度）
+    "pq_nbits": 8,           # ivfpq 每个子向量的编码位数
+}
+# 支持 remove_ids 的索引类型，其余类型在增量更新需要删除向量时退回全量重建
+REMOVABLE_INDEX_TYPES = ("flat", "ivf", "ivfpq")
+
+# 向量化检查点目录，进程中断后重新运行可从已完成的批次继续
+EMBED_CHECKPOINT_DIR = os.path.join(KNOWLEDGE_BASE_DIR, "embedding_checkpoint")
 
 # 配置镜像源以解决网络连接问题
 os.environ['HF_ENDPOINT'] = 'https://hf-mirror.com'
@@ -18,46 +66,60 @@ os.environ['HF_ENDPOINT'] = 'https://hf-mirror.com'
 MODEL_NAME = 'paraphrase-multilingual-MiniLM-L12-v2'
 LOCAL_MODEL_PATH = os.path.join(os.path.dirname(__file__), '..', 'local_models', MODEL_NAME)
 
-# 加载或下载文本嵌入模型
-try:
-    if os.path.exists(LOCAL_MODEL_PATH):
-        print(f"从本地路径加载模型: {LOCAL_MODEL_PATH}")
-        model = SentenceTransformer(LOCAL_MODEL_PATH)
-    else:
+class SimpleModel:
+    """无法加载SentenceTransformer时使用的TF-IDF备选方案"""
+    def __init__(self):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        self.vectorizer = TfidfVectorizer(max_features=384)  # 与SentenceTransformer的维度匹配
+        
+    def encode(self, texts, **kwargs):
+        if isinstance(texts, str):
+            texts = [texts]
+        # 对于简单的TF-IDF，我们只能处理已见过的词汇
+        # 这里只是一个示例，实际应用中需要更好的处理方式
+        return self.vectorizer.fit_transform(texts).toarray()
+
+def load_embedding_model():
+    """加载或下载文本嵌入模型，失败时退回TF-IDF"""
+    try:
+        from sentence_transformers import SentenceTransformer
+        if os.path.exists(LOCAL_MODEL_PATH):
+            print(f"从本地路径加载模型: {LOCAL_MODEL_PATH}")
+            return SentenceTransformer(LOCAL_MODEL_PATH)
         print(f"本地未找到模型，正在从 Hugging Face 下载: {MODEL_NAME}")
         model = SentenceTransformer(MODEL_NAME)
         print(f"模型下载完成，正在保存到: {LOCAL_MODEL_PATH}")
         os.makedirs(os.path.dirname(LOCAL_MODEL_PATH), exist_ok=True)
         model.save(LOCAL_MODEL_PATH)
         print("模型保存成功。")
-except Exception as e:
-    print(f"加载或下载模型时出错: {e}")
-    print("尝试使用 TF-IDF 作为备选方案...")
-    # 如果无法加载模型，使用一个简单的替代方案
-    from sklearn.feature_extraction.text import TfidfVectorizer
-    class SimpleModel:
-        def __init__(self):
-            self.vectorizer = TfidfVectorizer(max_features=384)  # 与SentenceTransformer的维度匹配
-            
-        def encode(self, texts):
-            if isinstance(texts, str):
-                texts = [texts]
-            # 对于简单的TF-IDF，我们只能处理已见过的词汇
-            # 这里只是一个示例，实际应用中需要更好的处理方式
-            return self.vectorizer.fit_transform(texts).toarray()
-    
-    model = SimpleModel()
+        return model
+    except Exception as e:
+        print(f"加载或下载模型时出错: {e}")
+        print("尝试使用 TF-IDF 作为备选方案...")
+        # 如果无法加载模型，使用一个简单的替代方案
+        return SimpleModel()
+
+# 只注册加载函数，真正向量化时才加载模型（基准测试等只导入本模块的脚本不必加载）
+model_registry.register("knowledge_base_builder_embedding", load_embedding_model)
+
+def get_model():
+    return model_registry.get("knowledge_base_builder_embedding")
 
 def load_texts():
     """加载所有源文本文件"""
-    text_files = glob.glob(os.path.join(SOURCES_DIR, "*.txt"))
-    texts = []
+    return [text for _, text, _ in load_source_files()]
+
+def load_source_files():
+    """加载所有源文本文件，返回按文件名排序的 (文件名, 文本, 内容哈希) 列表"""
+    text_files = sorted(glob.glob(os.path.join(SOURCES_DIR, "*.txt")))
+    sources = []
     for file_path in text_files:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            texts.append(f.read())
-    return texts
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        sources.append((os.path.basename(file_path), data.decode('utf-8'), hashlib.sha256(data).hexdigest()))
+    return sources
 
-def chunk_texts(texts, chunk_size=500, chunk_overlap=50):
+def chunk_texts(texts, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
     """将文本分割成块"""
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
@@ -69,47 +131,378 @@ def chunk_texts(texts, chunk_size=500, chunk_overlap=50):
         chunks.extend(text_splitter.split_text(text))
     return chunks
 
-def embed_texts(text_chunks):
-    """将文本块转换为向量"""
-    embeddings = model.encode(text_chunks)
-    return embeddings
-
-def save_vector_db(embeddings, metadata):
-    """保存向量数据库和元数据"""
-    # 保存向量数据库
-    dimension = embeddings.shape[1]
-    index = faiss.IndexFlatIP(dimension)  # 使用内积相似度
-    # 归一化向量
-    embeddings_float32 = embeddings.astype('float32')
+def iter_batches(text_chunks, batch_size):
+    """按批依次产出 (批次序号, 文本块列表)"""
+    for batch_index, start in enumerate(range(0, len(text_chunks), batch_size)):
+        yield batch_index, text_chunks[start:start + batch_size]
+
+def embedding_fingerprint(text_chunks, batch_size):
+    """检查点指纹：文本块内容、模型和批大小都相同时才能复用检查点"""
+    digest = hashlib.sha256()
+    digest.update(f"{MODEL_NAME}|{batch_size}|{len(text_chunks)}".encode('utf-8'))
+    for chunk in text_chunks:
+        digest.update(hashlib.sha256(chunk.encode('utf-8')).digest())
+    return digest.hexdigest()
+
+def prepare_checkpoint_dir(checkpoint_dir, fingerprint):
+    """准备检查点目录，指纹不一致时清空旧的检查点"""
+    fingerprint_path = os.path.join(checkpoint_dir, "fingerprint")
+    if os.path.exists(fingerprint_path):
+        with open(fingerprint_path, 'r', encoding='utf-8') as f:
+            if f.read().strip() == fingerprint:
+                return
+    shutil.rmtree(checkpoint_dir, ignore_errors=True)
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    with open(fingerprint_path, 'w', encoding='utf-8') as f:
+        f.write(fingerprint)
+
+def embed_texts(text_chunks, batch_size=EMBED_BATCH_SIZE, encode_batch_size=ENCODE_BATCH_SIZE,
+                num_processes=1, checkpoint_dir=None):
+    """
+    将文本块转换为向量。
+    文本块按 batch_size 分批向量化，每批完成后保存到 checkpoint_dir（为None时不保存检查点），
+    中断后重新运行会跳过已完成的批次；num_processes>1 时使用 encode_multi_process 在多个CPU进程上并行。
+    """
+    text_chunks = list(text_chunks)
+    if not text_chunks:
+        return np.zeros((0, 0), dtype='float32')
+
+    model = get_model()
+    if isinstance(model, SimpleModel):
+        # TF-IDF 备选方案必须在全部文本块上一次拟合词表：分批拟合时每批的特征空间互不相同，
+        # 列数也可能不一致，因此不分批，也不保存检查点
+        print(f"使用 TF-IDF 备选方案，一次性向量化 {len(text_chunks)} 个文本块")
+        return np.asarray(model.encode(text_chunks), dtype='float32')
+
+    if checkpoint_dir:
+        prepare_checkpoint_dir(checkpoint_dir, embedding_fingerprint(text_chunks, batch_size))
+
+    pool = None
+    if num_processes > 1 and hasattr(model, "start_multi_process_pool"):
+        pool = model.start_multi_process_pool(target_devices=["cpu"] * num_processes)
+        print(f"已启动 {num_processes} 个向量化进程")
+
+    batches = []
+    done = 0
+    resumed = 0
+    start_time = time.perf_counter()
+    try:
+        for batch_index, batch in iter_batches(text_chunks, batch_size):
+            batch_path = os.path.join(checkpoint_dir, f"batch_{batch_index:06d}.npy") if checkpoint_dir else None
+            if batch_path and os.path.exists(batch_path):
+                embeddings = np.load(batch_path, allow_pickle=False)
+                resumed += len(batch)
+            else:
+                if pool is not None:
+                    embeddings = model.encode_multi_process(batch, pool, batch_size=encode_batch_size)
+                else:
+                    embeddings = model.encode(batch, batch_size=encode_batch_size)
+                embeddings = np.asarray(embeddings, dtype='float32')
+                if batch_path:
+                    tmp_batch_path = batch_path + ".tmp.npy"
+                    np.save(tmp_batch_path, embeddings, allow_pickle=False)
+                    os.replace(tmp_batch_path, batch_path)
+            batches.append(embeddings)
+            done += len(batch)
+
+            elapsed = time.perf_counter() - start_time
+            rate = (done - resumed) / elapsed if elapsed > 0 else 0.0
+            print(f"已向量化 {done}/{len(text_chunks)} 个文本块，速度 {rate:.1f} 块/秒")
+    finally:
+        if pool is not None:
+            model.stop_multi_process_pool(pool)
+
+    elapsed = time.perf_counter() - start_time
+    encoded = done - resumed
+    print(f"向量化耗时 {elapsed:.2f} 秒，新向量化 {encoded} 个文本块"
+          f"（{encoded / elapsed if elapsed > 0 else 0.0:.1f} 块/秒），从检查点恢复 {resumed} 个")
+
+    # 全部完成后删除检查点
+    if checkpoint_dir:
+        shutil.rmtree(checkpoint_dir, ignore_errors=True)
+    return np.vstack(batches)
+
+def normalize_embeddings(embeddings):
+    """转换为float32并做L2归一化，使内积等价于余弦相似度"""
+    embeddings_float32 = np.ascontiguousarray(embeddings, dtype='float32')
     faiss.normalize_L2(embeddings_float32)
-    index.add(embeddings_float32)
-    faiss.write_index(index, VECTOR_DB_PATH)
+    return embeddings_float32
+
+def write_index(index):
+    """
+    先写入临时文件再原子替换，避免检索进程读到写了一半的文件。
+    Flat索引另外保存可内存映射的向量文件；FAISS索引文件仍然保留，供增量更新读取。
+    """
+    tmp_index_path = VECTOR_DB_PATH + ".tmp"
+    faiss.write_index(index, tmp_index_path)
+    write_flat_vectors(index, VECTORS_PATH, VECTOR_IDS_PATH)
+    os.replace(tmp_index_path, VECTOR_DB_PATH)
+
+def write_metadata(metadata, ids):
+    """保存元数据：文本块写入偏移量索引的UTF-8文件，检索时按需读取；同时重建BM25倒排索引"""
+    write_chunk_store(metadata, CHUNKS_PATH, CHUNK_OFFSETS_PATH, ids=ids, ids_path=CHUNK_IDS_PATH)
+    # BM25的IDF和平均文档长度依赖全部文本块，因此每次都基于完整文本块重建
+    write_bm25_index(metadata, ids, BM25_PATH)
+    # 删除旧格式的pickle元数据，避免与新索引不一致
+    if os.path.exists(METADATA_PATH):
+        os.remove(METADATA_PATH)
+
+def resolve_index_params(index_params=None):
+    """合并默认索引参数和自定义参数"""
+    params = dict(DEFAULT_INDEX_PARAMS)
+    if index_params:
+        unknown = set(index_params) - set(DEFAULT_INDEX_PARAMS)
+        if unknown:
+            raise ValueError(f"未知的索引参数: {', '.join(sorted(unknown))}")
+        params.update(index_params)
+    return params
+
+def build_index(index_type, embeddings, index_params=None):
+    """
+    创建（必要时训练）一个空的内积索引，支持 add_with_ids。
+    embeddings 为已归一化的float32向量，IVF类索引用它训练聚类中心。
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"不支持的索引类型: {index_type}，可选: {', '.join(INDEX_TYPES)}")
+    params = resolve_index_params(index_params)
+    n, dimension = embeddings.shape
+
+    if index_type == "flat":
+        return faiss.IndexIDMap(faiss.IndexFlatIP(dimension))
+
+    if index_type == "hnsw":
+        hnsw = faiss.IndexHNSWFlat(dimension, params["hnsw_m"], faiss.METRIC_INNER_PRODUCT)
+        hnsw.hnsw.efConstruction = params["ef_construction"]
+        hnsw.hnsw.efSearch = params["ef_search"]
+        return faiss.IndexIDMap(hnsw)
+
+    # IVF类索引：聚类中心数不能超过训练向量数
+    nlist = max(1, min(params["nlist"], n))
+    quantizer = faiss.IndexFlatIP(dimension)
+    if index_type == "ivf":
+        index = faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+    else:
+        if dimension % params["pq_m"] != 0:
+            raise ValueError(f"pq_m={params['pq_m']} 不能整除向量维度 {dimension}")
+        if n < 2 ** params["pq_nbits"]:
+            raise ValueError(f"IVF-PQ 至少需要 {2 ** params['pq_nbits']} 个训练向量，当前只有 {n} 个")
+        index = faiss.IndexIVFPQ(quantizer, dimension, nlist, params["pq_m"], params["pq_nbits"],
+                                 faiss.METRIC_INNER_PRODUCT)
+    index.train(embeddings)
+    index.nprobe = min(params["nprobe"], nlist)
+    return index
+
+def save_vector_db(embeddings, metadata, ids=None, index_type="flat", index_params=None):
+    """保存向量数据库和元数据，ids 为每个向量对应的文本块ID（默认为 0..n-1）"""
+    if ids is None:
+        ids = np.arange(len(metadata), dtype='int64')
+    ids = np.asarray(ids, dtype='int64')
+
+    # 保存向量数据库，索引均支持按ID添加，以便增量更新
+    vectors = normalize_embeddings(embeddings)
+    index = build_index(index_type, vectors, index_params)
+    index.add_with_ids(vectors, ids)
+    write_index(index)
     
-    # 保存元数据
-    np.save(METADATA_PATH, metadata)
+    write_metadata(metadata, ids)
+
+    # 最后更新版本戳，通知正在运行的检索进程重新加载
+    write_version_stamp()
+
+def write_version_stamp():
+    """写入新的知识库版本戳"""
+    tmp_version_path = VERSION_PATH + ".tmp"
+    with open(tmp_version_path, 'w', encoding='utf-8') as f:
+        f.write(str(time.time_ns()))
+    os.replace(tmp_version_path, VERSION_PATH)
 
-def process_knowledge_base():
-    """处理知识库：加载文本、分割、向量化并保存"""
+def index_settings(index_type="flat", index_params=None):
+    """影响向量结果的配置，任何一项变化都需要全量重建"""
+    return {
+        "model": MODEL_NAME,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "index_type": index_type,
+        "index_params": resolve_index_params(index_params),
+    }
+
+def load_manifest():
+    """读取增量索引清单，不存在或损坏时返回None"""
+    if not os.path.exists(MANIFEST_PATH):
+        return None
+    try:
+        with open(MANIFEST_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"读取索引清单失败: {e}")
+        return None
+
+def save_manifest(files, next_id, index_type="flat", index_params=None):
+    """保存增量索引清单"""
+    manifest = {
+        "settings": index_settings(index_type, index_params),
+        "next_id": int(next_id),
+        "files": files,
+    }
+    tmp_manifest_path = MANIFEST_PATH + ".tmp"
+    with open(tmp_manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_manifest_path, MANIFEST_PATH)
+
+def process_knowledge_base(batch_size=EMBED_BATCH_SIZE, num_processes=1, index_type="flat", index_params=None):
+    """处理知识库：加载文本、分割、向量化并保存（全量重建）"""
     print("正在加载文本...")
-    texts = load_texts()
-    if not texts:
+    sources = load_source_files()
+    if not sources:
         print("未找到源文本文件，请将文本文件放在 knowledge_base/sources 目录下")
         return
     
     print("正在分割文本...")
-    chunks = chunk_texts(texts)
+    chunks = []
+    files = {}
+    for name, text, content_hash in sources:
+        file_chunks = chunk_texts([text])
+        files[name] = {
+            "hash": content_hash,
+            "chunk_ids": list(range(len(chunks), len(chunks) + len(file_chunks))),
+        }
+        chunks.extend(file_chunks)
     print(f"共生成 {len(chunks)} 个文本块")
     
     print("正在向量化文本...")
-    embeddings = embed_texts(chunks)
+    embeddings = embed_texts(chunks, batch_size=batch_size, num_processes=num_processes,
+                             checkpoint_dir=EMBED_CHECKPOINT_DIR)
     print(f"向量化完成，向量维度: {embeddings.shape}")
     
     # 创建元数据
-    metadata = np.array(chunks)
+    metadata = list(chunks)
     
     print("正在保存向量数据库...")
-    save_vector_db(embeddings, metadata)
-    print("知识库处理完成！")
+    save_vector_db(embeddings, metadata, index_type=index_type, index_params=index_params)
+    save_manifest(files, next_id=len(chunks), index_type=index_type, index_params=index_params)
+    print(f"知识库处理完成！索引类型: {index_type}")
+
+def update_knowledge_base(batch_size=EMBED_BATCH_SIZE, num_processes=1, index_type=None, index_params=None):
+    """
+    增量更新知识库：只向量化新增或内容变化的源文件，
+    并从索引中删除已修改或已删除文件的旧向量。
+    index_type 为None时沿用清单中记录的索引类型和参数。
+    没有可用的清单（首次运行、旧格式索引或配置变化）时退回全量重建。
+    返回本次变化的报告字典。
+    """
+    manifest = load_manifest()
+    if index_type is None:
+        settings = manifest.get("settings", {}) if manifest else {}
+        index_type = settings.get("index_type", "flat")
+        if index_params is None:
+            index_params = settings.get("index_params")
+
+    def full_rebuild(reason):
+        print(f"{reason}，执行全量重建...")
+        process_knowledge_base(batch_size=batch_size, num_processes=num_processes,
+                               index_type=index_type, index_params=index_params)
+
+    if (not manifest or manifest.get("settings") != index_settings(index_type, index_params)
+            or not os.path.exists(VECTOR_DB_PATH) or not os.path.exists(CHUNK_IDS_PATH)):
+        full_rebuild("未找到可用的索引清单或索引配置已变化")
+        return None
+
+    sources = load_source_files()
+    old_files = manifest["files"]
+    current_names = {name for name, _, _ in sources}
+
+    added = [name for name, _, _ in sources if name not in old_files]
+    changed = [name for name, _, content_hash in sources
+               if name in old_files and old_files[name]["hash"] != content_hash]
+    removed = sorted(name for name in old_files if name not in current_names)
+    unchanged = len(sources) - len(added) - len(changed)
+
+    report = {
+        "added": added,
+        "changed": changed,
+        "removed": removed,
+        "unchanged": unchanged,
+        "chunks_added": 0,
+        "chunks_removed": 0,
+    }
+    if not added and not changed and not removed:
+        print(f"知识库没有变化（共 {unchanged} 个源文件）")
+        return report
+
+    # 删除已修改和已删除文件的旧向量
+    stale_ids = [chunk_id for name in changed + removed for chunk_id in old_files[name]["chunk_ids"]]
+    if stale_ids and index_type not in REMOVABLE_INDEX_TYPES:
+        full_rebuild(f"{index_type} 索引不支持删除向量")
+        return None
+
+    index = faiss.read_index(VECTOR_DB_PATH)
+    store = ChunkStore(CHUNKS_PATH, CHUNK_OFFSETS_PATH, CHUNK_IDS_PATH)
+
+    if stale_ids:
+        index.remove_ids(np.asarray(stale_ids, dtype='int64'))
+    report["chunks_removed"] = len(stale_ids)
+
+    # 分割并向量化新增和修改的文件
+    files = {name: info for name, info in old_files.items() if name in current_names}
+    next_id = manifest["next_id"]
+    new_chunks = []
+    new_ids = []
+    for name, text, content_hash in sources:
+        if name not in added and name not in changed:
+            continue
+        file_chunks = chunk_texts([text])
+        chunk_ids = list(range(next_id, next_id + len(file_chunks)))
+        next_id += len(file_chunks)
+        files[name] = {"hash": content_hash, "chunk_ids": chunk_ids}
+        new_chunks.extend(file_chunks)
+        new_ids.extend(chunk_ids)
+
+    if new_chunks:
+        print(f"正在向量化 {len(new_chunks)} 个新文本块...")
+        embeddings = embed_texts(new_chunks, batch_size=batch_size, num_processes=num_processes,
+                                 checkpoint_dir=EMBED_CHECKPOINT_DIR)
+        index.add_with_ids(normalize_embeddings(embeddings), np.asarray(new_ids, dtype='int64'))
+    report["chunks_added"] = len(new_chunks)
+
+    # 保留未变化文件的文本块，与新文本块一起重写文本块存储
+    stale_id_set = set(stale_ids)
+    kept = [(chunk_id, text) for chunk_id, text in store.items() if chunk_id not in stale_id_set]
+    store.close()
+    metadata = [text for _, text in kept] + new_chunks
+    ids = [chunk_id for chunk_id, _ in kept] + new_ids
+
+    print("正在保存向量数据库...")
+    write_index(index)
+    write_metadata(metadata, ids)
+    save_manifest(files, next_id, index_type=index_type, index_params=index_params)
+    write_version_stamp()
+
+    print(f"增量更新完成: 新增文件 {len(added)} 个，修改 {len(changed)} 个，删除 {len(removed)} 个，"
+          f"未变化 {unchanged} 个；新增文本块 {report['chunks_added']} 个，删除 {report['chunks_removed']} 个")
+    for label, names in (("新增", added), ("修改", changed), ("删除", removed)):
+        for name in names:
+            print(f"  [{label}] {name}")
+    return report
 
 if __name__ == "__main__":
-    process_knowledge_base()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="处理知识库源文本并生成向量数据库")
+    parser.add_argument("--incremental", action="store_true",
+                        help="只处理新增、修改和删除的源文件")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE,
+                        help="每批向量化（并保存检查点）的文本块数")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="并行向量化的CPU进程数")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default=None,
+                        help="向量索引类型（默认flat；增量模式下默认沿用已有索引的类型）")
+    for name, default in DEFAULT_INDEX_PARAMS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=None,
+                            help=f"索引参数 {name}（默认 {default}）")
+    args = parser.parse_args()
+    index_params = {name: getattr(args, name) for name in DEFAULT_INDEX_PARAMS
+                    if getattr(args, name) is not None} or None
+    if args.incremental:
+        update_knowledge_base(batch_size=args.batch_size, num_processes=args.processes,
+                              index_type=args.index_type, index_params=index_params)
+    else:
+        process_knowledge_base(batch_size=args.batch_size, num_processes=args.processes,
+                               index_type=args.index_type or "flat", index_params=index_params)
\ No newline at end of file
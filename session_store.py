@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+服务器端的 Flask 会话存储：会话数据保存在数据库的 web_session 表中，cookie 只保存随机生成的会话ID。
+聊天记录本身以数据库中的 ChatMessage 为准，不再放入会话。
+"""
+
+import re
+import time
+import secrets
+from datetime import datetime
+from flask.sessions import SessionInterface, SessionMixin, session_json_serializer
+from werkzeug.datastructures import CallbackDict
+import database
+from models import WebSession
+
+# 会话ID的随机字节数（编码后约43个字符）
+SESSION_ID_BYTES = 32
+# 清理过期会话记录的最小间隔（秒）
+PURGE_INTERVAL = 3600
+
+_SESSION_ID_RE = re.compile(r"^[A-Za-z0-9_-]{32,64}$")
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """只在服务器端保存的会话，sid 是写入 cookie 的会话ID"""
+
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+            self.accessed = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+        self.accessed = False
+
+    def __getitem__(self, key):
+        self.accessed = True
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self.accessed = True
+        return super().get(key, default)
+
+    def setdefault(self, key, default=None):
+        self.accessed = True
+        return super().setdefault(key, default)
+
+
+class DatabaseSessionInterface(SessionInterface):
+    """
+    基于数据库的会话接口。只有会话内容变化时才写入数据库；
+    剩余有效期不足一半时顺延过期时间，并定期删除过期的记录。
+    """
+
+    serializer = session_json_serializer
+
+    def __init__(self):
+        self._last_purge = float("-inf")
+
+    @staticmethod
+    def _new_sid() -> str:
+        return secrets.token_urlsafe(SESSION_ID_BYTES)
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if not sid or not _SESSION_ID_RE.match(sid):
+            return ServerSideSession(sid=self._new_sid(), new=True)
+
+        db_session = database.SessionLocal()
+        try:
+            record = db_session.get(WebSession, sid)
+            now = datetime.utcnow()
+            if record is None or record.expires_at <= now:
+                # 过期或不存在的会话ID不再使用，防止会话固定
+                return ServerSideSession(sid=self._new_sid(), new=True)
+            try:
+                data = self.serializer.loads(record.data)
+            except ValueError:
+                return ServerSideSession(sid=self._new_sid(), new=True)
+            session = ServerSideSession(data, sid=sid)
+            if record.expires_at - now < app.permanent_session_lifetime / 2:
+                session.modified = True  # 保存时顺延过期时间
+            return session
+        finally:
+            db_session.close()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if session.accessed:
+            response.vary.add("Cookie")
+
+        # 会话被清空时删除数据库记录和 cookie；从未写入过的空会话不需要任何操作
+        if not session:
+            if session.modified and not session.new:
+                self._delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path, secure=secure,
+                                       samesite=samesite, httponly=httponly)
+                response.vary.add("Cookie")
+            return
+
+        if session.modified or session.new:
+            self._store(session.sid, self.serializer.dumps(dict(session)),
+                        datetime.utcnow() + app.permanent_session_lifetime)
+        elif not self.should_set_cookie(app, session):
+            return
+
+        response.set_cookie(name, session.sid, expires=self.get_expiration_time(app, session),
+                            httponly=httponly, domain=domain, path=path, secure=secure, samesite=samesite)
+        response.vary.add("Cookie")
+
+    def _store(self, sid: str, data: str, expires_at: datetime):
+        db_session = database.SessionLocal()
+        try:
+            db_session.merge(WebSession(id=sid, data=data, expires_at=expires_at))
+            db_session.commit()
+        finally:
+            db_session.close()
+        self._purge_expired()
+
+    def _delete(self, sid: str):
+        db_session = database.SessionLocal()
+        try:
+            db_session.query(WebSession).filter_by(id=sid).delete()
+            db_session.commit()
+        finally:
+            db_session.close()
+
+    def _purge_expired(self):
+        now = time.monotonic()
+        if now - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        db_session = database.SessionLocal()
+        try:
+            deleted = db_session.query(WebSession).filter(WebSession.expires_at <= datetime.utcnow()).delete()
+            db_session.commit()
+            if deleted:
+                print(f"已清理 {deleted} 个过期的会话")
+        finally:
+            db_session.close()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+测试Agent进程级缓存（agent_registry）
+"""
+
+import sys
+import os
+import unittest
+from concurrent.futures import Future
+from unittest.mock import patch, MagicMock
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent import DogAgent, agent_registry, format_memory_info
+from tools.long_term_memory_tool import UpdateLongTermMemoryTool, current_db_session
+
+
+def _fake_executor(**kwargs):
+    """模拟AgentExecutor，只保留工具列表"""
+    executor = MagicMock()
+    executor.tools = kwargs['tools']
+    executor.invoke.return_value = {'output': '汪！'}
+    return executor
+
+
+def _fake_emotion_recognition(text):
+    """模拟本地情绪识别，直接返回已完成的Future"""
+    future = Future()
+    future.set_result({"label": "Negative", "score": 0.9})
+    return future
+
+
+class TestAgentRegistry(unittest.TestCase):
+    def setUp(self):
+        agent_registry.clear()
+        self.patchers = [
+            patch('agent.build_llm', side_effect=lambda provider, model: MagicMock()),
+            patch('agent.create_openai_tools_agent', return_value=MagicMock()),
+            patch('agent.AgentExecutor', side_effect=_fake_executor),
+            patch('agent.start_emotion_recognition', side_effect=_fake_emotion_recognition),
+        ]
+        for p in self.patchers:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patchers:
+            p.stop()
+        agent_registry.clear()
+
+    def test_executor_reused_for_same_config(self):
+        """相同配置的Agent应复用LLM客户端和AgentExecutor"""
+        agent1 = DogAgent(model_provider='deepseek', model_name=None, max_iterations=5)
+        agent2 = DogAgent(model_provider='deepseek', model_name='deepseek-chat', max_iterations=5,
+                          chat_history=['上一轮'])
+        self.assertIs(agent1.llm, agent2.llm)
+        self.assertIs(agent1.agent_executor, agent2.agent_executor)
+        self.assertEqual(agent2.chat_history, ['上一轮'])
+
+    def test_executor_separated_by_config(self):
+        """不同最大迭代次数或是否启用记忆工具应使用不同的AgentExecutor"""
+        agent1 = DogAgent(model_provider='deepseek', max_iterations=5)
+        agent2 = DogAgent(model_provider='deepseek', max_iterations=6)
+        agent3 = DogAgent(model_provider='deepseek', max_iterations=5, db_session=MagicMock())
+        self.assertIs(agent1.llm, agent2.llm)
+        self.assertIsNot(agent1.agent_executor, agent2.agent_executor)
+        self.assertIsNot(agent1.agent_executor, agent3.agent_executor)
+        self.assertIn('update_long_term_memory', [tool.name for tool in agent3.tools])
+        self.assertNotIn('update_long_term_memory', [tool.name for tool in agent1.tools])
+
+    def test_chat_passes_request_state(self):
+        """每次调用应传入本次请求的记忆信息并绑定数据库会话"""
+        db_session = MagicMock()
+        seen_sessions = []
+        memory_context = {'long_term': {'profile_summary': '喜欢读书和散步的用户'}}
+        agent = DogAgent(model_provider='deepseek', max_iterations=5,
+                         memory_context=memory_context, db_session=db_session)
+        agent.agent_executor.invoke.side_effect = (
+            lambda inputs: seen_sessions.append(current_db_session.get()) or {'output': '汪！'}
+        )
+
+        self.assertEqual(agent.chat('你好'), '汪！')
+        inputs = agent.agent_executor.invoke.call_args[0][0]
+        self.assertEqual(inputs['input'], '你好')
+        self.assertIn('喜欢读书和散步的用户', inputs['memory_info'])
+        self.assertEqual(seen_sessions, [db_session])
+        self.assertIsNone(current_db_session.get())
+
+    def test_pipeline_mode_injects_emotion(self):
+        """流水线模式下情绪识别结果写入prompt，且不提供情绪识别工具"""
+        agent = DogAgent(model_provider='deepseek', max_iterations=5, emotion_mode='pipeline')
+        tool_agent = DogAgent(model_provider='deepseek', max_iterations=5, emotion_mode='tool')
+        self.assertNotIn('HF_Emotion_Recognition', [tool.name for tool in agent.tools])
+        self.assertIn('HF_Emotion_Recognition', [tool.name for tool in tool_agent.tools])
+        self.assertIsNot(agent.agent_executor, tool_agent.agent_executor)
+
+        agent.chat('我好难过')
+        inputs = agent.agent_executor.invoke.call_args[0][0]
+        self.assertIn('情感类别: 消极', inputs['emotion_info'])
+        self.assertIn('不要再调用情绪识别工具', inputs['emotion_instruction'])
+
+        tool_agent.chat('我好难过')
+        inputs = tool_agent.agent_executor.invoke.call_args[0][0]
+        self.assertEqual(inputs['emotion_info'], '')
+
+    def test_pipeline_mode_without_emotion_result(self):
+        """情绪识别失败时仍应调用Agent，并提示模型自行判断"""
+        failed = Future()
+        failed.set_exception(RuntimeError("模型加载失败"))
+        agent = DogAgent(model_provider='deepseek', max_iterations=5, emotion_mode='pipeline',
+                         emotion_future=failed)
+        self.assertEqual(agent.chat('你好'), '汪！')
+        inputs = agent.agent_executor.invoke.call_args[0][0]
+        self.assertIn('暂不可用', inputs['emotion_info'])
+
+    def test_format_memory_info_empty(self):
+        """没有长期记忆时不应生成用户信息段落"""
+        self.assertEqual(format_memory_info({}), "")
+        self.assertEqual(format_memory_info({'long_term': {}}), "")
+
+    def test_memory_tool_without_session(self):
+        """未绑定数据库会话时工具应返回错误提示"""
+        tool = UpdateLongTermMemoryTool()
+        self.assertIn("未提供数据库会话", tool._run(user_id='u1', profile_summary='测试'))
+
+
+if __name__ == '__main__':
+    unittest.main()
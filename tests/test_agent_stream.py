@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+测试DogAgent的流式输出接口
+"""
+
+import sys
+import os
+import unittest
+from concurrent.futures import Future
+from unittest.mock import patch, MagicMock
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from langchain_core.messages import AIMessageChunk
+from langchain_core.outputs import ChatGenerationChunk
+from agent import DogAgent, agent_registry
+
+
+def _fake_executor(**kwargs):
+    """模拟AgentExecutor：通过回调依次产生工具状态和token"""
+    executor = MagicMock()
+    executor.tools = kwargs['tools']
+
+    def invoke(inputs, config=None):
+        handler = config['callbacks'][0]
+        handler.on_tool_start({"name": "HF_Emotion_Recognition"}, inputs['input'])
+        handler.on_tool_end("情感类别: 中性")
+        handler.on_llm_new_token("")
+        for token in ["汪", "！", "你好"]:
+            handler.on_llm_new_token(token)
+        return {'output': '汪！你好'}
+
+    executor.invoke.side_effect = invoke
+    return executor
+
+
+def _fake_emotion_recognition(text):
+    """模拟本地情绪识别，直接返回已完成的Future"""
+    future = Future()
+    future.set_result({"label": "Negative", "score": 0.9})
+    return future
+
+
+class TestAgentStream(unittest.TestCase):
+    def setUp(self):
+        agent_registry.clear()
+        self.patchers = [
+            patch('agent.build_llm', side_effect=lambda provider, model: MagicMock()),
+            patch('agent.create_openai_tools_agent', return_value=MagicMock()),
+            patch('agent.AgentExecutor', side_effect=_fake_executor),
+            patch('agent.start_emotion_recognition', side_effect=_fake_emotion_recognition),
+        ]
+        for p in self.patchers:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patchers:
+            p.stop()
+        agent_registry.clear()
+
+    def test_stream_events_in_order(self):
+        """流式接口应按顺序产出状态、token和最终回复"""
+        agent = DogAgent(model_provider='deepseek', max_iterations=5)
+        events = list(agent.stream('你好'))
+
+        self.assertEqual(events[0], {"type": "status", "content": "[正在调用工具: HF_Emotion_Recognition]"})
+        self.assertEqual(events[1], {"type": "status", "content": "[工具调用完成]"})
+        tokens = [e['content'] for e in events if e['type'] == 'output']
+        self.assertEqual(tokens, ["汪", "！", "你好"])
+        self.assertEqual(events[-1], {"type": "end", "content": "汪！你好"})
+
+    def test_stream_without_tokens_outputs_full_response(self):
+        """没有产生token时应一次性输出完整回复"""
+        agent = DogAgent(model_provider='deepseek', max_iterations=6)
+        agent.agent_executor.invoke.side_effect = lambda inputs, config=None: {'output': 'Agent stopped'}
+        events = list(agent.stream('你好'))
+        self.assertEqual(events, [
+            {"type": "output", "content": "Agent stopped"},
+            {"type": "end", "content": "Agent stopped"},
+        ])
+
+    def test_stream_retracts_tool_call_turn_text(self):
+        """发起工具调用的LLM调用输出的文字应被撤回，最终显示内容与保存的回复一致"""
+        def invoke(inputs, config=None):
+            handler = config['callbacks'][0]
+            handler.on_llm_new_token("让我翻翻书…", chunk=ChatGenerationChunk(
+                message=AIMessageChunk(content="让我翻翻书…")), run_id="run-1")
+            handler.on_llm_new_token("", chunk=ChatGenerationChunk(message=AIMessageChunk(
+                content="", tool_call_chunks=[{"name": "Knowledge_Base_Search", "args": "", "id": "call_1", "index": 0}])),
+                run_id="run-1")
+            handler.on_llm_new_token("{}", chunk=ChatGenerationChunk(message=AIMessageChunk(
+                content="", tool_call_chunks=[{"name": None, "args": "{}", "id": None, "index": 0}])),
+                run_id="run-1")
+            for token in ["汪", "！"]:
+                handler.on_llm_new_token(token, chunk=ChatGenerationChunk(
+                    message=AIMessageChunk(content=token)), run_id="run-2")
+            return {'output': '汪！'}
+
+        agent = DogAgent(model_provider='deepseek', max_iterations=8)
+        agent.agent_executor.invoke.side_effect = invoke
+        events = list(agent.stream('你好'))
+        self.assertEqual(events, [
+            {"type": "output", "content": "让我翻翻书…"},
+            {"type": "replace", "content": ""},
+            {"type": "output", "content": "汪"},
+            {"type": "output", "content": "！"},
+            {"type": "end", "content": "汪！"},
+        ])
+
+    def test_stream_replaces_text_that_differs_from_output(self):
+        """已输出的文字与最终回复不一致时（例如达到最大迭代次数）应整体替换为最终回复"""
+        def invoke(inputs, config=None):
+            handler = config['callbacks'][0]
+            handler.on_llm_new_token("汪", run_id="run-1")
+            return {'output': 'Agent stopped due to max iterations.'}
+
+        agent = DogAgent(model_provider='deepseek', max_iterations=9)
+        agent.agent_executor.invoke.side_effect = invoke
+        events = list(agent.stream('你好'))
+        self.assertEqual(events, [
+            {"type": "output", "content": "汪"},
+            {"type": "replace", "content": "Agent stopped due to max iterations."},
+            {"type": "end", "content": "Agent stopped due to max iterations."},
+        ])
+
+    def test_stream_reraises_errors(self):
+        """Agent出错时生成器应重新抛出异常"""
+        agent = DogAgent(model_provider='deepseek', max_iterations=7)
+        agent.agent_executor.invoke.side_effect = RuntimeError("boom")
+        with self.assertRaises(RuntimeError):
+            list(agent.stream('你好'))
+
+
+if __name__ == '__main__':
+    unittest.main()
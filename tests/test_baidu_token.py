@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+测试百度access_token缓存与复用
+"""
+
+import sys
+import os
+import time
+import threading
+import unittest
+from unittest.mock import patch, MagicMock
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import emotion_recognition
+from tools.emotion_recognition import BaiduTokenManager, BaiduTokenError, request_emotion
+from tools.emotion_cache import EmotionCache
+
+
+def _response(body, ok=True):
+    resp = MagicMock()
+    resp.ok = ok
+    resp.json.return_value = body
+    resp.text = str(body)
+    return resp
+
+
+class FakeSession:
+    """记录请求的模拟HTTP会话：token接口依次返回 token-1、token-2 ...，情绪接口返回 emotion_bodies 中的内容"""
+
+    def __init__(self, expires_in=2592000, emotion_bodies=None, token_delay=0.0):
+        self.expires_in = expires_in
+        self.emotion_bodies = list(emotion_bodies or [])
+        self.token_delay = token_delay
+        self.token_calls = 0
+        self.emotion_tokens = []
+        self._lock = threading.Lock()
+
+    def post(self, url, params=None, **kwargs):
+        if url == emotion_recognition.BAIDU_TOKEN_URL:
+            time.sleep(self.token_delay)
+            with self._lock:
+                self.token_calls += 1
+                token = f"token-{self.token_calls}"
+            return _response({"access_token": token, "expires_in": self.expires_in})
+        self.emotion_tokens.append(params["access_token"])
+        body = self.emotion_bodies.pop(0) if self.emotion_bodies else {"items": []}
+        return _response(body)
+
+
+class TestBaiduTokenManager(unittest.TestCase):
+    def test_token_reused_until_expiry(self):
+        """有效期内复用token，临近过期时刷新"""
+        session = FakeSession(expires_in=2592000)
+        manager = BaiduTokenManager("k", "s", session=session)
+        self.assertEqual(manager.get_token(), "token-1")
+        self.assertEqual(manager.get_token(), "token-1")
+        self.assertEqual(session.token_calls, 1)
+
+        # 有效期短于提前刷新的余量时，每次都视为过期
+        session = FakeSession(expires_in=100)
+        manager = BaiduTokenManager("k", "s", session=session, refresh_margin=300)
+        manager.get_token()
+        self.assertEqual(manager.get_token(), "token-2")
+
+    def test_concurrent_refresh_once(self):
+        """多个线程同时发现过期时只刷新一次"""
+        session = FakeSession(token_delay=0.05)
+        manager = BaiduTokenManager("k", "s", session=session)
+        tokens = []
+        threads = [threading.Thread(target=lambda: tokens.append(manager.get_token())) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(session.token_calls, 1)
+        self.assertEqual(set(tokens), {"token-1"})
+
+    def test_token_error(self):
+        session = MagicMock()
+        session.post.return_value = _response({"error": "invalid_client"})
+        manager = BaiduTokenManager("k", "s", session=session)
+        with self.assertRaises(BaiduTokenError):
+            manager.get_token()
+
+    def test_invalid_token_retried_once(self):
+        """百度返回token无效时刷新token并重试一次"""
+        session = FakeSession(emotion_bodies=[{"error_code": 110, "error_msg": "Access token invalid"},
+                                              {"items": [{"label": "neutral", "prob": 0.6}]}])
+        manager = BaiduTokenManager("k", "s", session=session)
+        resp = request_emotion(manager, "你好")
+        self.assertEqual(resp.json()["items"][0]["label"], "neutral")
+        self.assertEqual(session.emotion_tokens, ["token-1", "token-2"])
+
+
+class TestEmotionToolTokenReuse(unittest.TestCase):
+    def test_single_request_per_call(self):
+        """连续调用工具时只请求一次token，之后每次只发送情绪识别请求"""
+        session = FakeSession(emotion_bodies=[{"items": [{"label": "neutral", "prob": 0.5}]},
+                                              {"items": [{"label": "optimistic", "prob": 0.9}]}])
+        manager = BaiduTokenManager("k", "s", session=session)
+        with patch.dict(os.environ, {"BAIDU_API_KEY": "k", "BAIDU_SECRET_KEY": "s"}), \
+                patch.object(emotion_recognition, 'emotion_cache', EmotionCache()), \
+                patch.object(emotion_recognition, 'get_token_manager', return_value=manager):
+            emotion_recognition.emotion_recognition_tool.invoke("今天有点忙")
+            result = emotion_recognition.emotion_recognition_tool.invoke("明天放假")
+        self.assertIn("正向", result)
+        self.assertEqual(session.token_calls, 1)
+        self.assertEqual(len(session.emotion_tokens), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+测试知识库BM25倒排索引与混合检索
+"""
+
+import sys
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.bm25_index import BM25Index, write_bm25_index, reciprocal_rank_fusion, tokenize
+
+
+CHUNKS = [
+    "认知行为疗法（CBT）通过改变不合理的想法来改善情绪。",
+    "正念冥想可以帮助人们专注当下，缓解焦虑。",
+    "舍曲林是一种常用的抗抑郁药物，需要遵医嘱服用。",
+    "良好的睡眠卫生包括规律作息和睡前避免使用手机。",
+]
+IDS = [10, 11, 15, 20]
+
+
+class TestBM25Index(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "bm25.npz")
+        write_bm25_index(CHUNKS, IDS, self.path)
+        self.index = BM25Index(self.path)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_tokenize(self):
+        """分词应去掉标点并统一大小写和全角字符"""
+        tokens = tokenize("ＣＢＴ有用吗？")
+        self.assertIn("cbt", tokens)
+        self.assertNotIn("？", tokens)
+        self.assertNotIn("?", tokens)
+
+    def test_exact_terms(self):
+        """专有名词应能通过关键词精确命中"""
+        self.assertEqual(self.index.search("cbt", 1)[0][0], 10)
+        self.assertEqual(self.index.search("舍曲林的副作用", 1)[0][0], 15)
+
+    def test_ranking_and_unknown_terms(self):
+        """多个词项命中的文本块得分更高，未知词项返回空结果"""
+        results = self.index.search("睡眠 手机", 4)
+        self.assertEqual(results[0][0], 20)
+        self.assertEqual(self.index.search("量子力学", 3), [])
+
+    def test_index_is_not_pickled(self):
+        """索引文件应可在禁止pickle的情况下加载"""
+        with np.load(self.path, allow_pickle=False) as data:
+            self.assertEqual(len(data["term_offsets"]), len(data["terms"]) + 1)
+
+    def test_reciprocal_rank_fusion(self):
+        """两个列表都靠前的结果应排在最前"""
+        fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1, 4]])
+        self.assertEqual(fused[0], 1)
+        self.assertEqual(set(fused), {1, 2, 3, 4})
+
+
+class TestHybridSearch(unittest.TestCase):
+    def test_keyword_hit_is_fused_into_results(self):
+        """向量检索遗漏的关键词命中结果应通过融合进入最终结果"""
+        from tools import knowledge_base_search as kb
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "bm25.npz")
+            write_bm25_index(CHUNKS, IDS, path)
+            metadata = MagicMock()
+            metadata.__len__.return_value = 0
+            texts = dict(zip(IDS, CHUNKS))
+            index = MagicMock()
+            # 向量检索只返回与“焦虑”相关的文本块
+            index.search.return_value = (np.array([[0.9, 0.5]]), np.array([[11, 20]]))
+            snapshot = kb.VectorDBSnapshot("hybrid", index, metadata, BM25Index(path))
+            fake_model = MagicMock()
+            fake_model.encode.side_effect = lambda items: np.ones((len(items), 4), dtype='float32')
+            kb.search_result_cache.clear()
+            with patch.object(kb, 'get_model', return_value=fake_model), \
+                    patch.object(kb.vector_db_manager, 'get', return_value=snapshot), \
+                    patch.object(kb, 'lookup_chunk', side_effect=lambda m, chunk_id: texts.get(chunk_id)):
+                results = kb.search_chunks("舍曲林", k=3)
+            self.assertIn(CHUNKS[2], results)
+            self.assertEqual(len(results), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
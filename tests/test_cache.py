@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+测试通用LRU缓存
+"""
+
+import sys
+import os
+import unittest
+from unittest.mock import patch
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.cache import LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_hit_and_miss(self):
+        """命中和未命中应被正确统计"""
+        cache = LRUCache(maxsize=2)
+        self.assertIsNone(cache.get("失眠怎么办"))
+        cache.set("失眠怎么办", [1, 2, 3])
+        self.assertEqual(cache.get("失眠怎么办"), [1, 2, 3])
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]), (1, 1, 1))
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    def test_lru_eviction(self):
+        """超过容量时淘汰最久未使用的条目"""
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertEqual(len(cache), 2)
+
+    def test_ttl_expiry(self):
+        """超过TTL的条目视为未命中"""
+        cache = LRUCache(maxsize=2, ttl=10)
+        with patch('tools.cache.time.monotonic', return_value=100.0):
+            cache.set("a", 1)
+        with patch('tools.cache.time.monotonic', return_value=105.0):
+            self.assertEqual(cache.get("a"), 1)
+        with patch('tools.cache.time.monotonic', return_value=111.0):
+            self.assertIsNone(cache.get("a"))
+        self.assertNotIn("a", cache)
+
+    def test_clear(self):
+        cache = LRUCache()
+        cache.set("a", 1)
+        cache.get("a")
+        cache.clear()
+        self.assertEqual(cache.stats()["hits"], 0)
+        self.assertEqual(len(cache), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+测试知识库文本块存储（偏移量索引的UTF-8文件）
+"""
+
+import sys
+import os
+import tempfile
+import unittest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.chunk_store import ChunkStore, write_chunk_store
+
+
+class TestChunkStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.blob_path = os.path.join(self.tmp_dir.name, "chunks.bin")
+        self.offsets_path = os.path.join(self.tmp_dir.name, "chunk_offsets.npy")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_round_trip(self):
+        """写入后应能按下标读取原始文本块"""
+        chunks = ["认知行为疗法（CBT）", "", "正念练习 mindfulness", "睡眠卫生😴"]
+        write_chunk_store(chunks, self.blob_path, self.offsets_path)
+        store = ChunkStore(self.blob_path, self.offsets_path)
+        try:
+            self.assertEqual(len(store), len(chunks))
+            self.assertEqual(store[3], "睡眠卫生😴")
+            self.assertEqual(store[1], "")
+            self.assertEqual(list(store), chunks)
+            with self.assertRaises(IndexError):
+                store[len(chunks)]
+        finally:
+            store.close()
+
+    def test_empty_store(self):
+        """空文本块列表也应能正常打开"""
+        write_chunk_store([], self.blob_path, self.offsets_path)
+        store = ChunkStore(self.blob_path, self.offsets_path)
+        try:
+            self.assertEqual(len(store), 0)
+        finally:
+            store.close()
+
+    def test_offsets_not_pickled(self):
+        """偏移量文件应可在禁止pickle的情况下加载"""
+        import numpy as np
+        write_chunk_store(["a", "bc"], self.blob_path, self.offsets_path)
+        offsets = np.load(self.offsets_path, allow_pickle=False)
+        self.assertEqual(offsets.tolist(), [0, 1, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+测试网页内容缓存：URL规范化、HTTP缓存语义、过期和LRU淘汰
+"""
+
+import sys
+import os
+import time
+import shutil
+import tempfile
+import unittest
+from email.utils import formatdate
+from unittest.mock import patch, MagicMock
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import requests
+import tools
+from tools.http_client import http_client
+from tools.content_cache import ContentCache, canonical_url, cache_ttl_from_headers
+
+
+class TestCanonicalURL(unittest.TestCase):
+    def test_normalizes_equivalent_urls(self):
+        self.assertEqual(
+            canonical_url("HTTPS://Example.COM:443/news?b=2&a=1&utm_source=weibo#comments"),
+            canonical_url("https://example.com/news?a=1&b=2"),
+        )
+
+    def test_keeps_meaningful_differences(self):
+        self.assertNotEqual(canonical_url("https://example.com/news?id=1"),
+                            canonical_url("https://example.com/news?id=2"))
+        self.assertEqual(canonical_url("http://example.com:8080"), "http://example.com:8080/")
+        # 通用参数名可能是分页或内容参数，不能当作跟踪参数去掉
+        self.assertNotEqual(canonical_url("https://example.com/list?from=20"),
+                            canonical_url("https://example.com/list?from=40"))
+        self.assertNotEqual(canonical_url("https://example.com/list?spm=a"), canonical_url("https://example.com/list"))
+        self.assertEqual(canonical_url("https://example.com/a?fbclid=x&gclid=y"), "https://example.com/a")
+
+
+class TestCacheTTL(unittest.TestCase):
+    def test_cache_control(self):
+        self.assertEqual(cache_ttl_from_headers({"Cache-Control": "public, max-age=120"}), 120)
+        self.assertIsNone(cache_ttl_from_headers({"Cache-Control": "no-store"}))
+        self.assertIsNone(cache_ttl_from_headers({"Cache-Control": "max-age=0"}))
+
+    def test_expires_and_default(self):
+        ttl = cache_ttl_from_headers({"Expires": formatdate(time.time() + 600, usegmt=True)})
+        self.assertTrue(590 < ttl <= 600)
+        self.assertIsNone(cache_ttl_from_headers({"Expires": formatdate(time.time() - 600, usegmt=True)}))
+        self.assertEqual(cache_ttl_from_headers({}, default=30), 30)
+
+
+class TestContentCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'cache.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_roundtrip_and_persistence(self):
+        cache = ContentCache(self.db_path)
+        value = {"title": "睡眠与焦虑", "text": "规律作息。" * 200, "truncated": False}
+        cache.set("page", "https://example.com/a", value)
+        self.assertEqual(cache.get("page", "https://example.com/a#top"), value)
+        self.assertIsNone(cache.get("article", "https://example.com/a"))
+        # 压缩后明显小于原文
+        self.assertLess(cache.stats()["bytes"], len(value["text"].encode("utf-8")) // 5)
+        # 重新打开后仍然可以读取
+        self.assertEqual(ContentCache(self.db_path).get("page", "https://example.com/a"), value)
+
+    def test_expiry(self):
+        cache = ContentCache(self.db_path)
+        cache.set("page", "https://example.com/a", {"text": "x"}, ttl=0.05)
+        time.sleep(0.1)
+        self.assertIsNone(cache.get("page", "https://example.com/a"))
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_lru_eviction(self):
+        value = {"text": os.urandom(400).hex()}
+        probe = ContentCache(os.path.join(self.temp_dir, 'probe.db'))
+        probe.set("page", "https://example.com/probe", value)
+        entry_size = probe.stats()["bytes"]
+
+        cache = ContentCache(self.db_path, max_bytes=entry_size * 2)
+        cache.set("page", "https://example.com/1", value)
+        time.sleep(0.01)
+        cache.set("page", "https://example.com/2", value)
+        time.sleep(0.01)
+        # 访问1后，2成为最久未使用的记录
+        self.assertIsNotNone(cache.get("page", "https://example.com/1"))
+        time.sleep(0.01)
+        cache.set("page", "https://example.com/3", value)
+
+        self.assertIsNotNone(cache.get("page", "https://example.com/1"))
+        self.assertIsNone(cache.get("page", "https://example.com/2"))
+        self.assertIsNotNone(cache.get("page", "https://example.com/3"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+        self.assertLessEqual(cache.stats()["bytes"], cache.max_bytes)
+
+    def test_repeat_read_is_fast(self):
+        cache = ContentCache(self.db_path)
+        cache.set("page", "https://example.com/a", {"title": "t", "text": "正文" * 1500})
+        start = time.perf_counter()
+        for _ in range(100):
+            cache.get("page", "https://example.com/a")
+        self.assertLess((time.perf_counter() - start) / 100, 0.01)
+
+
+
+class TestScrapeArticleContent(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache = ContentCache(os.path.join(self.temp_dir, 'cache.db'))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_undeclared_charset_decoded_and_cached(self):
+        """响应头没有声明编码的中文页面应正确解码后交给newspaper，重复抓取命中缓存"""
+        response = requests.Response()
+        response._content = '<html><head><meta charset="gbk"><title>睡眠</title></head><body>正文</body></html>'.encode("gbk")
+        response.status_code = 200
+        response.headers["Content-Type"] = "text/html"
+        response.encoding = "ISO-8859-1"
+
+        article = MagicMock(title="睡眠", text="正文")
+        with patch.object(tools, 'content_cache', self.cache), \
+                patch.object(tools, 'Article', return_value=article), \
+                patch.object(http_client, 'get', return_value=response) as mock_get:
+            first = tools.news_tools.scrape_article_content.invoke("https://example.com/a")
+            second = tools.news_tools.scrape_article_content.invoke("https://example.com/a")
+
+        self.assertIn("<title>睡眠</title>", article.download.call_args.kwargs["input_html"])
+        self.assertEqual(first, "正文")
+        self.assertEqual(second, "正文")
+        self.assertEqual(mock_get.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+测试共享数据库引擎的SQLite配置和会话生命周期
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+import database
+from database import create_db_engine, init_db, migrate_db, BUSY_TIMEOUT_MS
+from models import ChatSession
+
+
+class TestDatabase(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.engine = create_db_engine(f"sqlite:///{os.path.join(self.temp_dir, 'test.db')}")
+        init_db(self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_pragmas_applied_to_every_connection(self):
+        with self.engine.connect() as conn:
+            self.assertEqual(conn.execute(text("PRAGMA journal_mode")).scalar(), "wal")
+            # NORMAL = 1
+            self.assertEqual(conn.execute(text("PRAGMA synchronous")).scalar(), 1)
+            self.assertEqual(conn.execute(text("PRAGMA busy_timeout")).scalar(), BUSY_TIMEOUT_MS)
+
+    def test_reader_not_blocked_by_open_write_transaction(self):
+        """WAL模式下，写事务未提交时其他连接仍可读取"""
+        with self.engine.connect() as writer, self.engine.connect() as reader:
+            writer.execute(text("BEGIN IMMEDIATE"))
+            writer.execute(text("INSERT INTO chat_session (id, title) VALUES ('s1', '写入中')"))
+            self.assertEqual(reader.execute(text("SELECT COUNT(*) FROM chat_session")).scalar(), 0)
+            writer.execute(text("COMMIT"))
+            self.assertEqual(reader.execute(text("SELECT COUNT(*) FROM chat_session")).scalar(), 1)
+
+    def test_memory_database_shares_one_connection(self):
+        engine = create_db_engine("sqlite:///:memory:")
+        init_db(engine)
+        Session = sessionmaker(bind=engine)
+        first = Session()
+        first.add(ChatSession(id="s1"))
+        first.commit()
+        first.close()
+        self.assertEqual(Session().query(ChatSession).count(), 1)
+
+    def test_session_scope_commits_and_rolls_back(self):
+        original = database.SessionLocal
+        database.SessionLocal = sessionmaker(bind=self.engine)
+        try:
+            with database.session_scope() as db_session:
+                db_session.add(ChatSession(id="s1"))
+            with self.assertRaises(RuntimeError):
+                with database.session_scope() as db_session:
+                    db_session.add(ChatSession(id="s2"))
+                    db_session.flush()
+                    raise RuntimeError("失败")
+            with database.session_scope() as db_session:
+                self.assertEqual([s.id for s in db_session.query(ChatSession)], ["s1"])
+        finally:
+            database.SessionLocal = original
+
+    def test_scoped_session_is_per_thread(self):
+        main_session = database.ScopedSession()
+        self.assertIs(database.ScopedSession(), main_session)
+        other = []
+        thread = threading.Thread(target=lambda: other.append(database.ScopedSession()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other[0], main_session)
+        database.remove_session()
+        self.assertIsNot(database.ScopedSession(), main_session)
+        database.remove_session()
+
+
+
+class TestMigration(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.engine = create_db_engine(f"sqlite:///{os.path.join(self.temp_dir, 'legacy.db')}")
+        # 旧版本的表结构：没有任何索引
+        with self.engine.begin() as conn:
+            conn.execute(text("CREATE TABLE chat_session (id VARCHAR(50) PRIMARY KEY, user_id VARCHAR(50), "
+                              "start_time DATETIME, title VARCHAR(200))"))
+            conn.execute(text("CREATE TABLE chat_message (id INTEGER PRIMARY KEY, session_id VARCHAR(50) NOT NULL, "
+                              "message_type VARCHAR(10) NOT NULL, content TEXT NOT NULL, timestamp DATETIME)"))
+            conn.execute(text("CREATE TABLE long_term_memory (id INTEGER PRIMARY KEY, user_id VARCHAR(50) NOT NULL, "
+                              "profile_summary TEXT, emotion_trends JSON, important_events JSON)"))
+            conn.execute(text("INSERT INTO long_term_memory (id, user_id, profile_summary) VALUES "
+                              "(1, 'u1', '最早的记录'), (2, 'u1', '重复记录'), (3, 'u2', '其他用户')"))
+
+    def tearDown(self):
+        self.engine.dispose()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _index_names(self, table):
+        with self.engine.connect() as conn:
+            return {row[1] for row in conn.execute(text(f"PRAGMA index_list({table})"))}
+
+    def _query_plan(self, sql):
+        with self.engine.connect() as conn:
+            return " ".join(row[-1] for row in conn.execute(text("EXPLAIN QUERY PLAN " + sql)))
+
+    def test_migration_adds_indexes_and_removes_duplicates(self):
+        init_db(self.engine)
+        migrate_db(self.engine)  # 可重复执行
+        self.assertTrue({'ix_chat_message_session_timestamp',
+                         'ix_chat_message_session_type_timestamp'} <= self._index_names('chat_message'))
+        self.assertIn('ux_long_term_memory_user_id', self._index_names('long_term_memory'))
+        with self.engine.connect() as conn:
+            rows = conn.execute(text("SELECT user_id, profile_summary FROM long_term_memory ORDER BY id")).fetchall()
+        self.assertEqual([tuple(r) for r in rows], [('u1', '最早的记录'), ('u2', '其他用户')])
+
+    def test_hot_queries_use_indexes(self):
+        init_db(self.engine)
+        plan = self._query_plan("SELECT * FROM chat_message WHERE session_id = 's' ORDER BY timestamp DESC LIMIT 10")
+        self.assertIn("ix_chat_message_session_timestamp", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+        plan = self._query_plan("SELECT * FROM chat_message WHERE session_id = 's' AND message_type = 'human' "
+                                "ORDER BY timestamp LIMIT 1")
+        self.assertIn("ix_chat_message_session_type_timestamp", plan)
+        plan = self._query_plan("SELECT * FROM long_term_memory WHERE user_id = 'u1'")
+        self.assertIn("ux_long_term_memory_user_id", plan)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+测试知识库分批向量化与检查点恢复
+"""
+
+import sys
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts import process_texts
+
+
+class FakeModel:
+    """模拟向量化模型，记录每次收到的批次，可在指定批次抛出异常"""
+
+    def __init__(self, fail_on_call=None):
+        self.calls = []
+        self.fail_on_call = fail_on_call
+
+    def encode(self, texts, **kwargs):
+        self.calls.append(list(texts))
+        if self.fail_on_call is not None and len(self.calls) == self.fail_on_call:
+            raise RuntimeError("模拟进程中断")
+        return np.array([[len(text), i] for i, text in enumerate(texts)], dtype='float32')
+
+
+class TestEmbeddingPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.checkpoint_dir = os.path.join(self.tmp_dir.name, "embedding_checkpoint")
+        self.chunks = [f"文本块{i}" * (i + 1) for i in range(10)]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_iter_batches(self):
+        """分批生成器应覆盖全部文本块"""
+        batches = list(process_texts.iter_batches(self.chunks, 4))
+        self.assertEqual([index for index, _ in batches], [0, 1, 2])
+        self.assertEqual([len(batch) for _, batch in batches], [4, 4, 2])
+
+    def test_batched_embedding(self):
+        """分批向量化结果应与文本块一一对应，完成后删除检查点"""
+        fake_model = FakeModel()
+        with patch.object(process_texts, 'get_model', return_value=fake_model):
+            embeddings = process_texts.embed_texts(self.chunks, batch_size=4,
+                                                   checkpoint_dir=self.checkpoint_dir)
+        self.assertEqual(embeddings.shape, (10, 2))
+        self.assertEqual(embeddings[:, 0].tolist(), [float(len(c)) for c in self.chunks])
+        self.assertEqual(len(fake_model.calls), 3)
+        self.assertFalse(os.path.exists(self.checkpoint_dir))
+
+    def test_resume_from_checkpoint(self):
+        """中断后重新运行应跳过已完成的批次"""
+        with patch.object(process_texts, 'get_model', return_value=FakeModel(fail_on_call=2)):
+            with self.assertRaises(RuntimeError):
+                process_texts.embed_texts(self.chunks, batch_size=4, checkpoint_dir=self.checkpoint_dir)
+        self.assertTrue(os.path.exists(os.path.join(self.checkpoint_dir, "batch_000000.npy")))
+
+        fake_model = FakeModel()
+        with patch.object(process_texts, 'get_model', return_value=fake_model):
+            embeddings = process_texts.embed_texts(self.chunks, batch_size=4,
+                                                   checkpoint_dir=self.checkpoint_dir)
+        self.assertEqual(fake_model.calls, [self.chunks[4:8], self.chunks[8:]])
+        self.assertEqual(embeddings.shape, (10, 2))
+
+    def test_checkpoint_discarded_when_chunks_change(self):
+        """文本块变化后不应复用旧的检查点"""
+        with patch.object(process_texts, 'get_model', return_value=FakeModel(fail_on_call=2)):
+            with self.assertRaises(RuntimeError):
+                process_texts.embed_texts(self.chunks, batch_size=4, checkpoint_dir=self.checkpoint_dir)
+
+        fake_model = FakeModel()
+        changed_chunks = ["新的文本块"] + self.chunks[1:]
+        with patch.object(process_texts, 'get_model', return_value=fake_model):
+            process_texts.embed_texts(changed_chunks, batch_size=4, checkpoint_dir=self.checkpoint_dir)
+        self.assertEqual(len(fake_model.calls), 3)
+
+    def test_tfidf_fallback_fits_once(self):
+        """TF-IDF备选方案应在全部文本块上一次拟合，不按批拆分"""
+        chunks = [f"第{i}篇 心理 健康 知识 word{i} extra{i % 7}" for i in range(600)]
+        with patch.object(process_texts, 'get_model', return_value=process_texts.SimpleModel()):
+            embeddings = process_texts.embed_texts(chunks, batch_size=256, checkpoint_dir=self.checkpoint_dir)
+        self.assertEqual(embeddings.shape[0], 600)
+        self.assertEqual(embeddings.dtype, np.float32)
+        self.assertFalse(os.path.exists(self.checkpoint_dir))
+
+
+if __name__ == '__main__':
+    unittest.main()
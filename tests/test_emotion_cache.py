@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+测试情绪识别结果缓存
+"""
+
+import sys
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.emotion_cache import EmotionCache, normalize_emotion_text
+
+
+class TestNormalizeEmotionText(unittest.TestCase):
+    def test_whitespace_width_and_punctuation(self):
+        """空白、全角字符和重复标点不影响缓存键"""
+        self.assertEqual(normalize_emotion_text(" 今天 有点忙。。"), normalize_emotion_text("今天有点忙"))
+        self.assertEqual(normalize_emotion_text("ＯＫ！！！"), "ok!")
+        self.assertNotEqual(normalize_emotion_text("真棒！"), normalize_emotion_text("真棒？"))
+
+
+class TestEmotionCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, "emotion_cache.db")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_memory_cache(self):
+        cache = EmotionCache()
+        self.assertIsNone(cache.get("m", "1", "谢谢"))
+        cache.set("m", "1", "谢谢", {"label": "Positive", "score": 0.9})
+        self.assertEqual(cache.get("m", "1", "谢谢！"), None)
+        self.assertEqual(cache.get("m", "1", " 谢谢 "), {"label": "Positive", "score": 0.9})
+
+    def test_persistent_tier_survives_restart(self):
+        """SQLite持久化层在新的缓存实例中仍可命中"""
+        EmotionCache(db_path=self.db_path).set("m", "1", "你好", {"label": "Neutral", "score": 0.8})
+        cache = EmotionCache(db_path=self.db_path)
+        self.assertEqual(cache.get("m", "1", "你好"), {"label": "Neutral", "score": 0.8})
+        self.assertEqual(cache.stats()["db_hits"], 1)
+
+    def test_model_version_expiry(self):
+        """模型版本变化后旧结果失效，并可清理"""
+        cache = EmotionCache(db_path=self.db_path)
+        cache.set("m", "1", "你好", "旧结果")
+        self.assertIsNone(EmotionCache(db_path=self.db_path).get("m", "2", "你好"))
+        self.assertEqual(cache.purge_stale("m", "2"), 1)
+        self.assertIsNone(EmotionCache(db_path=self.db_path).get("m", "1", "你好"))
+
+
+class TestBaiduEmotionCache(unittest.TestCase):
+    def test_repeated_text_skips_api(self):
+        """相同文本第二次调用不再请求百度接口"""
+        from tools import emotion_recognition
+
+        token_resp = MagicMock()
+        token_resp.json.return_value = {"access_token": "token", "expires_in": 2592000}
+        emotion_resp = MagicMock()
+        emotion_resp.json.return_value = {"items": [{"label": "neutral", "prob": 0.7, "subitems": []}]}
+        with patch.dict(os.environ, {"BAIDU_API_KEY": "k", "BAIDU_SECRET_KEY": "s"}), \
+                patch.object(emotion_recognition, 'emotion_cache', EmotionCache()), \
+                patch.object(emotion_recognition, '_token_manager', None), \
+                patch.object(emotion_recognition.http_client, 'post',
+                             side_effect=[token_resp, emotion_resp]) as post:
+            first = emotion_recognition.emotion_recognition_tool.invoke("今天有点忙")
+            second = emotion_recognition.emotion_recognition_tool.invoke("今天 有点忙")
+        self.assertIn("一级情绪：中性(0.70)", first)
+        self.assertEqual(first, second)
+        self.assertEqual(post.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+测试RSS源共享缓存（条件请求与后台刷新）
+"""
+
+import sys
+import os
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import feed_cache as feed_cache_module
+from tools.feed_cache import FeedCache
+
+URL = "https://example.com/rss"
+RSS = (b"<?xml version='1.0'?><rss version='2.0'><channel><title>Example</title><link>https://example.com</link>"
+       b"<item><title>First</title><link>https://example.com/1</link></item></channel></rss>")
+
+
+class FakeServer:
+    """模拟支持ETag的RSS服务器"""
+
+    def __init__(self):
+        self.content = RSS
+        self.etag = '"v1"'
+        self.requests = []
+        self.fail = False
+
+    def get(self, url, headers=None, timeout=None):
+        self.requests.append(dict(headers or {}))
+        if self.fail:
+            raise ConnectionError("down")
+        response = MagicMock()
+        if headers.get('If-None-Match') == self.etag:
+            response.status_code = 304
+            response.content = b""
+        else:
+            response.status_code = 200
+            response.content = self.content
+        response.headers = {'ETag': self.etag, 'Last-Modified': 'Mon, 01 Jan 2024 00:00:00 GMT'}
+        return response
+
+
+class TestFeedCache(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeServer()
+        self.patcher = patch.object(feed_cache_module.http_client, 'get', side_effect=self.server.get)
+        self.patcher.start()
+        self.parse_calls = 0
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def parser(self, content):
+        self.parse_calls += 1
+        return content.count(b"<item>")
+
+    def test_fresh_entries_served_from_memory(self):
+        cache = FeedCache(ttl=60)
+        self.assertEqual(cache.get(URL, self.parser), 1)
+        self.assertEqual(cache.get(URL, self.parser), 1)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(self.parse_calls, 1)
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_conditional_get_after_ttl(self):
+        """过期后发送条件请求，304时不重新解析"""
+        cache = FeedCache(ttl=0)
+        cache.get(URL, self.parser)
+        cache.get(URL, self.parser)
+        self.assertEqual(self.server.requests[1]['If-None-Match'], '"v1"')
+        self.assertIn('If-Modified-Since', self.server.requests[1])
+        self.assertEqual(self.parse_calls, 1)
+        self.assertEqual(cache.stats()["revalidated"], 1)
+
+        # 内容变化后返回200并重新解析
+        self.server.content = RSS.replace(b"</channel>", b"<item><title>Second</title></item></channel>")
+        self.server.etag = '"v2"'
+        self.assertEqual(cache.get(URL, self.parser), 2)
+        self.assertEqual(self.parse_calls, 2)
+
+    def test_stale_content_on_error(self):
+        cache = FeedCache(ttl=0)
+        cache.get(URL, self.parser)
+        self.server.fail = True
+        self.assertEqual(cache.get(URL, self.parser), 1)
+        self.assertEqual(cache.stats()["stale_served"], 1)
+        with self.assertRaises(ConnectionError):
+            FeedCache().get(URL, self.parser)
+
+    def test_refresh_hot_feeds(self):
+        """后台刷新会重新验证最近访问过且即将过期的源，并预先解析新内容"""
+        cache = FeedCache(ttl=0.05)
+        cache.get(URL, self.parser)
+        time.sleep(0.05)
+        self.server.content = RSS.replace(b"</channel>", b"<item><title>Second</title></item></channel>")
+        self.server.etag = '"v2"'
+        cache.refresh_hot(hot_window=60)
+        self.assertEqual(self.parse_calls, 2)
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_shared_by_rss_tool(self):
+        """RSS订阅工具通过共享缓存获取内容"""
+        from tools import rss_feed
+        cache = FeedCache(ttl=60)
+        with patch.object(rss_feed, 'feed_cache', cache):
+            first = rss_feed.rss_feed_tool.search_rss_feeds.invoke(URL)
+            second = rss_feed.rss_feed_tool.search_rss_feeds.invoke(URL)
+        self.assertIn("标题: First", first)
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.server.requests), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
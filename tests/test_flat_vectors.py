@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+测试Flat索引向量文件的写入和内存映射检索
+"""
+
+import sys
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import faiss
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.flat_vectors import MappedFlatIndex, flat_index_vectors, write_flat_vectors
+from tools import knowledge_base_search
+
+
+class TestFlatVectors(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.vectors_path = os.path.join(self.tmp_dir.name, "vectors.npy")
+        self.ids_path = os.path.join(self.tmp_dir.name, "vector_ids.npy")
+        rng = np.random.default_rng(0)
+        self.vectors = rng.random((50, 16)).astype('float32')
+        faiss.normalize_L2(self.vectors)
+        self.ids = np.arange(50, dtype='int64') * 3 + 7
+        self.index = faiss.IndexIDMap(faiss.IndexFlatIP(16))
+        self.index.add_with_ids(self.vectors, self.ids)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_mapped_search_matches_faiss(self):
+        """内存映射的向量应与FAISS Flat索引返回相同的结果"""
+        self.assertTrue(write_flat_vectors(self.index, self.vectors_path, self.ids_path))
+        mapped = MappedFlatIndex(self.vectors_path, self.ids_path)
+        self.assertIsInstance(mapped.vectors, np.memmap)
+        self.assertEqual((mapped.ntotal, mapped.d), (50, 16))
+
+        queries = self.vectors[:5]
+        expected_distances, expected_ids = self.index.search(queries, 4)
+        distances, ids = mapped.search(queries, 4)
+        self.assertEqual(ids.tolist(), expected_ids.tolist())
+        np.testing.assert_allclose(distances, expected_distances, rtol=1e-5)
+
+    def test_pads_missing_results(self):
+        """结果不足k个时ID为-1；空索引也能检索"""
+        small = faiss.IndexIDMap(faiss.IndexFlatIP(16))
+        small.add_with_ids(self.vectors[:2], self.ids[:2])
+        write_flat_vectors(small, self.vectors_path, self.ids_path)
+        _, ids = MappedFlatIndex(self.vectors_path, self.ids_path).search(self.vectors[:1], 4)
+        self.assertEqual(ids[0, 2:].tolist(), [-1, -1])
+
+        write_flat_vectors(faiss.IndexIDMap(faiss.IndexFlatIP(16)), self.vectors_path, self.ids_path)
+        _, ids = MappedFlatIndex(self.vectors_path, self.ids_path).search(self.vectors[:1], 3)
+        self.assertEqual(ids.tolist(), [[-1, -1, -1]])
+
+    def test_other_index_types_remove_vector_files(self):
+        """非Flat索引不写向量文件，并删除旧的向量文件"""
+        write_flat_vectors(self.index, self.vectors_path, self.ids_path)
+        hnsw = faiss.IndexIDMap(faiss.IndexHNSWFlat(16, 8, faiss.METRIC_INNER_PRODUCT))
+        self.assertIsNone(flat_index_vectors(hnsw))
+        self.assertFalse(write_flat_vectors(hnsw, self.vectors_path, self.ids_path))
+        self.assertFalse(os.path.exists(self.vectors_path))
+        self.assertFalse(os.path.exists(self.ids_path))
+
+    def test_load_index_prefers_mapped_vectors(self):
+        """存在向量文件时 load_index 返回内存映射的索引，否则读取FAISS索引"""
+        index_path = os.path.join(self.tmp_dir.name, "vector_db.index")
+        faiss.write_index(self.index, index_path)
+        with patch.multiple(knowledge_base_search, VECTORS_PATH=self.vectors_path,
+                            VECTOR_IDS_PATH=self.ids_path):
+            self.assertIsInstance(knowledge_base_search.load_index(index_path), faiss.IndexIDMap)
+            write_flat_vectors(self.index, self.vectors_path, self.ids_path)
+            self.assertIsInstance(knowledge_base_search.load_index(index_path), MappedFlatIndex)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -21,7 +21,7 @@ def test_history_api():
         response = requests.get("http://localhost:5001/history")
         
         if response.status_code == 200:
-            data = response.json()
+            data = response.json()['sessions']
             print(f"API返回了 {len(data)} 条记录")
             
             if len(data) > 0:
@@ -29,7 +29,7 @@ def test_history_api():
                 for i, record in enumerate(data[:3]):  # 只显示前3条
                     print(f"{i+1}. 用户输入: {record['user_input'][:50]}{'...' if len(record['user_input']) > 50 else ''}")
                     print(f"   AI回答: {record['agent_response'][:100]}{'...' if len(record['agent_response']) > 100 else ''}")
-                    print(f"   时间戳: {record['timestamp']}")
+                    print(f"   时间戳: {record['start_time']}")
                     print("---")
             else:
                 print("没有找到历史记录")
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+测试 /history 接口（单次查询、游标分页和预览截断）和会话消息分页接口
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event, insert
+import database
+from database import create_db_engine, init_db
+from models import ChatSession, ChatMessage
+import app as app_module
+
+
+class TestHistoryEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.engine = create_db_engine(f"sqlite:///{os.path.join(self.temp_dir, 'history.db')}")
+        init_db(self.engine)
+        database.ScopedSession.remove()
+        database.ScopedSession.configure(bind=self.engine)
+        self.client = app_module.app.test_client()
+
+        start = datetime(2025, 1, 1)
+        with self.engine.begin() as conn:
+            conn.execute(insert(ChatSession.__table__), [
+                {"id": f"s{i}", "title": f"会话{i}", "start_time": start + timedelta(minutes=i)} for i in range(5)
+            ])
+            messages = []
+            for i in range(5):
+                base = start + timedelta(minutes=i)
+                messages += [
+                    {"session_id": f"s{i}", "message_type": "human", "content": f"问题{i}", "timestamp": base},
+                    {"session_id": f"s{i}", "message_type": "ai", "content": "汪" * 300,
+                     "timestamp": base + timedelta(seconds=1)},
+                    {"session_id": f"s{i}", "message_type": "human", "content": "追问",
+                     "timestamp": base + timedelta(seconds=2)},
+                ]
+            conn.execute(insert(ChatMessage.__table__), messages)
+
+    def tearDown(self):
+        database.ScopedSession.remove()
+        database.ScopedSession.configure(bind=database.engine)
+        self.engine.dispose()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_single_query_per_page(self):
+        statements = []
+        event.listen(self.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        response = self.client.get('/history')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(statements), 1)
+
+    def test_first_messages_and_preview(self):
+        data = self.client.get('/history').get_json()
+        first = data['sessions'][0]
+        self.assertEqual(first['id'], 's4')
+        self.assertEqual(first['user_input'], '问题4')
+        self.assertEqual(first['agent_response'], '汪' * app_module.HISTORY_PREVIEW_CHARS + '...')
+        self.assertIsNone(data['next_before'])
+
+    def _walk_pages(self, limit):
+        ids = []
+        before = None
+        while True:
+            url = f'/history?limit={limit}'
+            if before:
+                url += f"&before={before['start_time']}&before_id={before['id']}"
+            data = self.client.get(url).get_json()
+            ids += [item['id'] for item in data['sessions']]
+            before = data['next_before']
+            if before is None:
+                return ids
+
+    def test_cursor_pagination(self):
+        self.assertEqual(self._walk_pages(2), ['s4', 's3', 's2', 's1', 's0'])
+
+    def test_sessions_with_same_start_time_are_not_skipped(self):
+        """开始时间相同的会话跨越页边界时按 id 区分，不遗漏也不重复"""
+        same_time = datetime(2024, 12, 31)
+        with self.engine.begin() as conn:
+            conn.execute(insert(ChatSession.__table__), [
+                {"id": f"t{i}", "title": f"同时{i}", "start_time": same_time} for i in range(5)
+            ])
+        self.assertEqual(self._walk_pages(2), ['s4', 's3', 's2', 's1', 's0', 't4', 't3', 't2', 't1', 't0'])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/history?before=yesterday').status_code, 400)
+
+
+
+class TestSessionMessages(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.engine = create_db_engine(f"sqlite:///{os.path.join(self.temp_dir, 'messages.db')}")
+        init_db(self.engine)
+        database.ScopedSession.remove()
+        database.ScopedSession.configure(bind=self.engine)
+        self.client = app_module.app.test_client()
+
+        start = datetime(2025, 1, 1)
+        with self.engine.begin() as conn:
+            conn.execute(insert(ChatSession.__table__), [{"id": "s1", "title": "长对话", "start_time": start},
+                                                         {"id": "s2", "title": "其他", "start_time": start}])
+            # 同一时间戳的两条消息用于检查键集分页按 id 区分
+            conn.execute(insert(ChatMessage.__table__), [
+                {"session_id": "s1", "message_type": "human" if i % 2 == 0 else "ai",
+                 "content": f"**消息{i}**", "timestamp": start + timedelta(seconds=min(i, 10))}
+                for i in range(25)
+            ] + [{"session_id": "s2", "message_type": "human", "content": "别的会话", "timestamp": start}])
+
+    def tearDown(self):
+        database.ScopedSession.remove()
+        database.ScopedSession.configure(bind=database.engine)
+        self.engine.dispose()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_pages_walk_backwards_without_gaps(self):
+        contents = []
+        before = None
+        while True:
+            url = '/history/s1/messages?limit=4' + (f'&before={before}' if before else '')
+            data = self.client.get(url).get_json()
+            self.assertLessEqual(len(data['messages']), 4)
+            contents = [m['content'] for m in data['messages']] + contents
+            before = data['next_before']
+            if before is None:
+                break
+        self.assertEqual(contents, [f"**消息{i}**" for i in range(25)])
+
+    def test_ai_messages_rendered_as_html(self):
+        data = self.client.get('/history/s1/messages?limit=2').get_json()
+        ai, human = data['messages']
+        self.assertEqual(ai['content_html'], '<p><strong>消息23</strong></p>')
+        self.assertNotIn('content_html', human)
+
+    def test_load_history_renders_latest_page_only(self):
+        with self.client as client:
+            response = client.get('/history/s1')
+            self.assertEqual(response.status_code, 200)
+            page = response.get_data(as_text=True)
+            self.assertIn('消息24', page)
+            self.assertNotIn('消息0<', page)
+            self.assertIn('data-session-id="s1"', page)
+            from flask import session
+            self.assertEqual(session['session_id'], 's1')
+            self.assertNotIn('chat_history', session)
+
+    def test_unknown_session(self):
+        self.assertEqual(self.client.get('/history/missing').status_code, 404)
+        self.assertEqual(self.client.get('/history/missing/messages').get_json()['messages'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
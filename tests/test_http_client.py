@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+测试共享HTTP客户端（连接复用、重试和延迟统计）
+"""
+
+import sys
+import os
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import requests
+from tools.http_client import HTTPClient, build_retry, html_text
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # 支持keep-alive
+
+    def do_GET(self):
+        server = self.server
+        server.connections.add(self.client_address)
+        server.user_agents.append(self.headers.get('User-Agent'))
+        if self.path == "/flaky" and server.failures_left > 0:
+            server.failures_left -= 1
+            status, body = 503, b"busy"
+        else:
+            status, body = 200, b"ok"
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestHTTPClient(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.connections = set()
+        self.server.user_agents = []
+        self.server.failures_left = 0
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.client = HTTPClient(retry=build_retry(total=2, backoff_factor=0))
+
+    def tearDown(self):
+        self.client.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connection_reuse_and_default_headers(self):
+        """连续请求复用同一个连接，并带有统一的User-Agent"""
+        for _ in range(3):
+            self.assertEqual(self.client.get(self.base_url + "/").text, "ok")
+        self.assertEqual(len(self.server.connections), 1)
+        self.assertTrue(all(ua.startswith("Mozilla/5.0") for ua in self.server.user_agents))
+
+    def test_retry_on_server_error(self):
+        """5xx响应按退避策略有限次重试"""
+        self.server.failures_left = 2
+        self.assertEqual(self.client.get(self.base_url + "/flaky").status_code, 200)
+        self.server.failures_left = 5
+        self.assertEqual(self.client.get(self.base_url + "/flaky").status_code, 503)
+
+    def test_busy_pool_does_not_block(self):
+        """连接池的连接都被占用时，新请求另建连接，不会无限等待"""
+        client = HTTPClient(max_connections_per_host=1, retry=build_retry(total=0))
+        held = client.get(self.base_url + "/", stream=True)  # 未读取响应体，连接一直被占用
+        results = []
+        worker = threading.Thread(target=lambda: results.append(client.get(self.base_url + "/").text), daemon=True)
+        worker.start()
+        worker.join(timeout=5)
+        held.close()
+        client.session.close()
+        self.assertEqual(results, ["ok"])
+
+    def test_latency_histogram(self):
+        self.client.get(self.base_url + "/")
+        host = f"127.0.0.1:{self.server.server_address[1]}"
+        stats = self.client.stats()[host]
+        self.assertEqual(stats["count"], 1)
+        self.assertEqual(stats["errors"], 0)
+        self.assertEqual(sum(stats["histogram"].values()), 1)
+
+
+
+def make_response(body: bytes, content_type: str) -> requests.Response:
+    response = requests.Response()
+    response._content = body
+    response.status_code = 200
+    response.headers["Content-Type"] = content_type
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    return response
+
+
+class TestHTMLText(unittest.TestCase):
+    PAGE = "<html><head>{meta}<title>睡眠与焦虑</title></head><body><p>规律作息有助于改善睡眠。</p></body></html>"
+
+    def test_header_charset_is_used(self):
+        body = self.PAGE.format(meta="").encode("gbk")
+        self.assertIn("睡眠与焦虑", html_text(make_response(body, "text/html; charset=gbk")))
+
+    def test_meta_charset_when_header_has_none(self):
+        """响应头没有charset时requests按ISO-8859-1解码，应改用meta中的编码"""
+        body = self.PAGE.format(meta='<meta http-equiv="Content-Type" content="text/html; charset=gb2312">').encode("gbk")
+        response = make_response(body, "text/html")
+        self.assertEqual(response.encoding, "ISO-8859-1")
+        self.assertIn("睡眠与焦虑", html_text(response))
+
+    def test_detected_encoding_without_meta(self):
+        body = (self.PAGE.format(meta="") * 20).encode("utf-8")
+        self.assertIn("睡眠与焦虑", html_text(make_response(body, "text/html")))
+
+
+if __name__ == '__main__':
+    unittest.main()
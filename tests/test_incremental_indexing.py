@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+测试知识库增量索引（scripts/process_texts.py --incremental）
+"""
+
+import sys
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts import process_texts
+from tools.chunk_store import ChunkStore
+from tools.flat_vectors import MappedFlatIndex
+
+
+def fake_embed_texts(text_chunks, **kwargs):
+    """根据文本内容生成确定性的向量，避免加载真实模型"""
+    vectors = []
+    for text in text_chunks:
+        rng = np.random.default_rng(abs(hash(text)) % (2 ** 32))
+        vectors.append(rng.random(8))
+    return np.array(vectors, dtype='float32')
+
+
+class TestIncrementalIndexing(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        kb_dir = self.tmp_dir.name
+        self.sources_dir = os.path.join(kb_dir, "sources")
+        os.makedirs(self.sources_dir)
+        paths = {
+            'SOURCES_DIR': self.sources_dir,
+            'VECTOR_DB_PATH': os.path.join(kb_dir, "vector_db.index"),
+            'METADATA_PATH': os.path.join(kb_dir, "metadata.npy"),
+            'CHUNKS_PATH': os.path.join(kb_dir, "chunks.bin"),
+            'CHUNK_OFFSETS_PATH': os.path.join(kb_dir, "chunk_offsets.npy"),
+            'CHUNK_IDS_PATH': os.path.join(kb_dir, "chunk_ids.npy"),
+            'VERSION_PATH': os.path.join(kb_dir, "index_version"),
+            'MANIFEST_PATH': os.path.join(kb_dir, "manifest.json"),
+            'BM25_PATH': os.path.join(kb_dir, "bm25.npz"),
+            'VECTORS_PATH': os.path.join(kb_dir, "vectors.npy"),
+            'VECTOR_IDS_PATH': os.path.join(kb_dir, "vector_ids.npy"),
+        }
+        self.paths = paths
+        self.patchers = [patch.multiple(process_texts, **paths),
+                         patch.object(process_texts, 'embed_texts', side_effect=fake_embed_texts)]
+        for p in self.patchers:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patchers:
+            p.stop()
+        self.tmp_dir.cleanup()
+
+    def write_source(self, name, text):
+        with open(os.path.join(self.sources_dir, name), 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def load_store(self):
+        return ChunkStore(self.paths['CHUNKS_PATH'], self.paths['CHUNK_OFFSETS_PATH'],
+                          self.paths['CHUNK_IDS_PATH'])
+
+    def test_incremental_update(self):
+        """只处理新增、修改和删除的文件"""
+        import faiss
+        self.write_source("a.txt", "焦虑是一种常见情绪。")
+        self.write_source("b.txt", "失眠可以尝试睡前放松。")
+        process_texts.process_knowledge_base()
+
+        # 没有变化时不应重新向量化
+        process_texts.embed_texts.reset_mock()
+        report = process_texts.update_knowledge_base()
+        self.assertEqual(report["unchanged"], 2)
+        process_texts.embed_texts.assert_not_called()
+
+        # 修改a，删除b，新增c
+        self.write_source("a.txt", "焦虑时可以练习腹式呼吸。")
+        os.remove(os.path.join(self.sources_dir, "b.txt"))
+        self.write_source("c.txt", "正念练习有助于调节情绪。")
+        report = process_texts.update_knowledge_base()
+
+        self.assertEqual(report["added"], ["c.txt"])
+        self.assertEqual(report["changed"], ["a.txt"])
+        self.assertEqual(report["removed"], ["b.txt"])
+        self.assertEqual(report["chunks_removed"], 2)
+        self.assertEqual(report["chunks_added"], 2)
+        embedded = process_texts.embed_texts.call_args[0][0]
+        self.assertEqual(sorted(embedded), sorted(["焦虑时可以练习腹式呼吸。", "正念练习有助于调节情绪。"]))
+
+        index = faiss.read_index(self.paths['VECTOR_DB_PATH'])
+        self.assertEqual(index.ntotal, 2)
+        store = self.load_store()
+        try:
+            self.assertEqual(sorted(text for _, text in store.items()),
+                             sorted(["焦虑时可以练习腹式呼吸。", "正念练习有助于调节情绪。"]))
+            # FAISS返回的ID应能在文本块存储中找到
+            query = fake_embed_texts(["正念练习有助于调节情绪。"])
+            faiss.normalize_L2(query)
+            _, ids = index.search(query, 1)
+            self.assertEqual(store.get(ids[0][0]), "正念练习有助于调节情绪。")
+            # 内存映射的向量文件应与增量更新后的索引一致
+            mapped = MappedFlatIndex(self.paths['VECTORS_PATH'], self.paths['VECTOR_IDS_PATH'])
+            self.assertEqual(mapped.ntotal, 2)
+            self.assertEqual(mapped.search(query, 1)[1].tolist(), ids.tolist())
+        finally:
+            store.close()
+
+    def test_fallback_to_full_rebuild(self):
+        """没有清单时应退回全量重建"""
+        self.write_source("a.txt", "焦虑是一种常见情绪。")
+        self.assertIsNone(process_texts.update_knowledge_base())
+        self.assertTrue(os.path.exists(self.paths['MANIFEST_PATH']))
+
+
+if __name__ == '__main__':
+    unittest.main()
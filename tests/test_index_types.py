@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+测试知识库可选的向量索引类型及基准测试工具
+"""
+
+import sys
+import os
+import unittest
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts import process_texts
+from scripts import benchmark_index
+
+
+class TestIndexTypes(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.vectors = benchmark_index.synthetic_vectors(1000, 64, rng, clusters=16)
+        self.ids = np.arange(1000, dtype='int64') + 500
+
+    def test_build_all_index_types(self):
+        """每种索引都应能按ID添加并检索到自身"""
+        params = {"nlist": 16, "pq_m": 8}
+        for index_type in process_texts.INDEX_TYPES:
+            index = process_texts.build_index(index_type, self.vectors, params)
+            index.add_with_ids(self.vectors, self.ids)
+            self.assertEqual(index.ntotal, 1000)
+            _, ids = index.search(self.vectors[:5], 1)
+            if index_type != "ivfpq":  # 乘积量化是有损压缩，不保证精确命中
+                self.assertEqual(ids[:, 0].tolist(), self.ids[:5].tolist(), index_type)
+
+    def test_invalid_settings(self):
+        """不支持的索引类型或参数应报错"""
+        with self.assertRaises(ValueError):
+            process_texts.build_index("lsh", self.vectors)
+        with self.assertRaises(ValueError):
+            process_texts.build_index("flat", self.vectors, {"unknown": 1})
+        with self.assertRaises(ValueError):
+            process_texts.build_index("ivfpq", self.vectors, {"pq_m": 7})
+
+    def test_benchmark_recall(self):
+        """Flat的召回率应为1，近似索引的报告字段完整"""
+        rng = np.random.default_rng(1)
+        queries = benchmark_index.make_queries(self.vectors, 20, rng)
+        reports = benchmark_index.run_benchmark(self.vectors, queries, ["flat", "ivf", "hnsw"],
+                                                k=3, index_params={"nlist": 16})
+        self.assertEqual([r["index_type"] for r in reports], ["flat", "ivf", "hnsw"])
+        self.assertEqual(reports[0]["recall"], 1.0)
+        for report in reports:
+            self.assertGreater(report["recall"], 0.5)
+            self.assertLessEqual(report["p50_ms"], report["p99_ms"])
+
+
+if __name__ == '__main__':
+    unittest.main()
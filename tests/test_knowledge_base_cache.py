@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+测试知识库检索的查询向量缓存和结果缓存
+"""
+
+import sys
+import os
+import unittest
+from unittest.mock import patch, MagicMock
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import knowledge_base_search as kb
+from tools.knowledge_base_search import VectorDBSnapshot
+
+
+class TestKnowledgeBaseCache(unittest.TestCase):
+    def setUp(self):
+        kb.query_embedding_cache.clear()
+        kb.search_result_cache.clear()
+        self.index = MagicMock()
+        self.index.search.return_value = (np.array([[0.9, 0.8]]), np.array([[1, -1]]))
+        self.snapshot = VectorDBSnapshot("v1", self.index, ["文本块0", "文本块1"])
+        self.fake_model = MagicMock()
+        self.fake_model.encode.side_effect = lambda texts: np.ones((len(texts), 4), dtype='float32')
+        self.patchers = [
+            patch.object(kb, 'get_model', return_value=self.fake_model),
+            patch.object(kb.vector_db_manager, 'get', side_effect=lambda: self.snapshot),
+        ]
+        for p in self.patchers:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patchers:
+            p.stop()
+
+    def test_repeated_query_skips_encoder_and_search(self):
+        """重复查询应直接命中结果缓存"""
+        self.assertEqual(kb.search_chunks("失眠怎么办", k=2), ["文本块1"])
+        self.assertEqual(kb.search_chunks("  失眠怎么办 ", k=2), ["文本块1"])
+        self.assertEqual(self.fake_model.encode.call_count, 1)
+        self.assertEqual(self.index.search.call_count, 1)
+        stats = kb.get_cache_stats()
+        self.assertEqual(stats["search_result"]["hits"], 1)
+
+    def test_new_index_version_reuses_embedding(self):
+        """索引版本变化后重新检索，但复用查询向量"""
+        kb.search_chunks("失眠怎么办", k=2)
+        self.snapshot = VectorDBSnapshot("v2", self.index, ["新文本块0", "新文本块1"])
+        self.assertEqual(kb.search_chunks("失眠怎么办", k=2), ["新文本块1"])
+        self.assertEqual(self.fake_model.encode.call_count, 1)
+        self.assertEqual(self.index.search.call_count, 2)
+        self.assertEqual(kb.get_cache_stats()["query_embedding"]["hits"], 1)
+
+    def test_encoder_receives_original_case(self):
+        """嵌入模型区分大小写：向量检索使用查询原文，大小写不同的查询分别编码"""
+        kb.search_chunks("什么是 CBT", k=2)
+        kb.search_chunks("什么是 cbt", k=2)
+        encoded = [call.args[0] for call in self.fake_model.encode.call_args_list]
+        self.assertEqual(encoded, [["什么是 CBT"], ["什么是 cbt"]])
+
+    def test_normalize_query(self):
+        """全角字符、大小写和多余空白应被规范化"""
+        self.assertEqual(kb.normalize_query(" ＣＢＴ  是什么？ "), "cbt 是什么?")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+测试微批处理推理工作线程及情感分析工具的批处理调用
+"""
+
+import sys
+import os
+import threading
+import unittest
+from unittest.mock import patch
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.micro_batcher import MicroBatcher
+from tools.emotion_cache import EmotionCache
+
+
+class TestMicroBatcher(unittest.TestCase):
+    def test_concurrent_requests_are_batched(self):
+        """并发提交的输入应合并为少数几次批量推理，并各自拿到对应结果"""
+        batches = []
+
+        def process(items):
+            batches.append(list(items))
+            return [item * 2 for item in items]
+
+        batcher = MicroBatcher(process, max_batch_size=8, max_wait=0.2)
+        results = {}
+        threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, batcher.infer(i, timeout=5)))
+                   for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(results, {i: i * 2 for i in range(8)})
+        self.assertLess(len(batches), 8)
+        stats = batcher.stats()
+        self.assertEqual(stats["total_items"], 8)
+        self.assertEqual(stats["total_batches"], len(batches))
+        self.assertGreater(stats["avg_batch_size"], 1)
+        self.assertEqual(stats["queue_depth"], 0)
+
+    def test_max_batch_size(self):
+        """单批不超过 max_batch_size"""
+        batches = []
+        batcher = MicroBatcher(lambda items: batches.append(len(items)) or list(items),
+                               max_batch_size=3, max_wait=0.05)
+        futures = [batcher.submit(i) for i in range(7)]
+        self.assertEqual([f.result(timeout=5) for f in futures], list(range(7)))
+        self.assertTrue(all(size <= 3 for size in batches))
+
+    def test_batch_error_is_raised_to_callers(self):
+        """批量推理出错时每个调用方都应收到异常，工作线程继续可用"""
+        calls = []
+
+        def process(items):
+            calls.append(items)
+            if len(calls) == 1:
+                raise RuntimeError("推理失败")
+            return list(items)
+
+        batcher = MicroBatcher(process, max_wait=0)
+        with self.assertRaises(RuntimeError):
+            batcher.infer("a", timeout=5)
+        self.assertEqual(batcher.infer("b", timeout=5), "b")
+
+
+class TestEmotionTool(unittest.TestCase):
+    def test_tool_uses_batched_pipeline(self):
+        """情感分析工具应通过批处理调用模型并格式化结果"""
+        from tools import HF_emotion_recognition as emotion
+
+        def fake_classify(texts):
+            return [{"label": "Negative", "score": 0.875} for _ in texts]
+
+        batcher = MicroBatcher(fake_classify, max_wait=0)
+        with patch.object(emotion, 'emotion_batcher', batcher), \
+                patch.object(emotion, 'emotion_cache', EmotionCache()):
+            result = emotion.hf_emotion_recognition_tool.invoke("我今天很难过")
+            self.assertEqual(result, "情感类别: 消极，（置信度: 0.88）")
+            # 相同文本第二次调用直接命中缓存
+            self.assertEqual(emotion.hf_emotion_recognition_tool.invoke("我今天 很难过"), result)
+        self.assertEqual(batcher.stats()["total_items"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
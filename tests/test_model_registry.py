@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+测试模型注册表的延迟加载、并发加载和后台预热
+"""
+
+import sys
+import os
+import time
+import threading
+import unittest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.model_registry import ModelRegistry
+
+
+class TestModelRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = ModelRegistry()
+        self.load_count = 0
+
+    def slow_loader(self):
+        self.load_count += 1
+        time.sleep(0.05)
+        return object()
+
+    def test_lazy_loading(self):
+        """注册时不加载，第一次获取时才加载并记录耗时"""
+        self.registry.register("model", self.slow_loader)
+        self.assertEqual(self.load_count, 0)
+        self.assertFalse(self.registry.is_loaded("model"))
+
+        model = self.registry.get("model")
+        self.assertIs(self.registry.get("model"), model)
+        self.assertEqual(self.load_count, 1)
+        stats = self.registry.stats()["model"]
+        self.assertTrue(stats["loaded"])
+        self.assertGreater(stats["load_seconds"], 0)
+
+    def test_concurrent_first_use_loads_once(self):
+        """多个线程同时首次获取时只加载一次"""
+        self.registry.register("model", self.slow_loader)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.registry.get("model")))
+                   for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(self.load_count, 1)
+        self.assertEqual(len({id(r) for r in results}), 1)
+
+    def test_failed_load_is_retried(self):
+        """加载失败时抛出异常，下次获取时重新尝试"""
+        calls = []
+
+        def flaky_loader():
+            calls.append(1)
+            if len(calls) == 1:
+                raise RuntimeError("网络错误")
+            return "model"
+
+        self.registry.register("model", flaky_loader)
+        with self.assertRaises(RuntimeError):
+            self.registry.get("model")
+        self.assertEqual(self.registry.stats()["model"]["error"], "网络错误")
+        self.assertEqual(self.registry.get("model"), "model")
+
+    def test_background_warmup(self):
+        """后台预热不阻塞调用方，失败的模型不影响其他模型"""
+        self.registry.register("model", self.slow_loader)
+        self.registry.register("broken", lambda: 1 / 0)
+        thread = self.registry.warmup()
+        thread.join(timeout=5)
+        self.assertTrue(self.registry.is_loaded("model"))
+        self.assertFalse(self.registry.is_loaded("broken"))
+
+    def test_unknown_model(self):
+        with self.assertRaises(KeyError):
+            self.registry.get("missing")
+
+
+if __name__ == '__main__':
+    unittest.main()
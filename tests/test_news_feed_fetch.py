@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+测试新闻网站RSS源的并发获取、共享缓存和索引检索（不访问网络）
+"""
+
+import sys
+import os
+import time
+import threading
+import unittest
+from unittest.mock import patch, MagicMock
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import news_website_search as news
+from tools.news_website_search import HostRateLimiter
+from tools.feed_cache import FeedCache
+from tools.news_index import NewsIndex, tokenize
+from tools.http_client import http_client
+
+
+def rss(*titles):
+    items = "".join(f"<item><title>{t}</title><link>https://example.com/{i}</link></item>"
+                    for i, t in enumerate(titles))
+    return f"<?xml version='1.0'?><rss><channel>{items}</channel></rss>".encode("utf-8")
+
+
+FEEDS = {
+    "A": "https://a.example.com/rss",
+    "B": "https://b.example.com/rss",
+    "C": "https://c.example.com/rss",
+}
+
+
+class FakeGet:
+    """模拟requests.get：每个URL延迟 delay 秒返回对应内容"""
+
+    def __init__(self, contents, delays=None):
+        self.contents = contents
+        self.delays = delays or {}
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, url, headers=None, timeout=None):
+        with self._lock:
+            self.calls.append(url)
+        time.sleep(self.delays.get(url, 0.2))
+        if isinstance(self.contents[url], Exception):
+            raise self.contents[url]
+        response = MagicMock()
+        response.status_code = 200
+        response.headers = {}
+        response.content = self.contents[url]
+        return response
+
+
+class TestNewsWebsiteSearch(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # 预先加载jieba词典，避免首次分词的耗时计入并发获取的时间
+        tokenize("预热")
+
+    def setUp(self):
+        self.patchers = [
+            patch.object(news, 'NEWS_RSS_FEEDS', FEEDS),
+            patch.object(news, 'host_rate_limiter', HostRateLimiter(0.5)),
+            patch.object(news, 'feed_cache', FeedCache()),
+            patch.object(news, 'news_index', NewsIndex()),
+        ]
+        for p in self.patchers:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patchers:
+            p.stop()
+
+    def test_feeds_fetched_concurrently_and_once(self):
+        """所有源并发获取，没有匹配时备选结果复用同一份解析结果"""
+        fake_get = FakeGet({
+            FEEDS["A"]: rss("Weather today", "Sports news"),
+            FEEDS["B"]: rss("Market update"),
+            FEEDS["C"]: ConnectionError("down"),
+        })
+        start = time.monotonic()
+        with patch.object(http_client, 'get', side_effect=fake_get):
+            result = news.search_news_websites.invoke("不存在的关键词")
+        elapsed = time.monotonic() - start
+
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(sorted(fake_get.calls), sorted(FEEDS.values()))
+        self.assertIn("Weather today", result)
+        self.assertIn("Market update", result)
+
+    def test_keyword_match(self):
+        fake_get = FakeGet({
+            FEEDS["A"]: rss("Weather today", "Sports news"),
+            FEEDS["B"]: rss("Sports final"),
+            FEEDS["C"]: rss("Other"),
+        })
+        with patch.object(http_client, 'get', side_effect=fake_get):
+            result = news.search_news_websites.invoke("sports")
+        self.assertIn("Sports news", result)
+        self.assertIn("Sports final", result)
+        self.assertNotIn("Weather today", result)
+
+    def test_global_deadline(self):
+        """超过总时限的源被忽略，其余结果照常返回"""
+        fake_get = FakeGet({
+            FEEDS["A"]: rss("Fast news"),
+            FEEDS["B"]: rss("Slow news"),
+            FEEDS["C"]: rss("Fast news 2"),
+        }, delays={FEEDS["B"]: 1.0})
+        start = time.monotonic()
+        with patch.object(http_client, 'get', side_effect=fake_get):
+            parsed = news.fetch_all_feeds(deadline_seconds=0.4)
+        self.assertLess(time.monotonic() - start, 0.8)
+        self.assertEqual(list(parsed), ["A", "C"])
+
+
+class TestHostRateLimiter(unittest.TestCase):
+    def test_same_host_is_spaced(self):
+        limiter = HostRateLimiter(0.1)
+        start = time.monotonic()
+        limiter.acquire("https://a.example.com/1")
+        limiter.acquire("https://b.example.com/1")
+        self.assertLess(time.monotonic() - start, 0.05)
+        limiter.acquire("https://a.example.com/2")
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+    def test_slot_after_deadline(self):
+        limiter = HostRateLimiter(10)
+        limiter.acquire("https://a.example.com/1")
+        self.assertFalse(limiter.acquire("https://a.example.com/2", deadline=time.monotonic() + 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
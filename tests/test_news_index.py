@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+测试新闻条目倒排索引
+"""
+
+import sys
+import os
+import unittest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.news_index import NewsIndex
+
+
+ENTRIES = [
+    {'title': '研究发现睡眠不足会加重焦虑', 'url': 'https://a.example.com/1', 'summary': '一项针对大学生的调查显示……'},
+    {'title': '心理咨询师谈如何应对考试压力', 'url': 'https://a.example.com/2', 'summary': '专家建议通过规律作息缓解焦虑情绪'},
+    {'title': 'Local team wins the final', 'url': 'https://a.example.com/3', 'summary': 'Sports fans celebrate'},
+]
+
+
+class TestNewsIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = NewsIndex()
+        self.index.update_feed("A", ENTRIES)
+
+    def titles(self, query):
+        return [entry['title'] for entry, _ in self.index.search(query)]
+
+    def test_chinese_partial_match(self):
+        """中文查询应能匹配标题中的词语，而不要求整句出现"""
+        self.assertEqual(self.titles("焦虑")[0], ENTRIES[0]['title'])
+        self.assertIn(ENTRIES[1]['title'], self.titles("焦虑"))
+        self.assertEqual(self.titles("考试压力大怎么办")[0], ENTRIES[1]['title'])
+
+    def test_summary_and_case_insensitive(self):
+        self.assertEqual(self.titles("SPORTS"), [ENTRIES[2]['title']])
+        self.assertEqual(self.titles("不存在的词"), [])
+
+    def test_multi_term_ranking(self):
+        """命中更多查询词的条目排在前面"""
+        self.assertEqual(self.titles("焦虑 睡眠")[0], ENTRIES[0]['title'])
+
+    def test_incremental_feed_update(self):
+        """源刷新后只替换该源的条目"""
+        self.index.update_feed("B", [{'title': '焦虑自助指南', 'url': 'https://b.example.com/1', 'summary': ''}])
+        self.index.update_feed("A", ENTRIES[2:])
+        self.assertEqual(len(self.index), 2)
+        self.assertEqual(self.titles("焦虑"), ['焦虑自助指南'])
+        results = self.index.search("焦虑")
+        self.assertEqual(results[0][0]['site'], "B")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+测试服务器端会话存储，以及聊天页面从数据库读取消息
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import database
+from database import create_db_engine, init_db
+from models import ChatSession, ChatMessage, WebSession
+import app as app_module
+
+
+class FakeAgent:
+    """模拟DogAgent，回复固定内容"""
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+
+    def stream(self, user_input):
+        yield {'type': 'token', 'content': '汪！'}
+        yield {'type': 'end', 'content': f'汪！收到：{user_input}'}
+
+
+class TestServerSideSession(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.engine = create_db_engine(f"sqlite:///{os.path.join(self.temp_dir, 'session.db')}")
+        init_db(self.engine)
+        database.ScopedSession.remove()
+        database.ScopedSession.configure(bind=self.engine)
+        self.client = app_module.app.test_client()
+        self.patchers = [
+            patch.object(app_module, 'DogAgent', FakeAgent),
+            patch.object(app_module, 'start_emotion_recognition', lambda text: None),
+        ]
+        for p in self.patchers:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patchers:
+            p.stop()
+        database.ScopedSession.remove()
+        database.ScopedSession.configure(bind=database.engine)
+        self.engine.dispose()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _cookie(self):
+        return self.client.get_cookie(app_module.app.config['SESSION_COOKIE_NAME'])
+
+    def _chat(self, text):
+        response = self.client.post('/chat_stream', data={'topic': text, 'model_provider': 'deepseek'})
+        return response.get_data(as_text=True)
+
+    def test_conversation_continues_across_requests(self):
+        """生成器开始前保存的会话ID在第二轮对话中仍然有效"""
+        self._chat('你好')
+        self._chat('今天有点累' * 500)
+        db_session = database.SessionLocal()
+        try:
+            self.assertEqual(db_session.query(ChatSession).count(), 1)
+            self.assertEqual(db_session.query(ChatMessage).count(), 4)
+        finally:
+            db_session.close()
+
+    def test_cookie_holds_only_session_id(self):
+        self._chat('今天有点累' * 500)
+        cookie = self._cookie()
+        self.assertIsNotNone(cookie)
+        self.assertLess(len(cookie.value), 100)
+        db_session = database.SessionLocal()
+        try:
+            record = db_session.get(WebSession, cookie.value)
+            self.assertIn('session_id', app_module.app.session_interface.serializer.loads(record.data))
+        finally:
+            db_session.close()
+
+    def test_get_renders_messages_from_database(self):
+        self._chat('第一个问题')
+        page = self.client.get('/chat_stream').get_data(as_text=True)
+        self.assertIn('第一个问题', page)
+        self.assertIn('汪！收到：第一个问题', page)
+
+    def test_new_chat_clears_conversation(self):
+        self._chat('你好')
+        self.client.get('/new')
+        with self.client.session_transaction() as sess:
+            self.assertNotIn('session_id', sess)
+            self.assertEqual(sess['language'], 'zh')  # 语言设置保留
+        self.assertNotIn('你好', self.client.get('/chat_stream').get_data(as_text=True))
+
+    def test_emptied_session_is_deleted(self):
+        self._chat('你好')
+        sid = self._cookie().value
+        with self.client.session_transaction() as sess:
+            sess.clear()
+        self.assertIsNone(self._cookie())
+        db_session = database.SessionLocal()
+        try:
+            self.assertIsNone(db_session.get(WebSession, sid))
+        finally:
+            db_session.close()
+
+    def test_unknown_or_expired_session_id_is_replaced(self):
+        self._chat('你好')
+        sid = self._cookie().value
+        db_session = database.SessionLocal()
+        try:
+            db_session.get(WebSession, sid).expires_at = datetime.utcnow() - timedelta(seconds=1)
+            db_session.commit()
+        finally:
+            db_session.close()
+        self._chat('新的对话')
+        self.assertNotEqual(self._cookie().value, sid)
+
+    def test_pages_without_session_changes_do_not_write(self):
+        self.client.get('/chat_stream')
+        self.assertIsNone(self._cookie())
+        db_session = database.SessionLocal()
+        try:
+            self.assertEqual(db_session.query(WebSession).count(), 0)
+        finally:
+            db_session.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+测试Read_URL_Content的流式正文提取和内容缓存（不访问网络）
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import url_reader
+from tools.url_reader import extract_page
+from tools.http_client import http_client
+from tools.content_cache import ContentCache
+
+
+class FakeResponse:
+    """模拟流式响应，记录被读取的块数"""
+
+    def __init__(self, body: bytes, content_type="text/html; charset=utf-8", chunk_size=1024):
+        self.body = body
+        self.headers = {"Content-Type": content_type} if content_type else {}
+        self.chunk_size = chunk_size
+        self.chunks_read = 0
+
+    def iter_content(self, chunk_size=None):
+        for start in range(0, len(self.body), self.chunk_size):
+            self.chunks_read += 1
+            yield self.body[start:start + self.chunk_size]
+
+    def raise_for_status(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+PAGE = """<html><head><title> 睡眠与焦虑 </title><style>body {color: red}</style>
+<script>var x = "不应出现";</script></head>
+<body><nav>首页 | 关于</nav><h1>如何改善睡眠</h1><p>规律作息，睡前  避免使用手机。</p>
+<footer>版权所有</footer></body></html>""".encode("utf-8")
+
+
+class TestURLReader(unittest.TestCase):
+    def setUp(self):
+        # 使用临时的内容缓存，避免测试之间互相命中
+        self.temp_dir = tempfile.mkdtemp()
+        patcher = patch.object(url_reader, 'content_cache', ContentCache(os.path.join(self.temp_dir, 'cache.db')))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_extract_title_and_main_text(self):
+        title, text, truncated = extract_page(FakeResponse(PAGE))
+        self.assertEqual(title, "睡眠与焦虑")
+        self.assertEqual(text, "如何改善睡眠 规律作息，睡前 避免使用手机。")
+        self.assertFalse(truncated)
+
+    def test_stops_after_enough_text(self):
+        """收集到足够正文后停止读取剩余内容"""
+        body = ("<html><body>" + "<p>心理健康知识。</p>" * 5000 + "</body></html>").encode("utf-8")
+        response = FakeResponse(body)
+        title, text, truncated = extract_page(response, max_chars=100)
+        self.assertTrue(truncated)
+        self.assertEqual(len(text), 100)
+        self.assertLess(response.chunks_read, len(body) // 1024 // 10)
+
+    def test_indentation_does_not_count_towards_limit(self):
+        """标签之间的缩进不计入正文长度，按合并空白后的文字判断是否截断"""
+        blocks = "".join(f"\n    <div>\n        <p>word{i}</p>\n    </div>" for i in range(400))
+        body = f"<html>\n<body>{blocks}\n</body>\n</html>".encode("utf-8")
+        _, text, truncated = extract_page(FakeResponse(body), max_chars=3000)
+        expected = " ".join(f"word{i}" for i in range(400))
+        self.assertEqual(text, expected[:3000])
+        self.assertEqual(truncated, len(expected) > 3000)
+
+        _, text, truncated = extract_page(FakeResponse(body), max_chars=10 ** 4)
+        self.assertEqual(text, expected)
+        self.assertFalse(truncated)
+
+    def test_byte_limit(self):
+        body = ("<html><body><p>" + "a " * 100000 + "</p></body></html>").encode("utf-8")
+        response = FakeResponse(body)
+        _, _, truncated = extract_page(response, max_bytes=4096, max_chars=10 ** 6)
+        self.assertTrue(truncated)
+        self.assertEqual(response.chunks_read, 5)
+
+    def test_charset_from_meta(self):
+        """响应头没有声明编码时按页面meta标签解码"""
+        body = '<html><head><meta charset="gbk"><title>中文标题</title></head><body>正文</body></html>'.encode("gbk")
+        title, text, _ = extract_page(FakeResponse(body, content_type="text/html"))
+        self.assertEqual(title, "中文标题")
+        self.assertEqual(text, "正文")
+
+    def test_tool_skips_non_html(self):
+        """非HTML内容只根据响应头判断，不读取正文"""
+        response = FakeResponse(b"%PDF-1.4 ...", content_type="application/pdf")
+        with patch.object(http_client, 'get', return_value=response):
+            result = url_reader.url_reader_tool.read_url_content.invoke("https://example.com/a.pdf")
+        self.assertIn("不支持的内容类型 application/pdf", result)
+        self.assertEqual(response.chunks_read, 0)
+
+    def test_tool_output_format(self):
+        with patch.object(http_client, 'get', return_value=FakeResponse(PAGE)):
+            result = url_reader.url_reader_tool.read_url_content.invoke("https://example.com/sleep")
+        self.assertTrue(result.startswith("网页标题: 睡眠与焦虑\n\nURL: https://example.com/sleep\n\n内容:\n如何改善睡眠"))
+
+    def test_tool_repeat_read_uses_cache(self):
+        """同一页面（忽略跟踪参数）第二次读取直接返回缓存，不再发出请求"""
+        with patch.object(http_client, 'get', return_value=FakeResponse(PAGE)) as mock_get:
+            first = url_reader.url_reader_tool.read_url_content.invoke("https://example.com/sleep?utm_source=x")
+            second = url_reader.url_reader_tool.read_url_content.invoke("https://example.com/sleep")
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(first.split("内容:")[1], second.split("内容:")[1])
+
+    def test_tool_respects_no_store(self):
+        response = FakeResponse(PAGE)
+        response.headers["Cache-Control"] = "no-store"
+        with patch.object(http_client, 'get', return_value=response) as mock_get:
+            url_reader.url_reader_tool.read_url_content.invoke("https://example.com/private")
+            url_reader.url_reader_tool.read_url_content.invoke("https://example.com/private")
+        self.assertEqual(mock_get.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+测试常驻内存的知识库向量数据库管理器
+"""
+
+import sys
+import os
+import unittest
+from unittest.mock import patch
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.knowledge_base_search import VectorDBManager
+
+
+class TestVectorDBManager(unittest.TestCase):
+    def setUp(self):
+        self.version = "v1"
+        self.load_count = 0
+
+        def fake_load():
+            self.load_count += 1
+            return f"index-{self.version}", [f"chunk-{self.version}"]
+
+        self.patchers = [
+            patch('tools.knowledge_base_search.load_vector_db', side_effect=fake_load),
+            patch('tools.knowledge_base_search.get_vector_db_version', side_effect=lambda: self.version),
+        ]
+        for p in self.patchers:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patchers:
+            p.stop()
+
+    def test_loads_once(self):
+        """版本不变时只加载一次"""
+        manager = VectorDBManager(check_interval=0)
+        for _ in range(5):
+            snapshot = manager.get()
+        self.assertEqual(self.load_count, 1)
+        self.assertEqual(snapshot.index, "index-v1")
+
+    def test_reload_on_version_change(self):
+        """版本变化后应加载新版本，旧快照保持不变"""
+        manager = VectorDBManager(check_interval=0)
+        old_snapshot = manager.get()
+        self.version = "v2"
+        new_snapshot = manager.get()
+        self.assertEqual(self.load_count, 2)
+        self.assertEqual(new_snapshot.metadata, ["chunk-v2"])
+        self.assertEqual(old_snapshot.metadata, ["chunk-v1"])
+
+    def test_check_interval(self):
+        """检查间隔内不访问磁盘版本"""
+        manager = VectorDBManager(check_interval=3600)
+        manager.get()
+        self.version = "v2"
+        self.assertEqual(manager.get().version, "v1")
+        manager.invalidate()
+        self.assertEqual(manager.get().version, "v2")
+
+    def test_keep_old_version_on_reload_error(self):
+        """重新加载失败时继续使用旧版本"""
+        manager = VectorDBManager(check_interval=0)
+        manager.get()
+        self.version = "v2"
+        with patch('tools.knowledge_base_search.load_vector_db', side_effect=OSError("损坏")):
+            self.assertEqual(manager.get().version, "v1")
+
+
+if __name__ == '__main__':
+    unittest.main()
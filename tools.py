@@ -3,6 +3,8 @@ from langchain.tools import tool
 from newsapi import NewsApiClient
 from newspaper import Article
 import os
+from tools.http_client import http_client, html_text
+from tools.content_cache import content_cache, cache_ttl_from_headers
 
 # 加载 .env 文件中的环境变量
 load_dotenv()
@@ -54,10 +56,24 @@ class NewsTools:
         输入应该是一个有效的新闻文章链接。
         """
         try:
+            # 先查内容缓存（按规范化URL），命中时不再下载和解析
+            cached = content_cache.get("article", url)
+            if cached is not None:
+                return cached["text"]
+
+            # 通过共享的HTTP客户端下载，再交给newspaper解析
+            response = http_client.get(url)
+            response.raise_for_status()
             article = Article(url)
-            article.download()
+            # 响应头没有声明编码时按页面meta或内容推断的编码解码，避免中文页面乱码
+            article.download(input_html=html_text(response))
             article.parse()
 
+            # 没有提取到正文时不缓存，下次重新尝试
+            if article.text:
+                content_cache.set("article", url, {"title": article.title, "text": article.text},
+                                  ttl=cache_ttl_from_headers(response.headers))
+
             # 为了结果的简洁性，我们只返回文章的核心文本
             return article.text
 
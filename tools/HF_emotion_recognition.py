@@ -1,10 +1,88 @@
 import os
 ## requirements： pip install transformers torch
 from langchain.tools import tool
-from transformers import pipeline
+from tools.model_registry import model_registry
+from concurrent.futures import Future
+from tools.micro_batcher import MicroBatcher
+from tools.emotion_cache import emotion_cache
 
-# 加载 HuggingFace 情感分析模型
-pipe = pipeline("text-classification", model="tabularisai/multilingual-sentiment-analysis")
+EMOTION_MODEL_NAME = "tabularisai/multilingual-sentiment-analysis"
+# 模型版本，更换模型或升级权重时修改，旧版本的缓存结果随之失效
+EMOTION_MODEL_VERSION = os.getenv("HF_EMOTION_MODEL_VERSION", "1")
+# 微批处理参数：每批最多条数、收到第一条后最多等待的秒数、单次调用的超时秒数（含首次加载模型）
+EMOTION_MAX_BATCH_SIZE = 16
+EMOTION_MAX_WAIT = 0.01
+EMOTION_TIMEOUT = 120
+
+
+def load_emotion_pipeline():
+    """加载 HuggingFace 情感分析模型（transformers 导入较慢，放在首次使用时）"""
+    from transformers import pipeline
+    return pipeline("text-classification", model=EMOTION_MODEL_NAME)
+
+
+# 只注册加载函数，第一次调用时才加载模型
+model_registry.register("emotion_classifier", load_emotion_pipeline)
+
+
+def get_emotion_pipeline():
+    return model_registry.get("emotion_classifier")
+
+
+def classify_emotions(texts: list) -> list:
+    """对一批文本做一次批量前向推理，返回每条文本的 {"label", "score"}"""
+    return get_emotion_pipeline()(list(texts), batch_size=len(texts), truncation=True)
+
+
+# 微批处理：并发请求的文本在几毫秒内合并成一批推理，避免每个请求单独占用CPU做前向计算
+emotion_batcher = MicroBatcher(classify_emotions, max_batch_size=EMOTION_MAX_BATCH_SIZE,
+                               max_wait=EMOTION_MAX_WAIT, name="emotion-batcher")
+
+def recognize_emotion_async(text: str) -> Future:
+    """
+    开始识别文本情绪，返回模型原始结果的Future。
+    相同（规范化后）文本的结果直接从缓存返回，不再进行模型推理。
+    """
+    cached = emotion_cache.get(EMOTION_MODEL_NAME, EMOTION_MODEL_VERSION, text)
+    if cached is not None:
+        future = Future()
+        future.set_result(cached)
+        return future
+
+    def store(done: Future):
+        if not done.cancelled() and done.exception() is None:
+            emotion_cache.set(EMOTION_MODEL_NAME, EMOTION_MODEL_VERSION, text, done.result())
+
+    future = emotion_batcher.submit(text)
+    future.add_done_callback(store)
+    return future
+
+# 映射为强度分数
+LABEL_MAP = {
+    "Very Negative": "非常消极",
+    "Negative": "消极",
+    "Neutral": "中性",
+    "Positive": "积极",
+    "Very Positive": "非常积极"
+}
+
+
+def format_emotion_result(result) -> str:
+    """将模型输出格式化为工具返回的文本"""
+    if not result or not isinstance(result, dict):
+        return "未能识别出有效情绪。"
+    label = result.get("label", "未知")
+    score = result.get("score", 0)
+    zh_label = LABEL_MAP.get(label, label)
+    # intensity = int(round(score * 10))
+    return f"情感类别: {zh_label}，（置信度: {score:.2f}）"
+
+
+def get_emotion_stats() -> dict:
+    """返回情感分析批处理的队列深度、批大小和结果缓存统计"""
+    stats = emotion_batcher.stats()
+    stats["cache"] = emotion_cache.stats()
+    return stats
 
 @tool("HF_Emotion_Recognition")
 def hf_emotion_recognition_tool(text: str) -> str:
@@ -15,21 +93,6 @@ def hf_emotion_recognition_tool(text: str) -> str:
     缺点：响应较慢，可能得挂梯子
     """
     try:
-        result = pipe(text)
-        if not result or not isinstance(result, list):
-            return "未能识别出有效情绪。"
-        label = result[0].get("label", "未知")
-        score = result[0].get("score", 0)
-        # 映射为强度分数
-        label_map = {
-            "Very Negative": "非常消极",
-            "Negative": "消极",
-            "Neutral": "中性",
-            "Positive": "积极",
-            "Very Positive": "非常积极"
-        }
-        zh_label = label_map.get(label, label)
-        # intensity = int(round(score * 10))
-        return f"情感类别: {zh_label}，（置信度: {score:.2f}）"
+        return format_emotion_result(recognize_emotion_async(text).result(timeout=EMOTION_TIMEOUT))
     except Exception as e:
-        return f"HuggingFace情感分析调用失败: {e}"
\ No newline at end of file
+        return f"HuggingFace情感分析调用失败: {e}"
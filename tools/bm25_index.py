@@ -0,0 +1,102 @@
+import os
+import math
+import unicodedata
+from collections import Counter, defaultdict
+import numpy as np
+import jieba
+
+
+def tokenize(text: str) -> list:
+    """使用jieba搜索引擎模式分词，统一全角/半角和大小写，并去掉标点和空白"""
+    text = unicodedata.normalize("NFKC", text).lower()
+    return [token.strip() for token in jieba.cut_for_search(text)
+            if token.strip() and any(ch.isalnum() for ch in token)]
+
+
+def write_bm25_index(chunks, ids, path: str, k1: float = 1.5, b: float = 0.75):
+    """
+    为文本块构建BM25倒排索引并保存为非pickle的npz文件。
+    每个词项的倒排列表中直接保存预先计算好的BM25得分，查询时只需按词项累加。
+    """
+    postings = defaultdict(list)  # 词项 -> [(文本块ID, 词频)]
+    doc_lengths = []
+    for chunk_id, chunk in zip(ids, chunks):
+        tokens = tokenize(chunk)
+        doc_lengths.append(len(tokens))
+        for term, tf in Counter(tokens).items():
+            postings[term].append((int(chunk_id), tf))
+
+    doc_count = len(doc_lengths)
+    avgdl = (sum(doc_lengths) / doc_count) if doc_count else 0.0
+    length_by_id = {int(chunk_id): length for chunk_id, length in zip(ids, doc_lengths)}
+
+    terms = sorted(postings)
+    term_offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    posting_ids = []
+    posting_scores = []
+    for i, term in enumerate(terms):
+        entries = postings[term]
+        idf = math.log(1 + (doc_count - len(entries) + 0.5) / (len(entries) + 0.5))
+        for chunk_id, tf in entries:
+            norm = k1 * (1 - b + b * length_by_id[chunk_id] / avgdl) if avgdl else k1
+            posting_ids.append(chunk_id)
+            posting_scores.append(idf * tf * (k1 + 1) / (tf + norm))
+        term_offsets[i + 1] = len(posting_ids)
+
+    tmp_path = path + ".tmp.npz"
+    np.savez(
+        tmp_path,
+        terms=np.array(terms, dtype=str),
+        term_offsets=term_offsets,
+        posting_ids=np.array(posting_ids, dtype=np.int64),
+        posting_scores=np.array(posting_scores, dtype=np.float32),
+    )
+    os.replace(tmp_path, path)
+
+
+class BM25Index:
+    """
+    只读的BM25倒排索引。
+    加载时建立词项到倒排列表的映射，查询时只对查询本身分词并累加预先计算好的得分。
+    """
+
+    def __init__(self, path: str):
+        with np.load(path, allow_pickle=False) as data:
+            terms = data["terms"]
+            self.term_offsets = data["term_offsets"]
+            self.posting_ids = data["posting_ids"]
+            self.posting_scores = data["posting_scores"]
+        self.term_index = {str(term): i for i, term in enumerate(terms)}
+
+    def __len__(self):
+        return len(self.term_index)
+
+    def search(self, query: str, k: int = 10) -> list:
+        """返回得分最高的k个 (文本块ID, BM25得分)"""
+        slices = []
+        for term in set(tokenize(query)):
+            i = self.term_index.get(term)
+            if i is not None:
+                slices.append(slice(self.term_offsets[i], self.term_offsets[i + 1]))
+        if not slices:
+            return []
+
+        ids = np.concatenate([self.posting_ids[s] for s in slices])
+        scores = np.concatenate([self.posting_scores[s] for s in slices])
+        unique_ids, inverse = np.unique(ids, return_inverse=True)
+        totals = np.bincount(inverse, weights=scores)
+        # 得分降序，同分时ID升序
+        order = np.lexsort((unique_ids, -totals))[:k]
+        return [(int(unique_ids[i]), float(totals[i])) for i in order]
+
+
+def reciprocal_rank_fusion(rankings, k: int = 60) -> list:
+    """
+    倒数排名融合：每个结果的得分为其在各个排名列表中 1/(k+名次) 之和。
+    rankings 为若干个按相关性排序的ID列表，返回融合后按得分排序的ID列表。
+    """
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] += 1.0 / (k + rank + 1)
+    return [item for item, _ in sorted(scores.items(), key=lambda entry: -entry[1])]
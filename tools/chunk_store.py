@@ -0,0 +1,107 @@
+import os
+import mmap
+import numpy as np
+
+
+def write_chunk_store(chunks, blob_path: str, offsets_path: str, ids=None, ids_path: str = None):
+    """
+    将文本块写入偏移量索引的UTF-8文件。
+    blob_path 中依次存放所有文本块的UTF-8字节，
+    offsets_path 中存放 len(chunks)+1 个int64偏移量（非pickle格式），第i块为 [offsets[i], offsets[i+1])。
+    如果提供了 ids（与 chunks 一一对应的文本块ID），按ID升序写入，并把ID数组保存到 ids_path。
+    所有文件都先写入临时文件再原子替换。
+    """
+    if ids is not None:
+        if len(ids) != len(chunks):
+            raise ValueError("文本块ID数量与文本块数量不一致")
+        order = np.argsort(np.asarray(ids, dtype=np.int64), kind='stable')
+        chunks = [chunks[i] for i in order]
+        ids = np.asarray(ids, dtype=np.int64)[order]
+
+    offsets = np.zeros(len(chunks) + 1, dtype=np.int64)
+    tmp_blob_path = blob_path + ".tmp"
+    with open(tmp_blob_path, 'wb') as f:
+        position = 0
+        for i, chunk in enumerate(chunks):
+            data = chunk.encode('utf-8')
+            f.write(data)
+            position += len(data)
+            offsets[i + 1] = position
+
+    tmp_offsets_path = offsets_path + ".tmp.npy"
+    np.save(tmp_offsets_path, offsets, allow_pickle=False)
+
+    if ids is not None:
+        tmp_ids_path = ids_path + ".tmp.npy"
+        np.save(tmp_ids_path, ids, allow_pickle=False)
+        os.replace(tmp_ids_path, ids_path)
+
+    os.replace(tmp_blob_path, blob_path)
+    os.replace(tmp_offsets_path, offsets_path)
+
+
+class ChunkStore:
+    """
+    只读的文本块存储。
+    偏移量数组和文本文件都通过内存映射打开，只在访问某个文本块时才读取并解码对应字节，
+    多个进程可以共享操作系统的页缓存。
+    如果存在ID文件，可以通过 get() 按文本块ID（即FAISS返回的ID）查找，否则ID就是下标。
+    """
+
+    def __init__(self, blob_path: str, offsets_path: str, ids_path: str = None):
+        self.offsets = np.load(offsets_path, mmap_mode='r', allow_pickle=False)
+        self.ids = None
+        if ids_path and os.path.exists(ids_path):
+            self.ids = np.load(ids_path, mmap_mode='r', allow_pickle=False)
+        self._file = open(blob_path, 'rb')
+        # 空文件无法被mmap
+        if os.fstat(self._file.fileno()).st_size > 0:
+            self._blob = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._blob = b""
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        i = int(i)
+        if i < 0 or i >= len(self):
+            raise IndexError(f"文本块索引越界: {i}")
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        return self._blob[start:end].decode('utf-8')
+
+    def position_of(self, chunk_id):
+        """返回文本块ID对应的下标，不存在时返回None"""
+        chunk_id = int(chunk_id)
+        if self.ids is None:
+            return chunk_id if 0 <= chunk_id < len(self) else None
+        position = int(np.searchsorted(self.ids, chunk_id))
+        if position < len(self.ids) and int(self.ids[position]) == chunk_id:
+            return position
+        return None
+
+    def get(self, chunk_id, default=None):
+        """按文本块ID读取文本"""
+        position = self.position_of(chunk_id)
+        return self[position] if position is not None else default
+
+    def items(self):
+        """依次返回 (文本块ID, 文本)"""
+        for i in range(len(self)):
+            chunk_id = int(self.ids[i]) if self.ids is not None else i
+            yield chunk_id, self[i]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def close(self):
+        if isinstance(self._blob, mmap.mmap):
+            self._blob.close()
+        self._file.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
@@ -0,0 +1,178 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+import urllib.parse
+from typing import Optional
+import zstandard
+
+# 缓存文件路径和容量上限（压缩后的字节数）
+URL_CACHE_DB = os.getenv("URL_CACHE_DB", "url_cache.db")
+URL_CACHE_MAX_BYTES = int(os.getenv("URL_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# 响应头没有给出缓存时间时的默认有效期（秒）
+DEFAULT_TTL = 6 * 3600
+
+# 规范化URL时去掉的跟踪参数（另有 utm_* 前缀）。只包含专用于广告和点击跟踪的参数，
+# from、spm 等通用名称可能是分页或内容参数（如 ?from=20），不能去掉
+TRACKING_PARAMS = frozenset(["fbclid", "gclid", "dclid", "msclkid", "yclid", "mc_cid", "mc_eid", "igshid"])
+_MAX_AGE_RE = re.compile(r"(?:s-maxage|max-age)\s*=\s*(\d+)", re.I)
+
+
+def canonical_url(url: str) -> str:
+    """
+    规范化URL作为缓存键：协议和主机转为小写，去掉默认端口、片段和跟踪参数（utm_* 等），查询参数按名称排序。
+    """
+    parts = urllib.parse.urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    port = parts.port
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        host = f"{host}:{port}"
+    query = [(key, value) for key, value in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+             if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS]
+    query.sort()
+    return urllib.parse.urlunsplit((scheme, host, parts.path or "/", urllib.parse.urlencode(query), ""))
+
+
+def cache_ttl_from_headers(headers, default: float = DEFAULT_TTL) -> Optional[float]:
+    """
+    按HTTP缓存语义计算有效期（秒）：no-store/no-cache/private 返回None（不缓存），
+    优先使用 Cache-Control 的 s-maxage/max-age，其次是 Expires，否则使用默认值。
+    """
+    if headers is None:
+        return default
+    cache_control = (headers.get("Cache-Control") or "").lower()
+    if any(directive in cache_control for directive in ("no-store", "no-cache", "private")):
+        return None
+    match = _MAX_AGE_RE.search(cache_control)
+    if match:
+        max_age = int(match.group(1))
+        return max_age if max_age > 0 else None
+    expires = headers.get("Expires")
+    if expires:
+        from email.utils import parsedate_to_datetime
+        try:
+            ttl = parsedate_to_datetime(expires).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+        return ttl if ttl > 0 else None
+    return default
+
+
+class ContentCache:
+    """
+    网页正文缓存：以 (命名空间, 规范化URL) 为键，将提取后的标题和正文以zstd压缩后保存在SQLite中。
+    每条记录有各自的过期时间；总大小超过 max_bytes 时按最近访问时间淘汰最久未使用的记录。
+    数据库在第一次使用时才创建。
+    """
+
+    def __init__(self, db_path: str = URL_CACHE_DB, max_bytes: int = URL_CACHE_MAX_BYTES):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = None
+        self._compressor = zstandard.ZstdCompressor(level=3)
+        self._decompressor = zstandard.ZstdDecompressor()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS url_content ("
+                " key TEXT PRIMARY KEY,"
+                " data BLOB NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_url_content_last_access ON url_content (last_access)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _key(namespace: str, url: str) -> str:
+        return f"{namespace}:{canonical_url(url)}"
+
+    def get(self, namespace: str, url: str) -> Optional[dict]:
+        """读取未过期的缓存内容，未命中时返回None"""
+        key = self._key(namespace, url)
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT data, expires_at FROM url_content WHERE key = ?", (key,)).fetchone()
+            if row is None or row[1] <= now:
+                if row is not None:
+                    conn.execute("DELETE FROM url_content WHERE key = ?", (key,))
+                    conn.commit()
+                self.misses += 1
+                return None
+            conn.execute("UPDATE url_content SET last_access = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self.hits += 1
+        return json.loads(self._decompressor.decompress(row[0]).decode("utf-8"))
+
+    def set(self, namespace: str, url: str, value: dict, ttl: Optional[float] = DEFAULT_TTL):
+        """写入缓存；ttl为None或不大于0时不缓存"""
+        if not ttl or ttl <= 0:
+            return
+        data = self._compressor.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+        if len(data) > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO url_content (key, data, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (self._key(namespace, url), data, len(data), now + ttl, now)
+            )
+            self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection):
+        """删除过期记录，再按最近访问时间淘汰，直到总大小不超过上限"""
+        conn.execute("DELETE FROM url_content WHERE expires_at <= ?", (time.time(),))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM url_content").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = conn.execute("SELECT key, size FROM url_content ORDER BY last_access ASC").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM url_content WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM url_content")
+            conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            if self._conn is None:
+                entries, size = 0, 0
+            else:
+                entries, size = self._conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM url_content").fetchone()
+        return {
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+# 进程级单例，Read_URL_Content 和 Scrape_Article_Content 共用
+content_cache = ContentCache()
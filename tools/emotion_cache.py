@@ -0,0 +1,132 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from typing import Any, Optional
+from tools.cache import LRUCache
+
+# 连续重复的标点（如“！！！”、“。。。”）合并为一个
+_REPEATED_PUNCT = re.compile(r"([^\w\s])\1+")
+
+
+def normalize_emotion_text(text: str) -> str:
+    """
+    规范化待识别的文本：统一全角/半角，去掉所有空白，合并重复标点，并转为小写。
+    “今天有点忙”、“今天 有点忙。。”、“今天有点忙。”会得到相近的规范化结果。
+    """
+    text = unicodedata.normalize("NFKC", text)
+    text = "".join(text.split()).lower()
+    text = _REPEATED_PUNCT.sub(r"\1", text)
+    # 去掉末尾的句号等不影响情绪的标点，保留问号和感叹号
+    return text.rstrip(".,;:~。，；、")
+
+
+def emotion_text_hash(text: str) -> str:
+    return hashlib.sha256(normalize_emotion_text(text).encode("utf-8")).hexdigest()
+
+
+class EmotionCache:
+    """
+    情绪识别结果缓存。
+    以 (模型, 规范化文本哈希) 为键，每条记录带有模型版本，版本不一致的记录视为未命中；
+    进程内使用LRU缓存，指定 db_path 时额外使用SQLite持久化，进程重启后仍可命中。
+    结果需可JSON序列化。
+    """
+
+    def __init__(self, maxsize: int = 4096, db_path: Optional[str] = None, ttl: Optional[float] = None):
+        self.memory = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.db_path = db_path
+        self.ttl = ttl  # 过期时间（秒），None表示只按模型版本失效
+        self._db_lock = threading.Lock()
+        self._conn = None
+        self.db_hits = 0
+        if db_path:
+            self._open_db()
+
+    def _open_db(self):
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS emotion_cache ("
+            " model TEXT NOT NULL,"
+            " text_hash TEXT NOT NULL,"
+            " model_version TEXT NOT NULL,"
+            " result TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " PRIMARY KEY (model, text_hash))"
+        )
+        self._conn.commit()
+
+    def get(self, model: str, model_version: str, text: str) -> Any:
+        """读取缓存的识别结果，未命中时返回None"""
+        text_hash = emotion_text_hash(text)
+        key = (model, model_version, text_hash)
+        result = self.memory.get(key)
+        if result is not None or self._conn is None:
+            return result
+
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT model_version, result, created_at FROM emotion_cache WHERE model = ? AND text_hash = ?",
+                (model, text_hash)
+            ).fetchone()
+        if row is None or row[0] != model_version:
+            return None
+        if self.ttl is not None and time.time() - row[2] >= self.ttl:
+            return None
+        result = json.loads(row[1])
+        self.db_hits += 1
+        self.memory.set(key, result)
+        return result
+
+    def set(self, model: str, model_version: str, text: str, result: Any):
+        """写入识别结果，同一文本的旧版本记录会被覆盖"""
+        text_hash = emotion_text_hash(text)
+        self.memory.set((model, model_version, text_hash), result)
+        if self._conn is None:
+            return
+        with self._db_lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO emotion_cache (model, text_hash, model_version, result, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (model, text_hash, model_version, json.dumps(result, ensure_ascii=False), time.time())
+            )
+            self._conn.commit()
+
+    def purge_stale(self, model: str, model_version: str) -> int:
+        """删除持久化层中该模型其他版本的记录，返回删除条数"""
+        if self._conn is None:
+            return 0
+        with self._db_lock:
+            cursor = self._conn.execute(
+                "DELETE FROM emotion_cache WHERE model = ? AND model_version != ?", (model, model_version)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def clear(self):
+        self.memory.clear()
+        self.db_hits = 0
+        if self._conn is not None:
+            with self._db_lock:
+                self._conn.execute("DELETE FROM emotion_cache")
+                self._conn.commit()
+
+    def stats(self) -> dict:
+        stats = self.memory.stats()
+        stats["db_hits"] = self.db_hits
+        stats["persistent"] = self._conn is not None
+        return stats
+
+
+# 进程级单例；设置 EMOTION_CACHE_DB 为文件路径时启用SQLite持久化
+emotion_cache = EmotionCache(
+    maxsize=int(os.getenv("EMOTION_CACHE_SIZE", "4096")),
+    db_path=os.getenv("EMOTION_CACHE_DB") or None,
+)
@@ -7,13 +7,126 @@ from langchain.tools import tool
 load_dotenv()
 
 import os
+import time
+import threading
 import requests
 from dotenv import load_dotenv
 from langchain.tools import tool
+from tools.emotion_cache import emotion_cache
+from tools.http_client import http_client, HTTPClient
 
 # 加载 .env 文件中的环境变量
 load_dotenv()
 
+# 百度对话情绪识别接口的缓存键，接口返回格式或场景变化时修改版本，使旧缓存失效
+BAIDU_EMOTION_MODEL = "baidu-nlp-emotion-talk"
+BAIDU_EMOTION_VERSION = os.getenv("BAIDU_EMOTION_VERSION", "1")
+
+BAIDU_TOKEN_URL = "https://aip.baidubce.com/oauth/2.0/token"
+BAIDU_EMOTION_URL = "https://aip.baidubce.com/rpc/2.0/nlp/v1/emotion"
+# access_token无效或过期时百度返回的错误码
+BAIDU_TOKEN_ERROR_CODES = (110, 111)
+
+
+
+class BaiduTokenError(Exception):
+    """获取百度access_token失败"""
+
+
+class BaiduTokenManager:
+    """
+    缓存百度access_token，直到有效期结束前 refresh_margin 秒。
+    多个线程同时发现过期时，只有一个线程在锁内刷新，其余线程等待后直接使用新token。
+    """
+
+    def __init__(self, api_key: str, secret_key: str, session: HTTPClient = None,
+                 refresh_margin: float = 300):
+        self.api_key = api_key
+        self.secret_key = secret_key
+        # 使用共享的HTTP客户端，情绪识别请求通过keep-alive连接发送
+        self.session = session or http_client
+        self.refresh_margin = refresh_margin
+        self._lock = threading.Lock()
+        self._token = None
+        self._expires_at = 0.0
+
+    def _is_valid(self) -> bool:
+        return self._token is not None and time.monotonic() < self._expires_at
+
+    def get_token(self) -> str:
+        """返回有效的access_token，必要时刷新"""
+        if self._is_valid():
+            return self._token
+        with self._lock:
+            # 等待锁期间可能已被其他线程刷新
+            if not self._is_valid():
+                self._refresh()
+            return self._token
+
+    def _refresh(self):
+        token_data = {
+            "grant_type": "client_credentials",
+            "client_id": self.api_key,
+            "client_secret": self.secret_key
+        }
+        try:
+            token_resp = self.session.post(BAIDU_TOKEN_URL, data=token_data, timeout=5)
+            token_resp.raise_for_status()
+            body = token_resp.json()
+        except Exception as e:
+            raise BaiduTokenError(f"获取access_token时出错: {e}")
+        access_token = body.get("access_token")
+        if not access_token:
+            raise BaiduTokenError(f"获取access_token失败，返回内容: {token_resp.text}")
+        # 百度的token有效期通常为30天，提前 refresh_margin 秒刷新
+        expires_in = float(body.get("expires_in", 0))
+        self._token = access_token
+        self._expires_at = time.monotonic() + max(expires_in - self.refresh_margin, 0)
+
+    def invalidate(self, token: str = None):
+        """使token失效；指定token时只有当前缓存的仍是该token才失效，避免覆盖其他线程刚刷新的token"""
+        with self._lock:
+            if token is None or token == self._token:
+                self._token = None
+                self._expires_at = 0.0
+
+
+_token_manager = None
+_token_manager_lock = threading.Lock()
+
+
+def get_token_manager(api_key: str, secret_key: str) -> BaiduTokenManager:
+    """获取进程内共享的token管理器，API密钥变化时重新创建"""
+    global _token_manager
+    with _token_manager_lock:
+        if (_token_manager is None or _token_manager.api_key != api_key
+                or _token_manager.secret_key != secret_key):
+            _token_manager = BaiduTokenManager(api_key, secret_key)
+        return _token_manager
+
+
+def request_emotion(token_manager: BaiduTokenManager, text: str) -> requests.Response:
+    """调用对话情绪识别接口；token被百度判定为无效或过期时刷新后重试一次"""
+    headers = {"Content-Type": "application/json"}
+    payload = {
+        "scene": "talk",
+        "text": text
+    }
+    for attempt in range(2):
+        access_token = token_manager.get_token()
+        resp = token_manager.session.post(BAIDU_EMOTION_URL, params={"access_token": access_token},
+                                          headers=headers, json=payload, timeout=5)
+        if attempt == 0 and resp.ok:
+            try:
+                error_code = resp.json().get("error_code")
+            except ValueError:
+                error_code = None
+            if error_code in BAIDU_TOKEN_ERROR_CODES:
+                token_manager.invalidate(access_token)
+                continue
+        return resp
+    return resp
+
 @tool("Emotion_Recognition")
 def emotion_recognition_tool(text: str) -> str:
     """
@@ -24,31 +137,17 @@ def emotion_recognition_tool(text: str) -> str:
     if not api_key or not secret_key:
         return "未配置百度NLP API密钥，请在.env文件中添加 BAIDU_API_KEY 和 BAIDU_SECRET_KEY。"
 
-    # 获取access_token
-    token_url = "https://aip.baidubce.com/oauth/2.0/token"
-    token_data = {
-        "grant_type": "client_credentials",
-        "client_id": api_key,
-        "client_secret": secret_key
-    }
-    try:
-        token_resp = requests.post(token_url, data=token_data, timeout=5)
-        token_resp.raise_for_status()
-        access_token = token_resp.json().get("access_token")
-        if not access_token:
-            return f"获取access_token失败，返回内容: {token_resp.text}"
-    except Exception as e:
-        return f"获取access_token时出错: {e}"
+    # 相同（规范化后）文本直接返回缓存结果，不再调用付费接口
+    cached = emotion_cache.get(BAIDU_EMOTION_MODEL, BAIDU_EMOTION_VERSION, text)
+    if cached is not None:
+        return cached
+
+    # access_token在有效期内复用，不再每次调用都请求
+    token_manager = get_token_manager(api_key, secret_key)
 
     # 对话情绪识别API
-    emotion_url = f"https://aip.baidubce.com/rpc/2.0/nlp/v1/emotion?access_token={access_token}"
-    headers = {"Content-Type": "application/json"}
-    payload = {
-        "scene": "talk",
-        "text": text
-    }
     try:
-        resp = requests.post(emotion_url, headers=headers, json=payload, timeout=5)
+        resp = request_emotion(token_manager, text)
         print("百度对话情绪识别响应内容:", resp.text)  # 调试用
         resp.raise_for_status()
         result = resp.json()
@@ -70,13 +169,17 @@ def emotion_recognition_tool(text: str) -> str:
                 reply_text = f"，参考回复：{'；'.join(replies)}" if replies else ""
                 sub_desc.append(f"{sub_label}({sub_prob:.2f}){reply_text}")
             sub_desc_str = "；".join(sub_desc) if sub_desc else "无细分情绪"
-            return (
+            result_text = (
                 f"用户当前情绪分析结果如下，包含情绪类别和对应的概率："
                 f"一级情绪：{first_label}({first_prob:.2f})；"
                 f"二级情绪：{sub_desc_str}"
             )
+            emotion_cache.set(BAIDU_EMOTION_MODEL, BAIDU_EMOTION_VERSION, text, result_text)
+            return result_text
         else:
             return f"未能识别出有效情绪，返回内容: {resp.text}"
+    except BaiduTokenError as e:
+        return str(e)
     except Exception as e:
         return f"情绪识别API调用失败: {e}, 返回内容: {resp.text if 'resp' in locals() else '无响应'}"
 
@@ -0,0 +1,152 @@
+import time
+import threading
+from typing import Callable, Optional
+from tools.http_client import http_client
+
+
+class CachedFeed:
+    """一个RSS源的缓存：原始内容、校验头，以及按解析函数缓存的解析结果"""
+
+    def __init__(self, content: bytes, etag: Optional[str], last_modified: Optional[str]):
+        self.content = content
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = time.monotonic()  # 最近一次确认内容有效的时间
+        self.last_access = self.fetched_at
+        self.parsed = {}  # 解析函数 -> 解析结果，内容变化时整体丢弃
+
+
+class FeedCache:
+    """
+    RSS源缓存，供多个工具共享。
+    TTL内直接返回内存中的解析结果；过期后携带 If-None-Match / If-Modified-Since 重新验证，
+    源未变化时服务器返回304，只刷新缓存时间而不重新下载和解析。
+    可选的后台刷新线程会在热门源过期前主动重新验证，使工具调用只是一次内存读取。
+    """
+
+    def __init__(self, ttl: float = 300):
+        self.ttl = ttl  # 缓存有效期（秒）
+        self._lock = threading.Lock()
+        self._feeds = {}  # URL -> CachedFeed
+        self._url_locks = {}  # URL -> 锁，同一源同时只发出一个请求
+        self._refresher = None
+        self._stop_event = threading.Event()
+        # 统计
+        self.hits = 0
+        self.revalidated = 0  # 304 未修改
+        self.downloads = 0  # 200 重新下载
+        self.stale_served = 0  # 请求失败时返回旧内容
+
+    def _url_lock(self, url: str) -> threading.Lock:
+        with self._lock:
+            return self._url_locks.setdefault(url, threading.Lock())
+
+    def is_fresh(self, url: str) -> bool:
+        cached = self._feeds.get(url)
+        return cached is not None and time.monotonic() - cached.fetched_at < self.ttl
+
+    def get(self, url: str, parser: Callable[[bytes], object], timeout: float = 10):
+        """
+        获取RSS源经 parser 解析后的结果。
+        缓存过期时重新验证；请求失败但有旧内容时返回旧内容，否则抛出异常。
+        """
+        cached = self._feeds.get(url)
+        if cached is None or not self.is_fresh(url):
+            with self._url_lock(url):
+                # 等待锁期间可能已被其他线程刷新
+                if not self.is_fresh(url):
+                    try:
+                        self._fetch(url, timeout)
+                    except Exception as e:
+                        if self._feeds.get(url) is None:
+                            raise
+                        self.stale_served += 1
+                        print(f"刷新RSS源失败，使用旧内容: {url}，{e}")
+            cached = self._feeds[url]
+        else:
+            self.hits += 1
+
+        cached.last_access = time.monotonic()
+        if parser not in cached.parsed:
+            cached.parsed[parser] = parser(cached.content)
+        return cached.parsed[parser]
+
+    def _fetch(self, url: str, timeout: float):
+        """发送（条件）请求并更新缓存"""
+        cached = self._feeds.get(url)
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers['If-None-Match'] = cached.etag
+            if cached.last_modified:
+                headers['If-Modified-Since'] = cached.last_modified
+
+        response = http_client.get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304 and cached is not None:
+            cached.fetched_at = time.monotonic()
+            self.revalidated += 1
+            return
+        response.raise_for_status()
+        self._feeds[url] = CachedFeed(response.content, response.headers.get('ETag'),
+                                      response.headers.get('Last-Modified'))
+        self.downloads += 1
+
+    def refresh_hot(self, hot_window: float = 600, timeout: float = 10):
+        """重新验证最近 hot_window 秒内被访问过、且即将过期的源，并预先解析"""
+        now = time.monotonic()
+        for url, cached in list(self._feeds.items()):
+            if now - cached.last_access > hot_window:
+                continue
+            # 剩余有效期不足 1/5 时提前刷新
+            if now - cached.fetched_at < self.ttl * 0.8:
+                continue
+            with self._url_lock(url):
+                try:
+                    self._fetch(url, timeout)
+                except Exception as e:
+                    print(f"后台刷新RSS源失败: {url}，{e}")
+                    continue
+            refreshed = self._feeds[url]
+            if refreshed is not cached:
+                # 内容有变化：用原来的解析函数预先解析，保持工具调用只读内存
+                refreshed.last_access = cached.last_access
+                for parser in list(cached.parsed):
+                    try:
+                        refreshed.parsed[parser] = parser(refreshed.content)
+                    except Exception as e:
+                        print(f"后台解析RSS源失败: {url}，{e}")
+
+    def start_refresher(self, interval: float = 60, hot_window: float = 600):
+        """启动后台刷新线程（守护线程），重复调用不会启动多个线程"""
+        with self._lock:
+            if self._refresher is not None and self._refresher.is_alive():
+                return self._refresher
+            self._stop_event.clear()
+
+            def run():
+                while not self._stop_event.wait(interval):
+                    self.refresh_hot(hot_window)
+
+            self._refresher = threading.Thread(target=run, name="feed-refresher", daemon=True)
+            self._refresher.start()
+            return self._refresher
+
+    def stop_refresher(self):
+        self._stop_event.set()
+
+    def clear(self):
+        with self._lock:
+            self._feeds.clear()
+
+    def stats(self) -> dict:
+        return {
+            "feeds": len(self._feeds),
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "downloads": self.downloads,
+            "stale_served": self.stale_served,
+        }
+
+
+# 进程级单例，新闻网站搜索和RSS订阅工具共用
+feed_cache = FeedCache()
@@ -0,0 +1,66 @@
+import os
+import faiss
+import numpy as np
+
+
+def flat_index_vectors(index):
+    """
+    取出Flat内积索引（IndexFlatIP，或包在IndexIDMap中的IndexFlatIP）保存的原始向量和ID。
+    其他类型的索引返回None。
+    """
+    ids = None
+    if isinstance(index, faiss.IndexIDMap):
+        ids = faiss.vector_to_array(index.id_map).astype(np.int64)
+        index = faiss.downcast_index(index.index)
+    if not isinstance(index, faiss.IndexFlat) or index.metric_type != faiss.METRIC_INNER_PRODUCT:
+        return None
+    vectors = faiss.rev_swig_ptr(index.get_xb(), index.ntotal * index.d).reshape(index.ntotal, index.d)
+    if ids is None:
+        ids = np.arange(index.ntotal, dtype=np.int64)
+    return vectors, ids
+
+
+def write_flat_vectors(index, vectors_path: str, ids_path: str) -> bool:
+    """
+    Flat索引另存一份float32向量矩阵和int64 ID数组（非pickle的.npy），检索进程以内存映射方式打开。
+    FAISS的 IO_FLAG_MMAP 只对磁盘倒排表生效，Flat索引读取时总是整体复制到内存，因此需要这份文件。
+    其他类型的索引不写入，并删除旧的向量文件，避免检索进程读到过期的向量。返回是否写入。
+    """
+    extracted = flat_index_vectors(index)
+    if extracted is None:
+        for path in (vectors_path, ids_path):
+            if os.path.exists(path):
+                os.remove(path)
+        return False
+
+    vectors, ids = extracted
+    tmp_vectors_path = vectors_path + ".tmp.npy"
+    tmp_ids_path = ids_path + ".tmp.npy"
+    np.save(tmp_vectors_path, np.ascontiguousarray(vectors, dtype=np.float32), allow_pickle=False)
+    np.save(tmp_ids_path, ids, allow_pickle=False)
+    os.replace(tmp_ids_path, ids_path)
+    os.replace(tmp_vectors_path, vectors_path)
+    return True
+
+
+class MappedFlatIndex:
+    """
+    只读的Flat内积索引，向量矩阵通过内存映射打开，由操作系统按需读入并在多个进程间共享页缓存。
+    search() 与FAISS索引的接口一致：返回 (相似度, 文本块ID)，不足k个结果时ID为-1。
+    """
+
+    def __init__(self, vectors_path: str, ids_path: str):
+        self.vectors = np.load(vectors_path, mmap_mode='r', allow_pickle=False)
+        self.ids = np.load(ids_path, mmap_mode='r', allow_pickle=False)
+        if len(self.ids) != len(self.vectors):
+            raise ValueError("向量数量与ID数量不一致")
+        self.ntotal, self.d = self.vectors.shape
+
+    def search(self, query_vectors, k: int):
+        query_vectors = np.ascontiguousarray(query_vectors, dtype=np.float32)
+        if self.ntotal == 0:
+            distances = np.full((len(query_vectors), k), -np.finfo(np.float32).max, dtype=np.float32)
+            return distances, np.full((len(query_vectors), k), -1, dtype=np.int64)
+        distances, positions = faiss.knn(query_vectors, self.vectors, k, metric=faiss.METRIC_INNER_PRODUCT)
+        ids = np.where(positions >= 0, self.ids[np.clip(positions, 0, None)], -1)
+        return distances, ids.astype(np.int64)
@@ -0,0 +1,138 @@
+import re
+import time
+import bisect
+import threading
+import urllib.parse
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+# (连接超时, 读取超时)，单位秒
+DEFAULT_TIMEOUT = (5, 10)
+# 每个主机连接池保留的连接数；并发超过时临时新建连接、用完即关闭，不等待空闲连接，
+# 否则等待时间不受超时限制（requests 不向 urllib3 传递 pool_timeout）
+MAX_CONNECTIONS_PER_HOST = 10
+# 延迟直方图的桶上界（毫秒），最后一个桶收集超过最大上界的请求
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# 查找页面 <meta> 中声明的编码时只检查开头的字节数
+META_CHARSET_SCAN_BYTES = 4096
+
+_META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?([\w.:-]+)""", re.I)
+
+
+def build_retry(total: int = 2, backoff_factor: float = 0.3) -> Retry:
+    """
+    有限次数的重试：连接失败对所有方法重试；
+    429/5xx 和读取失败只对幂等方法（GET/HEAD/OPTIONS）重试，按 backoff_factor 指数退避。
+    """
+    return Retry(
+        total=total,
+        connect=total,
+        read=total,
+        status=total,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET", "HEAD", "OPTIONS"]),
+        raise_on_status=False,
+        respect_retry_after_header=True,
+    )
+
+
+def html_text(response: requests.Response) -> str:
+    """
+    解码HTML响应，规则与 newspaper 的下载器一致：响应头声明了编码时直接使用；
+    否则 requests 会按 ISO-8859-1 解码，中文页面会变成乱码，
+    此时改用页面 <meta> 中声明的编码，没有声明时使用根据内容推断的编码。
+    """
+    content_type = response.headers.get("Content-Type", "")
+    if "charset" in content_type.lower() or (response.encoding or "").lower() != "iso-8859-1":
+        return response.text
+    match = _META_CHARSET_RE.search(response.content[:META_CHARSET_SCAN_BYTES])
+    encoding = match.group(1).decode("ascii") if match else response.apparent_encoding
+    try:
+        return response.content.decode(encoding or "utf-8", errors="replace")
+    except LookupError:
+        return response.content.decode(response.apparent_encoding or "utf-8", errors="replace")
+
+
+class HostLatency:
+    """单个主机的请求次数、失败次数和延迟直方图"""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def record(self, elapsed_ms: float, error: bool):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if error:
+            self.errors += 1
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+
+    def to_dict(self) -> dict:
+        labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": self.total_ms / self.count if self.count else 0.0,
+            "histogram": dict(zip(labels, self.buckets)),
+        }
+
+
+class HTTPClient:
+    """
+    所有联网工具共用的HTTP客户端。
+    基于带连接池的 requests.Session，复用已建立的TCP/TLS连接；
+    统一请求头、连接/读取超时和有限次数的退避重试，并按主机统计请求延迟。
+    """
+
+    def __init__(self, headers: dict = None, timeout=DEFAULT_TIMEOUT,
+                 max_connections_per_host: int = MAX_CONNECTIONS_PER_HOST, retry: Retry = None):
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(headers or DEFAULT_HEADERS)
+        adapter = HTTPAdapter(
+            pool_connections=32,  # 缓存连接池的主机数
+            pool_maxsize=max_connections_per_host,
+            pool_block=False,
+            max_retries=retry or build_retry(),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._lock = threading.Lock()
+        self._latency = {}  # 主机 -> HostLatency
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """发送请求；未指定 timeout 时使用默认的 (连接超时, 读取超时)"""
+        kwargs.setdefault("timeout", self.timeout)
+        host = urllib.parse.urlparse(url).netloc
+        start = time.perf_counter()
+        error = True
+        try:
+            response = self.session.request(method, url, **kwargs)
+            error = response.status_code >= 400
+            return response
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self._latency.setdefault(host, HostLatency()).record(elapsed_ms, error)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def stats(self) -> dict:
+        """返回每个主机的请求次数、失败次数、平均延迟和延迟直方图"""
+        with self._lock:
+            return {host: latency.to_dict() for host, latency in self._latency.items()}
+
+
+# 进程级单例
+http_client = HTTPClient()
@@ -1,55 +1,249 @@
 import os
+import time
+import threading
+import unicodedata
+from collections import namedtuple
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
 from langchain.tools import tool
+from tools.chunk_store import ChunkStore
+from tools.flat_vectors import MappedFlatIndex
+from tools.cache import LRUCache
+from tools.bm25_index import BM25Index, reciprocal_rank_fusion
+from tools.model_registry import model_registry
 
-# 加载文本嵌入模型
-model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
+EMBEDDING_MODEL_NAME = 'paraphrase-multilingual-MiniLM-L12-v2'
+
+
+def load_embedding_model():
+    """加载文本嵌入模型"""
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(EMBEDDING_MODEL_NAME)
+
+
+# 只注册加载函数，第一次检索时才加载模型
+model_registry.register("sentence_embedding", load_embedding_model)
+
+
+def get_model():
+    return model_registry.get("sentence_embedding")
 
 # 知识库路径
 KNOWLEDGE_BASE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "knowledge_base")
 VECTOR_DB_PATH = os.path.join(KNOWLEDGE_BASE_DIR, "vector_db.index")
+# 旧格式：pickle保存的文本块数组，仅在新格式文件不存在时作为兼容读取
 METADATA_PATH = os.path.join(KNOWLEDGE_BASE_DIR, "metadata.npy")
+# 新格式：UTF-8文本块文件及其偏移量索引
+CHUNKS_PATH = os.path.join(KNOWLEDGE_BASE_DIR, "chunks.bin")
+CHUNK_OFFSETS_PATH = os.path.join(KNOWLEDGE_BASE_DIR, "chunk_offsets.npy")
+# 文本块ID（与FAISS索引中的ID一致），增量索引后ID可能不连续
+CHUNK_IDS_PATH = os.path.join(KNOWLEDGE_BASE_DIR, "chunk_ids.npy")
+# 基于jieba分词的BM25倒排索引，与向量索引使用相同的文本块ID
+BM25_PATH = os.path.join(KNOWLEDGE_BASE_DIR, "bm25.npz")
+# Flat索引的原始向量和对应的文本块ID，检索时以内存映射方式打开（其他索引类型没有这两个文件）
+VECTORS_PATH = os.path.join(KNOWLEDGE_BASE_DIR, "vectors.npy")
+VECTOR_IDS_PATH = os.path.join(KNOWLEDGE_BASE_DIR, "vector_ids.npy")
+# 版本戳文件，由知识库处理脚本在索引和元数据都写入完成后最后更新
+VERSION_PATH = os.path.join(KNOWLEDGE_BASE_DIR, "index_version")
+
+def has_chunk_store():
+    """是否存在新格式的文本块存储"""
+    return os.path.exists(CHUNKS_PATH) and os.path.exists(CHUNK_OFFSETS_PATH)
+
+
+def load_index(path):
+    """
+    加载向量索引。Flat索引存在向量文件时以内存映射方式打开，不再读入FAISS索引；
+    其他情况使用 IO_FLAG_MMAP 读取FAISS索引，该标志只对磁盘倒排表生效，其余索引数据会整体读入内存。
+    """
+    if os.path.exists(VECTORS_PATH) and os.path.exists(VECTOR_IDS_PATH):
+        return MappedFlatIndex(VECTORS_PATH, VECTOR_IDS_PATH)
+    index = faiss.read_index(path, faiss.IO_FLAG_MMAP)
+    print(f"向量索引 {type(index).__name__} 已读入内存，未使用内存映射")
+    return index
+
 
 def load_vector_db():
     """加载向量数据库和元数据"""
-    if not os.path.exists(VECTOR_DB_PATH) or not os.path.exists(METADATA_PATH):
+    if not os.path.exists(VECTOR_DB_PATH) or not (has_chunk_store() or os.path.exists(METADATA_PATH)):
         raise FileNotFoundError("未找到向量数据库或元数据文件，请先运行知识库处理脚本")
     
     # 加载向量数据库
-    index = faiss.read_index(VECTOR_DB_PATH)
+    index = load_index(VECTOR_DB_PATH)
     
-    # 加载元数据
-    metadata = np.load(METADATA_PATH, allow_pickle=True)
+    # 加载元数据：新格式按需读取文本块，旧格式整体反序列化
+    if has_chunk_store():
+        metadata = ChunkStore(CHUNKS_PATH, CHUNK_OFFSETS_PATH, CHUNK_IDS_PATH)
+    else:
+        metadata = np.load(METADATA_PATH, allow_pickle=True)
     
     return index, metadata
 
+
+def load_bm25_index():
+    """加载BM25倒排索引，不存在时返回None（只使用向量检索）"""
+    if not os.path.exists(BM25_PATH):
+        return None
+    return BM25Index(BM25_PATH)
+
+
+VectorDBSnapshot = namedtuple("VectorDBSnapshot", ["version", "index", "metadata", "bm25"], defaults=(None,))
+
+
+def get_vector_db_version():
+    """获取磁盘上向量数据库的版本：优先使用版本戳文件，否则使用文件修改时间"""
+    if os.path.exists(VERSION_PATH):
+        with open(VERSION_PATH, 'r', encoding='utf-8') as f:
+            return f.read().strip()
+    metadata_path = CHUNK_OFFSETS_PATH if has_chunk_store() else METADATA_PATH
+    if not os.path.exists(VECTOR_DB_PATH) or not os.path.exists(metadata_path):
+        raise FileNotFoundError("未找到向量数据库或元数据文件，请先运行知识库处理脚本")
+    return f"{os.path.getmtime(VECTOR_DB_PATH)}:{os.path.getmtime(metadata_path)}"
+
+
+class VectorDBManager:
+    """
+    常驻内存的向量数据库管理器。
+    每个进程只加载一次索引和元数据，并在多个线程之间共享；
+    检测到磁盘上的版本变化后在后台加载新版本并整体替换，
+    正在进行的检索继续使用旧版本，不会被阻塞。
+    """
+
+    def __init__(self, check_interval: float = 2.0):
+        self.check_interval = check_interval  # 两次检查磁盘版本的最小间隔（秒）
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._last_check = float("-inf")
+
+    def get(self) -> VectorDBSnapshot:
+        """获取当前的向量数据库快照，必要时重新加载"""
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is not None and now - self._last_check < self.check_interval:
+            return snapshot
+
+        if snapshot is None:
+            # 首次加载时所有线程都需要等待
+            self._lock.acquire()
+        elif not self._lock.acquire(blocking=False):
+            # 其他线程正在检查或重新加载，直接使用旧版本
+            return snapshot
+
+        try:
+            self._last_check = now
+            try:
+                version = get_vector_db_version()
+                if self._snapshot is None or self._snapshot.version != version:
+                    index, metadata = load_vector_db()
+                    self._snapshot = VectorDBSnapshot(version, index, metadata, load_bm25_index())
+                    print(f"已加载知识库向量数据库，版本: {version}，文本块数: {len(metadata)}")
+            except Exception as e:
+                if self._snapshot is None:
+                    raise
+                print(f"重新加载知识库向量数据库失败，继续使用旧版本: {e}")
+            return self._snapshot
+        finally:
+            self._lock.release()
+
+    def invalidate(self):
+        """使下一次获取时立即检查磁盘版本"""
+        self._last_check = float("-inf")
+
+
+# 进程级单例
+vector_db_manager = VectorDBManager()
+
+# 查询向量缓存：合并空白后的查询 -> 归一化后的查询向量
+query_embedding_cache = LRUCache(maxsize=2048)
+# 检索结果缓存：(索引版本, 合并空白后的查询, k) -> 文本块列表，索引更新后旧版本的条目自然失效
+search_result_cache = LRUCache(maxsize=2048, ttl=3600)
+
+
+def normalize_query(query: str) -> str:
+    """规范化查询文本：统一全角/半角、合并空白并转为小写"""
+    return " ".join(unicodedata.normalize("NFKC", query).split()).lower()
+
+
+def collapse_whitespace(query: str) -> str:
+    """只合并多余的空白。嵌入模型区分大小写（"CBT" 和 "cbt" 的向量不同），因此向量检索不能使用规范化后的查询"""
+    return " ".join(query.split())
+
+
+def encode_query(query: str) -> np.ndarray:
+    """将查询原文（已合并空白）转换为归一化的float32向量，优先使用缓存"""
+    query_vector = query_embedding_cache.get(query)
+    if query_vector is None:
+        query_vector = np.asarray(get_model().encode([query]), dtype='float32')
+        faiss.normalize_L2(query_vector)
+        query_embedding_cache.set(query, query_vector)
+    return query_vector
+
+
+def lookup_chunk(metadata, chunk_id):
+    """按文本块ID读取文本，找不到时返回None"""
+    if isinstance(metadata, ChunkStore):
+        return metadata.get(chunk_id)
+    if 0 <= chunk_id < len(metadata):  # 旧格式：ID即下标
+        return metadata[chunk_id]
+    return None
+
+
+def search_chunks(query: str, k: int = 3, candidates: int = 20) -> list:
+    """
+    检索与查询最相关的k个文本块。
+    存在BM25索引时进行混合检索：向量检索和BM25各取 candidates 个候选，再用倒数排名融合。
+    """
+    # 获取常驻内存的向量数据库
+    snapshot = vector_db_manager.get()
+    index, metadata = snapshot.index, snapshot.metadata
+
+    query = collapse_whitespace(query)
+    cache_key = (snapshot.version, query, k)
+    cached = search_result_cache.get(cache_key)
+    if cached is not None:
+        return list(cached)
+
+    # 将查询转换为归一化向量并执行相似度搜索
+    query_vector = encode_query(query)
+    dense_k = max(k, candidates) if snapshot.bm25 is not None else k
+    distances, indices = index.search(query_vector, dense_k)
+    # 不足k个结果时FAISS返回-1
+    ranked_ids = [int(idx) for idx in indices[0] if idx >= 0]
+
+    # 与BM25关键词检索结果融合，弥补向量检索对专有名词的遗漏
+    if snapshot.bm25 is not None:
+        keyword_ids = [chunk_id for chunk_id, _ in snapshot.bm25.search(normalize_query(query), candidates)]
+        ranked_ids = reciprocal_rank_fusion([ranked_ids, keyword_ids])
+
+    # 获取相关文本块
+    relevant_texts = []
+    for chunk_id in ranked_ids:
+        text = lookup_chunk(metadata, chunk_id)
+        if text is not None:
+            relevant_texts.append(text)
+        if len(relevant_texts) == k:
+            break
+
+    search_result_cache.set(cache_key, tuple(relevant_texts))
+    return relevant_texts
+
+
+def get_cache_stats() -> dict:
+    """返回查询向量缓存和检索结果缓存的命中统计"""
+    return {
+        "query_embedding": query_embedding_cache.stats(),
+        "search_result": search_result_cache.stats(),
+    }
+
+
 @tool("Knowledge_Base_Search")
 def search_knowledge_base(query: str) -> str:
     """
     根据用户问题从心理学知识库中检索相关信息。
     """
     try:
-        # 加载向量数据库
-        index, metadata = load_vector_db()
-        
-        # 将查询转换为向量
-        query_vector = model.encode([query])
-        
-        # 归一化查询向量
-        faiss.normalize_L2(query_vector)
-        
-        # 执行相似度搜索，获取最相关的3个文本块
-        k = 3
-        distances, indices = index.search(query_vector.astype('float32'), k)
-        
-        # 获取相关文本块
-        relevant_texts = []
-        for i in range(len(indices[0])):
-            idx = indices[0][i]
-            if idx < len(metadata):  # 确保索引有效
-                relevant_texts.append(metadata[idx])
+        # 获取最相关的3个文本块
+        relevant_texts = search_chunks(query, k=3)
         
         # 将文本块拼接成一个字符串
         knowledge_context = "\n\n".join(relevant_texts)
@@ -4,6 +4,7 @@ from langchain.tools import BaseTool
 from typing import Optional, Dict, Any
 from sqlalchemy.orm import Session
 import json
+from contextvars import ContextVar
 
 # 添加项目根目录到sys.path，确保能够正确导入
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -12,6 +13,9 @@ if project_root not in sys.path:
 
 from tools.long_term_memory import update_long_term_memory, get_user_long_term_memory
 
+# 当前请求的数据库会话。共享的Agent在调用前设置该变量，未显式绑定会话的工具实例从这里获取
+current_db_session: ContextVar[Optional[Session]] = ContextVar("current_db_session", default=None)
+
 
 class UpdateLongTermMemoryTool(BaseTool):
     name: str = "update_long_term_memory"
@@ -35,10 +39,14 @@ class UpdateLongTermMemoryTool(BaseTool):
     class Config:
         extra = "allow"
 
-    def __init__(self, db_session: Session):
+    def __init__(self, db_session: Optional[Session] = None):
         super().__init__()
         self.db_session = db_session
 
+    def _get_db_session(self) -> Optional[Session]:
+        """优先使用显式绑定的会话，否则使用当前请求的会话"""
+        return self.db_session if self.db_session is not None else current_db_session.get()
+
     def _run(
         self,
         user_id: str,
@@ -51,6 +59,10 @@ class UpdateLongTermMemoryTool(BaseTool):
         
         注意：LangChain工具要求所有参数都是字符串类型，所以我们需要解析JSON字符串
         """
+        db_session = self._get_db_session()
+        if db_session is None:
+            return "更新长期记忆时出错: 未提供数据库会话"
+
         try:
             # 解析JSON字符串参数
             if emotion_trends:
@@ -60,7 +72,7 @@ class UpdateLongTermMemoryTool(BaseTool):
                 
             # 调用更新函数
             success = update_long_term_memory(
-                db_session=self.db_session,
+                db_session=db_session,
                 user_id=user_id,
                 profile_summary=profile_summary,
                 emotion_trends=emotion_trends,
@@ -0,0 +1,102 @@
+import time
+import queue
+import threading
+from collections import Counter
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional
+
+
+class MicroBatcher:
+    """
+    微批处理推理工作线程。
+    调用方提交单条输入后等待结果；后台线程在 max_wait 秒内或凑满 max_batch_size 条时，
+    把等待中的输入合并为一次批量推理，再把每条结果交还给对应的调用方。
+    """
+
+    def __init__(self, process_batch: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = 16, max_wait: float = 0.005, name: str = "micro-batcher"):
+        self.process_batch = process_batch  # 接收输入列表，返回等长的结果列表
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait  # 收到第一条输入后最多等待的秒数
+        self.name = name
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        # 统计
+        self.total_items = 0
+        self.total_batches = 0
+        self.max_queue_depth = 0
+        self.batch_size_counts = Counter()  # 批大小 -> 次数
+
+    def _ensure_worker(self):
+        """第一次提交时启动后台线程"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def submit(self, item: Any) -> Future:
+        """提交一条输入，返回其结果的Future"""
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((item, future))
+        depth = self._queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+        return future
+
+    def infer(self, item: Any, timeout: Optional[float] = None) -> Any:
+        """提交一条输入并等待结果，批量推理出错时抛出相同的异常"""
+        return self.submit(item).result(timeout=timeout)
+
+    def _collect_batch(self) -> list:
+        """阻塞等待第一条输入，然后在 max_wait 内尽量凑满一批"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            # 跳过调用方已取消的请求
+            batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            items = [item for item, _ in batch]
+            try:
+                results = self.process_batch(items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"批量推理返回了 {len(results)} 条结果，期望 {len(items)} 条")
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            with self._lock:
+                self.total_items += len(batch)
+                self.total_batches += 1
+                self.batch_size_counts[len(batch)] += 1
+
+    def stats(self) -> dict:
+        """返回队列深度和批大小统计"""
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self.max_queue_depth,
+                "total_items": self.total_items,
+                "total_batches": self.total_batches,
+                "avg_batch_size": self.total_items / self.total_batches if self.total_batches else 0.0,
+                "batch_size_counts": dict(self.batch_size_counts),
+            }
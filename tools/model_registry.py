@@ -0,0 +1,107 @@
+import time
+import threading
+from typing import Callable, Dict, Iterable, Optional
+
+
+class ModelRegistry:
+    """
+    进程级的模型注册表。
+    各模块在导入时只注册模型的加载函数，第一次使用时才真正加载，之后在所有线程之间共享；
+    每个模型有独立的锁，保证并发首次访问时只加载一次，并记录加载耗时。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaders: Dict[str, Callable] = {}
+        self._models = {}
+        self._model_locks: Dict[str, threading.Lock] = {}
+        self._load_seconds: Dict[str, float] = {}
+        self._errors: Dict[str, str] = {}
+
+    def register(self, name: str, loader: Callable):
+        """注册模型的加载函数；重复注册会替换加载函数并丢弃已加载的模型"""
+        with self._lock:
+            self._loaders[name] = loader
+            self._model_locks.setdefault(name, threading.Lock())
+            self._models.pop(name, None)
+            self._load_seconds.pop(name, None)
+            self._errors.pop(name, None)
+
+    def get(self, name: str):
+        """获取模型，未加载时在当前线程加载"""
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        with self._lock:
+            if name not in self._loaders:
+                raise KeyError(f"未注册的模型: {name}")
+            loader = self._loaders[name]
+            model_lock = self._model_locks[name]
+
+        with model_lock:
+            # 等待锁期间可能已被其他线程加载完成
+            model = self._models.get(name)
+            if model is not None:
+                return model
+            print(f"正在加载模型: {name}")
+            start = time.perf_counter()
+            try:
+                model = loader()
+            except Exception as e:
+                self._errors[name] = str(e)
+                print(f"加载模型 {name} 失败: {e}")
+                raise
+            elapsed = time.perf_counter() - start
+            self._models[name] = model
+            self._load_seconds[name] = elapsed
+            self._errors.pop(name, None)
+            print(f"模型 {name} 加载完成，耗时 {elapsed:.2f} 秒")
+            return model
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def warmup(self, names: Optional[Iterable[str]] = None, background: bool = True):
+        """
+        预先加载模型（默认加载全部已注册的模型）。
+        background=True 时在后台守护线程中依次加载并返回该线程，不阻塞调用方；加载失败只记录，不抛出。
+        """
+        with self._lock:
+            names = list(names) if names is not None else list(self._loaders)
+
+        def load_all():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception:
+                    pass
+
+        if not background:
+            load_all()
+            return None
+        thread = threading.Thread(target=load_all, name="model-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def unload(self, name: str):
+        """释放已加载的模型，下次使用时重新加载"""
+        with self._lock:
+            self._models.pop(name, None)
+            self._load_seconds.pop(name, None)
+
+    def stats(self) -> dict:
+        """返回每个已注册模型的加载状态和加载耗时（秒）"""
+        with self._lock:
+            return {
+                name: {
+                    "loaded": name in self._models,
+                    "load_seconds": self._load_seconds.get(name),
+                    "error": self._errors.get(name),
+                }
+                for name in self._loaders
+            }
+
+
+# 进程级单例
+model_registry = ModelRegistry()
@@ -0,0 +1,112 @@
+import math
+import threading
+from collections import Counter, defaultdict
+from tools.bm25_index import tokenize as _tokenize
+
+# 常见虚词，单独命中时不应使条目被视为相关
+STOPWORDS = frozenset(
+    "的 了 在 是 和 与 或 也 都 就 而 及 着 吗 吧 呢 啊 把 被 让 给 对 从 向 这 那 有 个 之 为 于 以 "
+    "我 你 他 她 它 们 怎么 什么 如何 为什么 a an the of to in on for and or is are was were be".split()
+)
+
+
+def tokenize(text: str) -> list:
+    return [token for token in _tokenize(text) if token not in STOPWORDS]
+
+
+class NewsIndex:
+    """
+    内存中的新闻条目倒排索引（标题+摘要，jieba分词），按BM25对多词查询排序。
+    以RSS源为单位增量更新：某个源刷新后只替换该源的条目，其他源的索引保持不变。
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, title_weight: int = 2):
+        self.k1 = k1
+        self.b = b
+        self.title_weight = title_weight  # 标题中的词项按此倍数计入词频
+        self._lock = threading.Lock()
+        self._docs = {}  # 条目ID -> 条目字典（含 site）
+        self._doc_lengths = {}  # 条目ID -> 词项数
+        self._doc_terms = {}  # 条目ID -> 包含的词项，删除时只需清理这些倒排列表
+        self._postings = defaultdict(dict)  # 词项 -> {条目ID: 词频}
+        self._site_docs = defaultdict(list)  # 网站名 -> 条目ID列表
+        self._site_sources = {}  # 网站名 -> 最近一次建立索引的条目列表
+        self._next_id = 0
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self._docs)
+
+    def update_feed(self, site_name: str, entries: list):
+        """用最新的条目替换某个源的索引；条目列表与上次相同（同一个对象）时直接跳过"""
+        with self._lock:
+            if self._site_sources.get(site_name) is entries:
+                return
+            self._remove_site(site_name)
+            seen_urls = set()
+            for entry in entries:
+                url = entry.get('url')
+                if url and url in seen_urls:
+                    continue
+                seen_urls.add(url)
+                self._add(site_name, entry)
+            self._site_sources[site_name] = entries
+
+    def _remove_site(self, site_name: str):
+        for doc_id in self._site_docs.pop(site_name, []):
+            self._docs.pop(doc_id)
+            self._total_length -= self._doc_lengths.pop(doc_id)
+            for term in self._doc_terms.pop(doc_id):
+                postings = self._postings[term]
+                del postings[doc_id]
+                if not postings:
+                    del self._postings[term]
+        self._site_sources.pop(site_name, None)
+
+    def _add(self, site_name: str, entry: dict):
+        doc_id = self._next_id
+        self._next_id += 1
+        title_tokens = tokenize(entry.get('title', ''))
+        tokens = title_tokens * self.title_weight + tokenize(entry.get('summary', ''))
+        counts = Counter(tokens)
+        for term, tf in counts.items():
+            self._postings[term][doc_id] = tf
+        self._doc_terms[doc_id] = list(counts)
+        self._docs[doc_id] = dict(entry, site=site_name)
+        self._doc_lengths[doc_id] = len(tokens)
+        self._total_length += len(tokens)
+        self._site_docs[site_name].append(doc_id)
+
+    def search(self, query: str, k: int = 10) -> list:
+        """返回得分最高的k个 (条目字典, 得分)，同分时较新的（在源中靠前的）条目优先"""
+        terms = set(tokenize(query))
+        with self._lock:
+            doc_count = len(self._docs)
+            if not terms or not doc_count:
+                return []
+            avgdl = self._total_length / doc_count
+            scores = defaultdict(float)
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / avgdl) if avgdl else self.k1
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+            return [(self._docs[doc_id], score) for doc_id, score in ranked]
+
+    def clear(self):
+        with self._lock:
+            self._docs.clear()
+            self._doc_lengths.clear()
+            self._doc_terms.clear()
+            self._postings.clear()
+            self._site_docs.clear()
+            self._site_sources.clear()
+            self._total_length = 0
+
+
+# 进程级单例，索引所有已获取的新闻条目
+news_index = NewsIndex()
@@ -1,9 +1,12 @@
 from dotenv import load_dotenv
 from langchain.tools import tool
-import requests
 from bs4 import BeautifulSoup
 import urllib.parse
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from tools.feed_cache import feed_cache
+from tools.news_index import news_index
 
 # 加载 .env 文件中的环境变量
 load_dotenv()
@@ -15,6 +18,105 @@ NEWS_RSS_FEEDS = {
     "Reuters": "https://www.reuters.com/news/rss.xml",  # Reuters实际可能不提供RSS
 }
 
+# 单个RSS源的请求超时（秒）
+FEED_TIMEOUT = 10
+# 获取所有RSS源的总时限（秒），超时未返回的源直接忽略
+FETCH_DEADLINE = 8
+# 同一主机两次请求之间的最小间隔（秒），避免过于频繁的请求
+HOST_MIN_INTERVAL = 0.5
+# 每个源解析并建立索引的最大条目数
+ENTRIES_PER_FEED = 500
+
+
+class HostRateLimiter:
+    """按主机限速：同一主机的请求之间至少间隔 min_interval 秒，不同主机互不影响"""
+
+    def __init__(self, min_interval: float = HOST_MIN_INTERVAL):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_time = {}  # 主机 -> 下一次允许请求的时间
+
+    def acquire(self, url: str, deadline: float = None) -> bool:
+        """等待到该主机允许请求的时间；若需等到 deadline 之后则返回False"""
+        host = urllib.parse.urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_time.get(host, now))
+            if deadline is not None and slot >= deadline:
+                return False
+            self._next_time[host] = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+        return True
+
+
+host_rate_limiter = HostRateLimiter()
+# 所有RSS源共用的抓取线程池
+_fetch_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="news-fetch")
+
+
+def parse_feed_entries(content: bytes, limit: int = ENTRIES_PER_FEED) -> list:
+    """解析RSS内容，返回前 limit 个条目的 {'title', 'url', 'summary'}"""
+    soup = BeautifulSoup(content, 'xml')
+    entries = []
+    for entry in soup.find_all('item')[:limit]:
+        title_elem = entry.find('title')
+        link_elem = entry.find('link')
+        if title_elem and link_elem:
+            title = title_elem.get_text().strip()
+            link = link_elem.get_text().strip() if link_elem.get_text().strip() else link_elem.get('href', '')
+            # 摘要中通常是转义后的HTML，只保留文本
+            summary_elem = entry.find('description')
+            summary = ""
+            if summary_elem:
+                summary = BeautifulSoup(summary_elem.get_text(), 'html.parser').get_text(" ").strip()
+            entries.append({'title': title, 'url': link, 'summary': summary})
+    return entries
+
+
+def fetch_feed(rss_url: str, deadline: float) -> list:
+    """
+    在总时限内获取并解析一个RSS源，超过时限时返回空列表。
+    缓存有效时直接读取内存，不经过限速；否则通过共享的RSS缓存发送条件请求。
+    """
+    if not feed_cache.is_fresh(rss_url):
+        if not host_rate_limiter.acquire(rss_url, deadline):
+            return []
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        return []
+    return feed_cache.get(rss_url, parse_feed_entries, timeout=min(FEED_TIMEOUT, remaining))
+
+
+def fetch_all_feeds(feeds: dict = None, deadline_seconds: float = FETCH_DEADLINE) -> dict:
+    """
+    并发获取所有RSS源，每个源只请求和解析一次。
+    返回 {网站名: 条目列表}，按 feeds 的顺序排列；出错或未在总时限内完成的源被忽略。
+    """
+    feeds = NEWS_RSS_FEEDS if feeds is None else feeds
+    deadline = time.monotonic() + deadline_seconds
+    futures = {site_name: _fetch_executor.submit(fetch_feed, rss_url, deadline)
+               for site_name, rss_url in feeds.items()}
+    wait(futures.values(), timeout=deadline_seconds)
+
+    parsed = {}
+    for site_name, future in futures.items():
+        if not future.done():
+            future.cancel()
+            print(f"获取RSS源超时，已忽略: {site_name}")
+            continue
+        try:
+            entries = future.result()
+        except Exception as e:
+            # 忽略单个源的错误，继续处理其他源
+            print(f"获取RSS源 {site_name} 出错: {e}")
+            continue
+        if entries:
+            parsed[site_name] = entries
+            # 内容有变化的源才会重新建立索引（未变化时缓存返回同一个条目列表）
+            news_index.update_feed(site_name, entries)
+    return parsed
+
 @tool("Search_News_Websites")
 def search_news_websites(query: str) -> str:
     """
@@ -25,86 +127,24 @@ def search_news_websites(query: str) -> str:
     """
     try:
         results = []
-        
-        # 对每个新闻网站的RSS源进行处理
-        for site_name, rss_url in NEWS_RSS_FEEDS.items():
-            try:
-                # 添加小延迟避免过于频繁的请求
-                time.sleep(0.5)
-                
-                # 发送请求获取RSS内容
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                }
-                response = requests.get(rss_url, headers=headers, timeout=10)
-                response.raise_for_status()
-                
-                # 解析RSS
-                soup = BeautifulSoup(response.content, 'xml')
-                
-                # 提取条目
-                entries = soup.find_all('item')[:5]  # 限制每个源最多5个条目
-                
-                # 筛选包含查询关键词的条目
-                query_lower = query.lower()
-                matched_entries = []
-                for entry in entries:
-                    title_elem = entry.find('title')
-                    link_elem = entry.find('link')
-                    
-                    if title_elem and link_elem:
-                        title = title_elem.get_text().strip()
-                        link = link_elem.get_text().strip() if link_elem.get_text().strip() else link_elem.get('href', '')
-                        
-                        # 检查标题是否包含查询词
-                        if query_lower in title.lower():
-                            matched_entries.append({
-                                'title': title,
-                                'url': link
-                            })
-                
-                # 添加匹配的条目到结果（每个网站最多3个）
-                for entry in matched_entries[:3]:
-                    results.append(f"来源: {site_name}\n标题: {entry['title']}\n链接: {entry['url']}\n")
-                    
-            except Exception as e:
-                # 忽略单个源的错误，继续处理其他源
+
+        # 并发获取所有RSS源，关键词匹配和备选结果都使用同一份解析结果
+        parsed_feeds = fetch_all_feeds()
+
+        # 在所有已缓存条目的倒排索引中按相关性检索（标题+摘要，每个网站最多3个）
+        site_counts = {}
+        for entry, _ in news_index.search(query, k=50):
+            site_name = entry['site']
+            if site_counts.get(site_name, 0) >= 3:
                 continue
-        
-        # 如果没有找到匹配的结果，返回最新的几条新闻作为备选
+            site_counts[site_name] = site_counts.get(site_name, 0) + 1
+            results.append(f"来源: {site_name}\n标题: {entry['title']}\n链接: {entry['url']}\n")
+
+        # 如果没有找到匹配的结果，返回最新的几条新闻作为备选（每个网站最多3个）
         if not results:
-            for site_name, rss_url in NEWS_RSS_FEEDS.items():
-                try:
-                    # 添加小延迟避免过于频繁的请求
-                    time.sleep(0.5)
-                    
-                    # 发送请求获取RSS内容
-                    headers = {
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                    }
-                    response = requests.get(rss_url, headers=headers, timeout=10)
-                    response.raise_for_status()
-                    
-                    # 解析RSS
-                    soup = BeautifulSoup(response.content, 'xml')
-                    
-                    # 提取条目
-                    entries = soup.find_all('item')[:3]  # 限制每个源最多3个条目
-                    
-                    # 添加条目到结果
-                    for entry in entries:
-                        title_elem = entry.find('title')
-                        link_elem = entry.find('link')
-                        
-                        if title_elem and link_elem:
-                            title = title_elem.get_text().strip()
-                            link = link_elem.get_text().strip() if link_elem.get_text().strip() else link_elem.get('href', '')
-                            
-                            results.append(f"来源: {site_name}\n标题: {title}\n链接: {link}\n")
-                            
-                except Exception as e:
-                    # 忽略单个源的错误，继续处理其他源
-                    continue
+            for site_name, entries in parsed_feeds.items():
+                for entry in entries[:3]:
+                    results.append(f"来源: {site_name}\n标题: {entry['title']}\n链接: {entry['url']}\n")
         
         # 如果仍然没有结果，返回提示信息
         if not results:
@@ -3,10 +3,32 @@ from langchain.tools import tool
 import feedparser
 import os
 import requests
+from tools.feed_cache import feed_cache
 
 # 加载 .env 文件中的环境变量
 load_dotenv()
 
+
+class FeedParseError(Exception):
+    """RSS内容无法解析"""
+
+
+def parse_rss_feed(content: bytes):
+    """使用feedparser解析RSS内容，遇到编码问题时依次尝试UTF-8和GBK解码"""
+    feed = feedparser.parse(content)
+    
+    # 检查是否解析成功
+    if feed.bozo and isinstance(feed.bozo_exception, Exception):
+        # 如果有编码问题，尝试使用不同的编码
+        try:
+            feed = feedparser.parse(content.decode('utf-8'))
+        except:
+            try:
+                feed = feedparser.parse(content.decode('gbk'))
+            except:
+                raise FeedParseError(f"解析RSS订阅源时出错: {feed.bozo_exception}")
+    return feed
+
 class RSSFeedTool:
     """用于从RSS订阅源获取内容的工具"""
 
@@ -22,26 +44,8 @@ class RSSFeedTool:
             return "RSS订阅源URL不能为空。"
 
         try:
-            # 先用requests获取内容，处理编码问题
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            response = requests.get(feed_url, headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            # 使用feedparser解析响应内容
-            feed = feedparser.parse(response.content)
-            
-            # 检查是否解析成功
-            if feed.bozo and isinstance(feed.bozo_exception, Exception):
-                # 如果有编码问题，尝试使用不同的编码
-                try:
-                    feed = feedparser.parse(response.content.decode('utf-8'))
-                except:
-                    try:
-                        feed = feedparser.parse(response.content.decode('gbk'))
-                    except:
-                        return f"解析RSS订阅源时出错: {feed.bozo_exception}"
+            # 通过共享的RSS缓存获取解析结果：缓存有效时不发请求，过期后用条件请求重新验证
+            feed = feed_cache.get(feed_url, parse_rss_feed, timeout=10)
             
             # 检查是否有条目
             if not feed.entries:
@@ -62,6 +66,8 @@ class RSSFeedTool:
                 
             return result
             
+        except FeedParseError as e:
+            return str(e)
         except requests.RequestException as e:
             return f"获取RSS订阅源时网络请求出错: {e}"
         except Exception as e:
@@ -1,12 +1,146 @@
 from dotenv import load_dotenv
 from langchain.tools import tool
 import requests
-from bs4 import BeautifulSoup
+from lxml import etree
 import re
+from tools.http_client import http_client
+from tools.content_cache import content_cache, cache_ttl_from_headers
 
 # 加载 .env 文件中的环境变量
 load_dotenv()
 
+# 最多读取的响应字节数，超过后停止下载
+MAX_CONTENT_BYTES = 2 * 1024 * 1024
+# 返回的正文最大字符数，收集到足够的正文后停止下载和解析
+MAX_TEXT_CHARS = 3000
+# 每次从网络读取的字节数
+CHUNK_SIZE = 16 * 1024
+# 可以提取正文的内容类型（没有Content-Type时也尝试按HTML解析）
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+# 不属于正文的元素，其中的文本全部跳过
+SKIP_TAGS = frozenset(["script", "style", "noscript", "template", "svg", "nav", "footer", "aside", "iframe"])
+# 块级元素，前后补空格，避免相邻段落的文字连在一起
+BLOCK_TAGS = frozenset(["p", "div", "br", "li", "tr", "td", "th", "h1", "h2", "h3", "h4", "h5", "h6",
+                        "section", "article", "header", "blockquote", "pre", "table", "ul", "ol"])
+
+_CHARSET_RE = re.compile(r"charset=([\w.:-]+)", re.I)
+
+
+class TextCollector:
+    """
+    lxml解析器的目标对象：按文档顺序接收标签和文本事件，不构建DOM树。
+    只记录标题和正文文本，正文在收集时即合并空白（连续的空白计为一个空格），
+    合并后收集到 max_chars 个字符后标记为已满。
+    """
+
+    def __init__(self, max_chars: int = MAX_TEXT_CHARS):
+        self.max_chars = max_chars
+        self.title_parts = []
+        self.parts = []
+        self.length = 0  # 合并空白后的正文字符数
+        self._pending_space = False  # 下一段文字前是否需要补一个空格
+        self._skip_depth = 0
+        self._in_title = False
+        self._in_head = False
+
+    @property
+    def full(self) -> bool:
+        # 多收集一个字符，用于判断是否需要截断
+        return self.length > self.max_chars
+
+    def start(self, tag, attrib):
+        tag = tag.lower() if isinstance(tag, str) else ""
+        if tag == "head":
+            self._in_head = True
+        elif tag == "title":
+            self._in_title = True
+        elif tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self._pending_space = True
+
+    def end(self, tag):
+        tag = tag.lower() if isinstance(tag, str) else ""
+        if tag == "head":
+            self._in_head = False
+        elif tag == "title":
+            self._in_title = False
+        elif tag in SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag in BLOCK_TAGS:
+            self._pending_space = True
+
+    def data(self, text):
+        if self._in_title:
+            self.title_parts.append(text)
+        elif not self._skip_depth and not self._in_head and not self.full:
+            self._append_text(text)
+
+    def _append_text(self, text):
+        """合并空白后追加文字：只含空白的文本节点（如标签间的缩进）只记为一个待补的空格"""
+        words = " ".join(text.split())
+        if not words:
+            self._pending_space = self._pending_space or bool(text)
+            return
+        if (self._pending_space or text[0].isspace()) and self.length:
+            words = " " + words
+        self.parts.append(words)
+        self.length += len(words)
+        self._pending_space = text[-1].isspace()
+
+    def comment(self, text):
+        pass
+
+    def close(self):
+        return self
+
+    @property
+    def title(self) -> str:
+        return " ".join("".join(self.title_parts).split())
+
+    @property
+    def text(self) -> str:
+        return "".join(self.parts)
+
+
+def get_charset(content_type: str):
+    match = _CHARSET_RE.search(content_type or "")
+    return match.group(1) if match else None
+
+
+def extract_page(response, max_bytes: int = MAX_CONTENT_BYTES, max_chars: int = MAX_TEXT_CHARS):
+    """
+    边下载边解析HTML，返回 (标题, 正文, 是否截断)。
+    读取超过 max_bytes 字节或收集到足够正文后立即停止下载。
+    """
+    collector = TextCollector(max_chars)
+    # 响应头中声明了编码时使用该编码，否则由lxml根据页面中的meta标签判断
+    parser = etree.HTMLParser(target=collector, encoding=get_charset(response.headers.get("Content-Type")))
+    received = 0
+    hit_byte_limit = False
+    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+        if not chunk:
+            continue
+        if received + len(chunk) > max_bytes:
+            chunk = chunk[:max_bytes - received]
+            hit_byte_limit = True
+        received += len(chunk)
+        parser.feed(chunk)
+        if collector.full or hit_byte_limit:
+            break
+    try:
+        parser.close()
+    except etree.LxmlError:
+        # 提前停止时文档不完整，已收集的内容仍然有效
+        pass
+
+    text = collector.text
+    truncated = collector.full or hit_byte_limit
+    if len(text) > max_chars:
+        text = text[:max_chars]
+    return collector.title, text, truncated
+
+
 class URLReaderTool:
     """用于读取和提取任意URL内容的工具"""
 
@@ -18,41 +152,37 @@ class URLReaderTool:
         返回网页的标题和主要内容文本。
         """
         try:
-            # 发送GET请求获取网页内容
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()  # 检查请求是否成功
-            
-            # 使用BeautifulSoup解析HTML
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # 提取标题
-            title = soup.find('title')
-            title_text = title.get_text().strip() if title else "无标题"
-            
-            # 移除脚本和样式元素
-            for script in soup(["script", "style"]):
-                script.decompose()
-            
-            # 提取文本内容
-            text = soup.get_text()
-            
-            # 清理文本：移除多余的空白字符
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            text = ' '.join(chunk for chunk in chunks if chunk)
-            
+            # 先查内容缓存（按规范化URL），命中时不发出请求
+            cached = content_cache.get("page", url)
+            if cached is not None:
+                title_text, text, truncated = cached["title"], cached["text"], cached["truncated"]
+            else:
+                # 通过共享的HTTP客户端以流式方式请求，只下载需要的部分
+                with http_client.get(url, stream=True) as response:
+                    response.raise_for_status()  # 检查请求是否成功
+
+                    # 只根据响应头判断内容类型，非HTML内容不下载正文
+                    content_type = response.headers.get("Content-Type", "")
+                    mime_type = content_type.split(";")[0].strip().lower()
+                    if mime_type and mime_type not in HTML_CONTENT_TYPES:
+                        return f"无法提取URL内容: 不支持的内容类型 {mime_type}\n\nURL: {url}"
+
+                    title_text, text, truncated = extract_page(response)
+
+                # 按响应头的缓存语义（Cache-Control/Expires）决定是否缓存及有效期
+                content_cache.set("page", url, {"title": title_text, "text": text, "truncated": truncated},
+                                  ttl=cache_ttl_from_headers(response.headers))
+
+            title_text = title_text or "无标题"
             # 限制返回的文本长度，避免过长
-            if len(text) > 3000:
-                text = text[:3000] + "... (内容已截断)"
-            
+            if truncated:
+                text = text + "... (内容已截断)"
+
             # 组织结果
             result = f"网页标题: {title_text}\n\n"
             result += f"URL: {url}\n\n"
             result += f"内容:\n{text}"
-            
+
             return result
 
         except requests.RequestException as e:
@@ -61,4 +191,4 @@ class URLReaderTool:
             return f"处理URL内容时出错: {e}"
 
 # 实例化工具类，以便在 agent.py 中导入和使用
-url_reader_tool = URLReaderTool()
\ No newline at end of file
+url_reader_tool = URLReaderTool()